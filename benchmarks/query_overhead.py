@@ -0,0 +1,87 @@
+"""Microbenchmark of the Python overhead of the model queries.
+
+Compares a query built on each call, the same query through a named scope
+and a prepared query template, on an in-memory SQLite database where the
+database time is negligible compared to the time spent in Python.
+
+```
+python benchmarks/query_overhead.py [--number 5000]
+```
+"""
+
+from argparse import ArgumentParser
+from timeit import repeat
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import bindparam, create_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Field, SQLModel
+
+from grace.model import Model, Query, scope
+
+
+class BenchMember(Model, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    guild_id: int = Field(index=True)
+    xp: int = 0
+
+    @scope
+    def of_guild(query: Query["BenchMember"], guild_id: int) -> Query["BenchMember"]:
+        return query.where(BenchMember.guild_id == guild_id).order_by("xp")
+
+
+def setup() -> None:
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine, tables=[BenchMember.__table__])
+    BenchMember.set_engine(engine)
+    BenchMember.insert_all(
+        [{"guild_id": index % 10, "xp": index} for index in range(1000)]
+    )
+
+
+def measure(function: Callable[[], object], number: int) -> float:
+    """Returns the best time of a call, in microseconds."""
+    return min(repeat(function, number=number, repeat=5)) / number * 1_000_000
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=5000)
+    number = parser.parse_args().number
+
+    setup()
+    prepared = BenchMember.prepare(
+        BenchMember.where(BenchMember.guild_id == bindparam("guild_id")).order_by("xp")
+    )
+
+    timings: Dict[str, float] = {
+        "build only (where + order_by)": measure(
+            lambda: BenchMember.where(BenchMember.guild_id == 3)
+            .order_by("xp")
+            .statement,
+            number,
+        ),
+        "built query .first()": measure(
+            lambda: BenchMember.where(BenchMember.guild_id == 3).order_by("xp").first(),
+            number,
+        ),
+        "scope .first()": measure(
+            lambda: BenchMember.of_guild(3).first(),
+            number,
+        ),
+        "prepared .first()": measure(
+            lambda: prepared.first(guild_id=3),
+            number,
+        ),
+    }
+
+    for name, timing in timings.items():
+        print(f"{name:<32} {timing:8.1f} µs")
+
+    built = timings["built query .first()"]
+    saved = built - timings["prepared .first()"]
+    print(f"\nPrepared query saves {saved:.1f} µs per call ({saved / built:.0%})")
+
+
+if __name__ == "__main__":
+    main()
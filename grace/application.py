@@ -1,21 +1,33 @@
 from configparser import SectionProxy
-from logging import basicConfig, critical
+from logging import basicConfig, critical, warning
 from logging.handlers import RotatingFileHandler
 from os import environ
 from pathlib import Path
 from types import ModuleType
-from typing import Any, Dict, Generator, Optional, Union, no_type_check
+from typing import Any, Dict, Generator, List, Optional, Union, no_type_check
 
 from coloredlogs import install
 from sqlalchemy import MetaData
-from sqlalchemy.engine import Engine
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.exc import ArgumentError, NoSuchModuleError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy_utils import create_database, database_exists, drop_database
 from sqlmodel import Session, SQLModel, create_engine
 
 from grace.config import Config
+from grace.engine import (
+    EngineT,
+    PoolMonitor,
+    ShardRouter,
+    apply_sqlite_pragmas,
+    enable_single_writer,
+    engine_options,
+    make_async_url,
+    sqlite_pragmas,
+)
 from grace.exceptions import ConfigError
 from grace.importer import find_all_importables, import_module
+from grace.instrumentation import QueryInstrumentation
 from grace.model import Model
 
 ConfigReturn = Union[str, int, float, None]
@@ -38,6 +50,9 @@ class Application:
 
         self.__token: str = str(self.config.get("discord", "token"))
         self.__engine: Union[Engine, None] = None
+        self.__async_engine: Union[AsyncEngine, None] = None
+        self.__pool_monitors: Dict[str, PoolMonitor] = {}
+        self.instrumentation: QueryInstrumentation = QueryInstrumentation()
 
         self.environment: str = "development"
         self.command_sync: bool = True
@@ -51,6 +66,16 @@ class Application:
     def token(self) -> str:
         return str(self.__token)
 
+    @property
+    def pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """The connection pool metrics of the loaded engines.
+
+        The stats of the synchronous engine are under `engine`, the ones of
+        the asyncio engine under `async_engine`, and the ones of the read
+        replicas under `replica_<index>` (and `async_replica_<index>`).
+        """
+        return {name: monitor.stats for name, monitor in self.__pool_monitors.items()}
+
     @property
     @no_type_check
     def session(self) -> Session:
@@ -61,6 +86,11 @@ class Application:
 
         return self.__session
 
+    @property
+    def async_engine(self) -> Union[AsyncEngine, None]:
+        """The asyncio engine, or `None` if no asyncio driver is available."""
+        return self.__async_engine
+
     @property
     def config(self) -> Config:
         if not self.__config:
@@ -149,11 +179,22 @@ class Application:
         if not self.config.database_uri:
             raise ValueError("No database uri.")
 
-        self.__engine = create_engine(
-            self.config.database_uri,
-            echo=self.config.environment.getboolean("sqlalchemy_echo"),
+        # In milliseconds in the config
+        threshold = self.config.environment.getfloat("slow_query_threshold", 200)
+        self.instrumentation.slow_query_threshold = threshold / 1000
+
+        self.instrumentation.n_plus_one = self.config.environment.get(
+            "n_plus_one", "off"
+        )
+        self.instrumentation.query_budget = self.config.environment.getint(
+            "query_budget"
+        )
+        self.instrumentation.n_plus_one_threshold = self.config.environment.getint(
+            "n_plus_one_threshold", 3
         )
 
+        self.__engine = self.__create_engine(self.config.database_uri, "engine")
+
         if self.database_exists:
             try:
                 self.__engine.connect()
@@ -161,11 +202,133 @@ class Application:
                 critical(f"Unable to load the 'database': {e}")
 
         Model.set_engine(self.__engine)
+        Model.set_read_engines(
+            *(
+                self.__create_engine(uri, f"replica_{index}")
+                for index, uri in enumerate(self.config.database_replica_uris)
+            )
+        )
+
+        for name, section in self.config.database_binds.items():
+            engines = [
+                self.__create_engine(uri, f"{name}_{index}", section)
+                for index, uri in enumerate(self.config.bind_uris(name))
+            ]
+            Model.set_bind(name, self.__bind_engine(name, section, engines))
+
+        self.load_async_database()
+
+    def load_async_database(self) -> None:
+        """Creates the asyncio engine used by the `*_async` model methods.
+
+        If the asyncio driver of the configured dialect is not installed,
+        a warning is logged and the asyncio methods stay unavailable.
+        """
+
+        if not self.config.database_uri:
+            raise ValueError("No database uri.")
+
+        try:
+            self.__async_engine = self.__create_async_engine(
+                self.config.database_uri, "async_engine"
+            )
+            replicas = [
+                self.__create_async_engine(uri, f"async_replica_{index}")
+                for index, uri in enumerate(self.config.database_replica_uris)
+            ]
+            binds = {
+                name: self.__bind_engine(
+                    name,
+                    section,
+                    [
+                        self.__create_async_engine(
+                            uri, f"async_{name}_{index}", section
+                        )
+                        for index, uri in enumerate(self.config.bind_uris(name))
+                    ],
+                )
+                for name, section in self.config.database_binds.items()
+            }
+        except (
+            ValueError,
+            TypeError,
+            ArgumentError,
+            NoSuchModuleError,
+            ImportError,
+        ) as e:
+            warning(f"Unable to load the async database engine: {e}")
+            return
+
+        if self.config.database.getboolean("single_writer", False):
+            enable_single_writer(self.__async_engine)
+
+        Model.set_async_engine(self.__async_engine)
+        Model.set_async_read_engines(*replicas)
+        for name, bind in binds.items():
+            Model.set_async_bind(name, bind)
+
+    def __create_engine(
+        self,
+        uri: Union[str, URL],
+        name: str,
+        section: Optional[SectionProxy] = None,
+    ) -> Engine:
+        """Creates an engine configured by a database section of the config
+        (the one of the environment by default)."""
+        section = section or self.config.database
+
+        try:
+            engine = create_engine(
+                uri,
+                echo=self.config.environment.getboolean("sqlalchemy_echo"),
+                **engine_options(section),
+            )
+        except TypeError as e:
+            raise ConfigError(f"Invalid database engine options: {e}") from e
+
+        self.__pool_monitors[name] = PoolMonitor(engine)
+        self.instrumentation.instrument(engine)
+        apply_sqlite_pragmas(engine, sqlite_pragmas(section))
+        return engine
+
+    def __create_async_engine(
+        self,
+        uri: Union[str, URL],
+        name: str,
+        section: Optional[SectionProxy] = None,
+    ) -> AsyncEngine:
+        """Asyncio version of `__create_engine`."""
+        section = section or self.config.database
+        engine = create_async_engine(
+            make_async_url(uri),
+            echo=self.config.environment.getboolean("sqlalchemy_echo"),
+            **engine_options(section),
+        )
+
+        self.__pool_monitors[name] = PoolMonitor(engine)
+        self.instrumentation.instrument(engine)
+        apply_sqlite_pragmas(engine, sqlite_pragmas(section))
+        return engine
+
+    @staticmethod
+    def __bind_engine(
+        name: str, section: SectionProxy, engines: List[EngineT]
+    ) -> Union[EngineT, ShardRouter[EngineT]]:
+        """Returns the engine of a named database, or its shard router when it
+        has several shards."""
+        if len(engines) == 1 and not section.get("shard_key"):
+            return engines[0]
+
+        if not section.get("shard_key"):
+            raise ConfigError(f"The sharded database '{name}' needs a 'shard_key'.")
+        return ShardRouter(section["shard_key"], engines)
 
     def unload_database(self):
         """Unloads the current database"""
 
         self.__engine = None
+        self.__async_engine = None
+        self.__pool_monitors.clear()
         self.__session = None
 
     def reload_database(self):
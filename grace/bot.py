@@ -1,16 +1,42 @@
 from logging import critical, info, warning
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from discord import Intents, LoginFailure
+from discord import Intents, Interaction, InteractionType, LoginFailure
 from discord import Object as DiscordObject
+from discord.app_commands import CommandTree as DiscordCommandTree
 from discord.ext.commands import Bot as DiscordBot
 from discord.ext.commands import when_mentioned_or
 from discord.ext.commands.errors import ExtensionAlreadyLoaded, ExtensionNotLoaded
 
 from grace.application import Application, SectionProxy
+from grace.buffer import WriteBuffer
 from grace.watcher import Watcher
 
 
+class CommandTree(DiscordCommandTree):
+    """Command tree counting the queries of the application commands.
+
+    The queries run by an application command are recorded in its stats and
+    checked against its query budget, like the ones of the prefix commands.
+    Autocompletions are not command invocations and are not recorded.
+
+    discord.py has no public hook wrapping the execution of an application
+    command, so the private `CommandTree._call` of discord.py 2.x is extended
+    (the version is pinned below 3 and the override is checked by the tests).
+    """
+
+    async def _call(self, interaction: Interaction) -> None:
+        command = interaction.command
+        if command is None or interaction.type is InteractionType.autocomplete:
+            return await super()._call(interaction)
+
+        with self.client.app.instrumentation.track(  # type: ignore[attr-defined]
+            command.qualified_name,
+            getattr(getattr(command, "callback", None), "__query_budget__", None),
+        ):
+            await super()._call(interaction)
+
+
 class Bot(DiscordBot):
     """This class is the core of the bot
 
@@ -32,11 +58,13 @@ class Bot(DiscordBot):
         )
         description: str = kwargs.pop("description", self.config.get("description"))
         intents: Intents = kwargs.pop("intents", Intents.default())
+        tree_cls = kwargs.pop("tree_cls", CommandTree)
 
         super().__init__(
             command_prefix=command_prefix,
             description=description,
             intents=intents,
+            tree_cls=tree_cls,
             **kwargs,
         )
 
@@ -54,12 +82,20 @@ class Bot(DiscordBot):
             await self.tree.sync(guild=guild)
 
     async def invoke(self, ctx):
-        if ctx.command:
-            info(
-                f"'{ctx.command}' has been invoked by {ctx.author} "
-                f"({ctx.author.display_name})"
-            )
-        await super().invoke(ctx)
+        if not ctx.command:
+            return await super().invoke(ctx)
+
+        info(
+            f"'{ctx.command}' has been invoked by {ctx.author} "
+            f"({ctx.author.display_name})"
+        )
+
+        # The queries run by the command are recorded in its stats
+        with self.app.instrumentation.track(
+            ctx.command.qualified_name,
+            getattr(ctx.command.callback, "__query_budget__", None),
+        ):
+            await super().invoke(ctx)
 
     async def setup_hook(self) -> None:
         await self.load_extensions()
@@ -70,8 +106,20 @@ class Bot(DiscordBot):
         if self.app.watch:
             self.watcher.start()
 
+        self.scheduler.add_job(
+            WriteBuffer.flush_all_async,
+            "interval",
+            seconds=self.app.config.database.getfloat("buffer_flush_interval", 5.0),
+        )
         self.scheduler.start()
 
+    async def close(self) -> None:
+        """Flushes the write buffers before closing the bot."""
+        try:
+            await WriteBuffer.flush_all_async()
+        finally:
+            await super().close()
+
     async def load_extension(self, name: str) -> None:  # type: ignore[override]
         try:
             await super().load_extension(name)
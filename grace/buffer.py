@@ -0,0 +1,242 @@
+from asyncio import to_thread
+from logging import error
+from threading import Lock
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple, Type, Union
+
+from sqlalchemy import bindparam, inspect, update
+from sqlmodel import Session
+
+from grace.exceptions import BufferFlushError
+
+if TYPE_CHECKING:
+    from grace.model import Model
+
+
+class _PendingChanges:
+    """The coalesced changes waiting to be written for a single record."""
+
+    __slots__ = ("increments", "values")
+
+    def __init__(self) -> None:
+        self.increments: Dict[str, Any] = {}
+        self.values: Dict[str, Any] = {}
+
+    def increment(self, column: str, by: Any) -> None:
+        if column in self.values:
+            self.values[column] += by
+        else:
+            self.increments[column] = self.increments.get(column, 0) + by
+
+    def set(self, column: str, value: Any) -> None:
+        self.increments.pop(column, None)
+        self.values[column] = value
+
+    def merge(self, other: "_PendingChanges") -> None:
+        """Applies changes that were made before the ones of this record."""
+        for column, by in other.increments.items():
+            if column not in self.values:
+                self.increments[column] = self.increments.get(column, 0) + by
+
+        for column, value in other.values.items():
+            if column in self.values:
+                continue
+            if column in self.increments:
+                value += self.increments.pop(column)
+            self.values[column] = value
+
+    @property
+    def shape(self) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """The columns changed, records of the same shape share a statement."""
+        return tuple(sorted(self.increments)), tuple(sorted(self.values))
+
+
+class WriteBuffer:
+    """Write-behind buffer coalescing high-frequency writes of a model.
+
+    Instead of writing each change immediately, the changes are accumulated
+    in memory, coalesced by primary key, and written in batches when the
+    buffer is flushed. Ten increments of the same counter result in a single
+    `UPDATE` setting `counter = counter + 10`.
+
+    The buffers are flushed periodically by the bot scheduler (every
+    `buffer_flush_interval` seconds of the database config) and once more
+    when the bot closes. Buffered changes are lost if the process crashes
+    before they are flushed, only use it for data that can tolerate it.
+
+    ## Examples
+    ```python
+    User.buffered().increment(user_id, "messages")
+    User.buffered().update(user_id, last_seen=datetime.now())
+
+    User.buffered().stats  # {"depth": 2, "flushes": 0, ...}
+    ```
+    """
+
+    _buffers: Dict[Type["Model"], "WriteBuffer"] = {}
+
+    def __init__(self, model_class: Type["Model"]) -> None:
+        self.model_class: Type["Model"] = model_class
+
+        self.__lock: Lock = Lock()
+        self.__pending: Dict[Any, _PendingChanges] = {}
+
+        self.flushes: int = 0
+        self.flushed: int = 0
+        self.last_flush_latency: float = 0.0
+        self.max_flush_latency: float = 0.0
+
+    @classmethod
+    def for_model(cls, model_class: Type["Model"]) -> "WriteBuffer":
+        """Returns the buffer of the given model, creating it if needed."""
+        if model_class not in cls._buffers:
+            cls._buffers[model_class] = cls(model_class)
+        return cls._buffers[model_class]
+
+    @classmethod
+    def flush_all(cls) -> int:
+        """Flushes the buffers of every model and returns the written records.
+
+        A failing buffer doesn't prevent the others from being flushed, a
+        `BufferFlushError` is raised once every buffer has been tried.
+        """
+        flushed = 0
+        errors: Dict[str, Exception] = {}
+
+        for buffer in list(cls._buffers.values()):
+            try:
+                flushed += buffer.flush()
+            except Exception as e:
+                errors[buffer.model_class.__name__] = e
+
+        if errors:
+            raise BufferFlushError(errors, flushed)
+        return flushed
+
+    @classmethod
+    async def flush_all_async(cls) -> int:
+        """Flushes the buffers of every model without blocking the event loop."""
+        return await to_thread(cls.flush_all)
+
+    @property
+    def depth(self) -> int:
+        """The number of records waiting to be written."""
+        return len(self.__pending)
+
+    @property
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """The queue depth and flush metrics of the buffer."""
+        return {
+            "depth": self.depth,
+            "flushes": self.flushes,
+            "flushed": self.flushed,
+            "last_flush_latency": self.last_flush_latency,
+            "max_flush_latency": self.max_flush_latency,
+        }
+
+    def increment(self, pk: Any, column: str, by: Any = 1) -> None:
+        """Buffers an increment of a column of the record with the given key."""
+        self.__validate_column(column)
+
+        with self.__lock:
+            self.__changes(pk).increment(column, by)
+
+    def decrement(self, pk: Any, column: str, by: Any = 1) -> None:
+        """Buffers a decrement of a column of the record with the given key."""
+        self.increment(pk, column, -by)
+
+    def update(self, pk: Any, **values: Any) -> None:
+        """Buffers new values for the record with the given key.
+
+        Only the latest value of a column is written when the buffer is flushed.
+        """
+        for column in values:
+            self.__validate_column(column)
+
+        with self.__lock:
+            changes = self.__changes(pk)
+            for column, value in values.items():
+                changes.set(column, value)
+
+    def flush(self) -> int:
+        """Writes the pending changes and returns the number of records written.
+
+        Records changing the same columns are written by a single `executemany`
+        statement. If the flush fails, the changes are put back in the buffer.
+        """
+        with self.__lock:
+            pending, self.__pending = self.__pending, {}
+
+        if not pending:
+            return 0
+
+        start = perf_counter()
+        try:
+            self.__write(pending)
+        except Exception as e:
+            error(f"Unable to flush the {self.model_class.__name__} buffer: {e}")
+            self.__restore(pending)
+            raise
+
+        latency = perf_counter() - start
+
+        self.flushes += 1
+        self.flushed += len(pending)
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+
+        return len(pending)
+
+    async def flush_async(self) -> int:
+        """Flushes the buffer without blocking the event loop."""
+        return await to_thread(self.flush)
+
+    def __changes(self, pk: Any) -> _PendingChanges:
+        if pk not in self.__pending:
+            self.__pending[pk] = _PendingChanges()
+        return self.__pending[pk]
+
+    def __restore(self, pending: Dict[Any, _PendingChanges]) -> None:
+        with self.__lock:
+            for pk, changes in pending.items():
+                if pk in self.__pending:
+                    self.__pending[pk].merge(changes)
+                else:
+                    self.__pending[pk] = changes
+
+    def __validate_column(self, column: str) -> None:
+        if column not in self.model_class.__table__.columns:
+            raise AttributeError(
+                f"{self.model_class.__name__} has no column '{column}'"
+            )
+
+    def __write(self, pending: Dict[Any, _PendingChanges]) -> None:
+        table = self.model_class.__table__
+        pk_columns = inspect(self.model_class).primary_key
+        batches: Dict[Tuple, List[Dict[str, Any]]] = {}
+
+        for pk, changes in pending.items():
+            identity = pk if isinstance(pk, tuple) else (pk,)
+            params = {f"_pk_{c.key}": v for c, v in zip(pk_columns, identity)}
+            params.update({f"_by_{c}": v for c, v in changes.increments.items()})
+            params.update({f"_set_{c}": v for c, v in changes.values.items()})
+
+            batches.setdefault(changes.shape, []).append(params)
+
+        with Session(self.model_class.get_engine()) as session:
+            for (increments, values), rows in batches.items():
+                statement = update(table).values(
+                    {
+                        **{c: table.c[c] + bindparam(f"_by_{c}") for c in increments},
+                        **{c: bindparam(f"_set_{c}") for c in values},
+                    }
+                )
+
+                for column in pk_columns:
+                    statement = statement.where(
+                        column == bindparam(f"_pk_{column.key}")
+                    )
+                session.exec(statement, params=rows)
+            session.commit()
+
+        self.model_class._invalidate(*pending)
@@ -0,0 +1,186 @@
+from collections import OrderedDict
+from hashlib import sha256
+from pathlib import Path
+from pickle import HIGHEST_PROTOCOL, dumps, loads
+from threading import RLock
+from time import monotonic
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple, Union
+
+MISSING: Any = object()
+
+
+class MemoryCache:
+    """In-process LRU cache with TTL expiration and tag invalidation.
+
+    When the cache is full, the least recently used entry is evicted. Entries
+    can be tagged so that every entry sharing a tag is invalidated at once.
+
+    ## Examples
+    ```python
+    cache = MemoryCache(max_size=1000, ttl=60)
+    cache.set("key", value, tags=["user"])
+
+    cache.get("key")  # value
+    cache.invalidate("user")
+    cache.get("key", None)  # None
+    ```
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None) -> None:
+        if max_size < 1:
+            raise ValueError("The cache size must be at least 1")
+
+        self.max_size: int = max_size
+        self.ttl: Optional[float] = ttl
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        self._lock: RLock = RLock()
+        self._entries: OrderedDict[Hashable, Tuple[Optional[float], Any, Tuple]] = (
+            OrderedDict()
+        )
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, MISSING, count=False) is not MISSING
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """The hit, miss and eviction counters of the cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self),
+        }
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """Returns the value of the given key or `default` if it's not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] is not None and entry[0] < monotonic():
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return default
+
+            if count:
+                self.hits += 1
+            self._entries.move_to_end(key)
+            return self._load(key, entry[1])
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        tags: Iterable[Hashable] = (),
+    ) -> None:
+        """Caches a value, evicting the least recently used entries if needed.
+
+        The `ttl` defaults to the one of the cache, `None` means no expiration.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else monotonic() + ttl
+        tags = tuple(tags)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (expires_at, self._store(key, value), tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        """Removes the given key from the cache."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate(self, tag: Hashable) -> None:
+        """Removes every entry tagged with the given tag."""
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Removes every entry from the cache."""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        _, stored, tags = self._entries.pop(key)
+
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        self._discard(key, stored)
+
+    def _store(self, key: Hashable, value: Any) -> Any:
+        """Returns what is kept in memory for the value of an entry."""
+        return value
+
+    def _load(self, key: Hashable, stored: Any) -> Any:
+        """Returns the value of an entry from what is kept in memory."""
+        return stored
+
+    def _discard(self, key: Hashable, stored: Any) -> None:
+        """Releases what was kept for an entry that was removed."""
+        pass
+
+
+class FileCache(MemoryCache):
+    """LRU cache storing its values as files in a local directory.
+
+    Only the keys, tags and expiration times are kept in memory, which makes it
+    suitable to cache large results. The values must be picklable and the
+    cache is cleared when the application restarts.
+
+    ## Examples
+    ```python
+    Model.set_query_cache(FileCache("tmp/cache", max_size=10_000))
+    ```
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+    ) -> None:
+        super().__init__(max_size, ttl)
+
+        self.directory: Path = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        for path in self.directory.glob("*.cache"):
+            path.unlink()
+
+    def _store(self, key: Hashable, value: Any) -> Path:
+        path = self.directory / f"{sha256(repr(key).encode()).hexdigest()}.cache"
+        path.write_bytes(dumps(value, protocol=HIGHEST_PROTOCOL))
+        return path
+
+    def _load(self, key: Hashable, stored: Path) -> Any:
+        return loads(stored.read_bytes())
+
+    def _discard(self, key: Hashable, stored: Path) -> None:
+        stored.unlink(missing_ok=True)
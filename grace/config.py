@@ -2,7 +2,7 @@ from ast import literal_eval
 from configparser import BasicInterpolation, ConfigParser, NoOptionError, SectionProxy
 from os import path
 from re import match
-from typing import Any, Mapping, MutableMapping, Optional, Union
+from typing import Any, Dict, List, Mapping, MutableMapping, Optional, Union
 
 from dotenv import load_dotenv
 from sqlalchemy.engine import URL
@@ -10,6 +10,11 @@ from sqlalchemy.engine import URL
 ConfigValue = Optional[Union[str, int, float, bool, list]]
 
 
+def _split_urls(value: str) -> List[str]:
+    """Splits a comma separated list of urls."""
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
 class EnvironmentInterpolation(BasicInterpolation):
     """Interpolation which expands environment variables in values.
 
@@ -102,16 +107,62 @@ class Config:
 
     @property
     def database_uri(self) -> Union[str, URL, None]:
-        if self.database.get("url"):
-            return self.database.get("url")
+        return self.section_uri(self.database, self.database_name)
+
+    @property
+    def database_replica_uris(self) -> List[str]:
+        """The urls of the read replicas of the database, if any.
+
+        Replicas are set by the `replicas` option of the database section, as
+        a comma separated list of urls.
+        """
+        return _split_urls(self.database.get("replicas", ""))
+
+    @property
+    def database_binds(self) -> Dict[str, SectionProxy]:
+        """The sections of the named databases of the environment, by name.
+
+        A named database is configured like the default one, in a section
+        called `[database.<env>.<name>]`.
+        """
+        prefix = f"database.{self.__environment}."
+        return {
+            name[len(prefix) :]: self.__config[name]
+            for name in self.__config.sections()
+            if name.startswith(prefix)
+        }
+
+    def bind_uris(self, name: str) -> List[Union[str, URL]]:
+        """Returns the urls of a named database: its shards if it's sharded.
+
+        :param name: The name of the database.
+        :type name: str
+        """
+        section = self.database_binds[name]
+        shards = _split_urls(section.get("shards", ""))
+
+        if shards:
+            return list(shards)
+        return [self.section_uri(section, f"{self.database_name}_{name}")]
+
+    def section_uri(self, section: SectionProxy, default_name: str) -> Union[str, URL]:
+        """Returns the url of the database configured by a section.
+
+        :param section: The database section.
+        :type section: SectionProxy
+        :param default_name: The database name used if the section has none.
+        :type default_name: str
+        """
+        if section.get("url"):
+            return section["url"]
 
         return URL.create(
-            self.database.get("adapter", "sqlite"),
-            self.database.get("user"),
-            self.database.get("password"),
-            self.database.get("host"),
-            self.database.getint("port"),
-            self.database.get("database", self.database_name),
+            section.get("adapter", "sqlite"),
+            section.get("user"),
+            section.get("password"),
+            section.get("host"),
+            section.getint("port"),
+            section.get("database", default_name),
         )
 
     @property
@@ -0,0 +1,349 @@
+from ast import literal_eval
+from asyncio import Lock as AsyncLock
+from configparser import ConfigParser, SectionProxy
+from contextlib import asynccontextmanager
+from threading import Lock
+from time import perf_counter
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Generic,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
+from weakref import WeakKeyDictionary
+from zlib import crc32
+
+from sqlalchemy import event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import Pool
+
+from grace.exceptions import ConfigError
+
+EngineT = TypeVar("EngineT", Engine, AsyncEngine)
+
+ASYNC_DRIVERS: Dict[str, str] = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+    "mariadb": "aiomysql",
+}
+
+
+def _boolean(value: str) -> bool:
+    if value.lower() not in ConfigParser.BOOLEAN_STATES:
+        raise ValueError(f"Not a boolean: {value}")
+    return ConfigParser.BOOLEAN_STATES[value.lower()]
+
+
+# The engine options that can be set in the `[database.<env>]` config section
+ENGINE_OPTIONS: Dict[str, Callable[[str], Any]] = {
+    "pool_size": int,
+    "max_overflow": int,
+    "pool_recycle": int,
+    "pool_timeout": float,
+    "pool_pre_ping": _boolean,
+    "query_cache_size": int,
+    "connect_args": literal_eval,
+}
+
+
+def _choice(*choices: str) -> Callable[[str], str]:
+    def convert(value: str) -> str:
+        if value.upper() not in choices:
+            raise ValueError(f"'{value}' is not one of {', '.join(choices)}")
+        return value.upper()
+
+    return convert
+
+
+# The SQLite pragmas that can be set in the config, applied on every connection
+SQLITE_PRAGMAS: Dict[str, Callable[[str], Any]] = {
+    "journal_mode": _choice("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"),
+    "synchronous": _choice("OFF", "NORMAL", "FULL", "EXTRA"),
+    "mmap_size": int,
+    "cache_size": int,
+    "busy_timeout": int,
+}
+
+# Presets of pragmas selected by the `sqlite_profile` option
+SQLITE_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Readers don't wait on the writer, and commits don't wait for the disk
+    # (a power loss can lose the last commits, but never corrupt the database).
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268_435_456,
+        "cache_size": -64_000,
+        "busy_timeout": 5_000,
+    },
+}
+
+_writer_locks: "WeakKeyDictionary[AsyncEngine, AsyncLock]" = WeakKeyDictionary()
+
+
+def make_async_url(url: Union[str, URL]) -> URL:
+    """Returns the asyncio equivalent of the given database url.
+
+    Urls using a driver that already supports asyncio (ex. `postgresql+psycopg`)
+    are returned unchanged. Otherwise, the driver is replaced by the default
+    asyncio driver of the dialect (ex. `sqlite` becomes `sqlite+aiosqlite`).
+
+    :param url: The database url used by the synchronous engine.
+    :type url: Union[str, URL]
+    """
+    url = make_url(url)
+
+    if "+" in url.drivername:
+        dialect = url.get_dialect()
+        if dialect.get_async_dialect_cls(url).is_async:
+            return url
+
+    backend = url.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+
+    if driver is None:
+        raise ValueError(f"No asyncio driver known for '{backend}'")
+    return url.set(drivername=f"{backend}+{driver}")
+
+
+def engine_options(section: SectionProxy) -> Dict[str, Any]:
+    """Returns the engine options set in a database config section.
+
+    Only the options present in the section are returned, the others keep
+    the defaults of SQLAlchemy (and of the dialect).
+
+    :param section: The `[database.<env>]` section of the config.
+    :type section: SectionProxy
+    """
+    options: Dict[str, Any] = {}
+
+    for key, convert in ENGINE_OPTIONS.items():
+        if not section.get(key):
+            continue
+        try:
+            options[key] = convert(section[key])
+        except (ValueError, SyntaxError) as e:
+            raise ConfigError(f"Invalid database option '{key}': {e}") from e
+
+    if not isinstance(options.get("connect_args", {}), dict):
+        raise ConfigError("The database option 'connect_args' must be a dict.")
+    return options
+
+
+def sqlite_pragmas(section: SectionProxy) -> Dict[str, Any]:
+    """Returns the SQLite pragmas set in a database config section.
+
+    The `sqlite_profile` option selects a preset of `SQLITE_PROFILES`, and the
+    pragmas set individually take precedence over the ones of the profile.
+
+    :param section: The `[database.<env>]` section of the config.
+    :type section: SectionProxy
+    """
+    profile = section.get("sqlite_profile")
+    if profile and profile not in SQLITE_PROFILES:
+        raise ConfigError(f"Unknown SQLite profile '{profile}'.")
+
+    pragmas = dict(SQLITE_PROFILES[profile]) if profile else {}
+
+    for key, convert in SQLITE_PRAGMAS.items():
+        if not section.get(key):
+            continue
+        try:
+            pragmas[key] = convert(section[key])
+        except ValueError as e:
+            raise ConfigError(f"Invalid SQLite pragma '{key}': {e}") from e
+    return pragmas
+
+
+def apply_sqlite_pragmas(
+    engine: Union[Engine, AsyncEngine], pragmas: Dict[str, Any]
+) -> None:
+    """Executes the given pragmas on every new connection of a SQLite engine.
+
+    :param engine: The SQLite engine, synchronous or asyncio.
+    :type engine: Union[Engine, AsyncEngine]
+    :param pragmas: The pragmas and their values (see `sqlite_pragmas`).
+    :type pragmas: Dict[str, Any]
+    """
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    statements = [f"PRAGMA {key} = {value}" for key, value in pragmas.items()]
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def enable_single_writer(engine: AsyncEngine) -> None:
+    """Serializes the asyncio writes done by the models on the given engine.
+
+    SQLite allows a single writer at a time, concurrent commands writing at
+    the same time wait on the database lock (and fail after `busy_timeout`).
+    With a single writer, the writes of the models are queued in the event
+    loop instead, in the order they were made.
+
+    :param engine: The asyncio engine.
+    :type engine: AsyncEngine
+    """
+    if engine not in _writer_locks:
+        _writer_locks[engine] = AsyncLock()
+
+
+@asynccontextmanager
+async def writer_lock(engine: AsyncEngine) -> AsyncIterator[None]:
+    """Waits for the turn of the writer when the engine has a single writer."""
+    lock = _writer_locks.get(engine)
+    if lock is None:
+        yield
+        return
+
+    async with lock:
+        yield
+
+
+class PoolMonitor:
+    """Collects the usage metrics of the connection pool of an engine.
+
+    The checkouts are timed, which gives the time spent waiting for a
+    connection when the pool is exhausted. Along with the size, overflow and
+    peak of checked out connections, it helps to size the pool against the
+    real concurrency of the bot.
+
+    ## Examples
+    ```python
+    monitor = PoolMonitor(engine)
+    monitor.stats  # {"size": 5, "checked_out": 1, "wait_time": 0.002, ...}
+    ```
+    """
+
+    def __init__(self, engine: Union[Engine, AsyncEngine]) -> None:
+        if isinstance(engine, AsyncEngine):
+            engine = engine.sync_engine
+
+        self.pool: Pool = engine.pool
+        self.connections: int = 0
+        self.checkouts: int = 0
+        self.peak_checked_out: int = 0
+        self.wait_time: float = 0.0
+        self.max_wait_time: float = 0.0
+
+        self.__lock: Lock = Lock()
+        self.__checked_out: int = 0
+
+        self.__connect = self.pool.connect
+        self.pool.connect = self.__timed_connect  # type: ignore[method-assign]
+
+        event.listen(self.pool, "connect", self.__on_connect)
+        event.listen(self.pool, "checkout", self.__on_checkout)
+        event.listen(self.pool, "checkin", self.__on_checkin)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """The state of the pool and the checkout metrics since its creation."""
+
+        def pool_value(name: str) -> Any:
+            method = getattr(self.pool, name, None)
+            return method() if method is not None else None
+
+        return {
+            "size": pool_value("size"),
+            "checked_in": pool_value("checkedin"),
+            "checked_out": pool_value("checkedout"),
+            "overflow": pool_value("overflow"),
+            "connections": self.connections,
+            "checkouts": self.checkouts,
+            "peak_checked_out": self.peak_checked_out,
+            "wait_time": self.wait_time,
+            "max_wait_time": self.max_wait_time,
+        }
+
+    def __timed_connect(self) -> Any:
+        start = perf_counter()
+        try:
+            return self.__connect()
+        finally:
+            latency = perf_counter() - start
+            with self.__lock:
+                self.wait_time += latency
+                self.max_wait_time = max(self.max_wait_time, latency)
+
+    def __on_connect(self, dbapi_connection: Any, connection_record: Any) -> None:
+        with self.__lock:
+            self.connections += 1
+
+    def __on_checkout(self, *args: Any) -> None:
+        with self.__lock:
+            self.checkouts += 1
+            self.__checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.__checked_out)
+
+    def __on_checkin(self, *args: Any) -> None:
+        with self.__lock:
+            self.__checked_out -= 1
+
+
+class ShardRouter(Generic[EngineT]):
+    """Routes the records of a sharded model to the engine of their shard.
+
+    The shard of a record is picked from the value of its shard key column
+    (ex. `guild_id`): integers are used as is and other values are hashed,
+    then the shard is the remainder of the division by the number of shards.
+    A custom `key` function can map the values to shard numbers instead.
+
+    ## Examples
+    ```python
+    router = ShardRouter("guild_id", [first_engine, second_engine])
+    router.route(guild_id)  # The engine of the shard of the guild
+
+    Model.set_bind("messages", router)
+
+    class Message(Model):
+        __bind__ = "messages"
+    ```
+    """
+
+    def __init__(
+        self,
+        column: str,
+        engines: Sequence[EngineT],
+        key: Optional[Callable[[Any], int]] = None,
+    ) -> None:
+        if not engines:
+            raise ValueError("A shard router needs at least one engine")
+
+        self.column: str = column
+        self.engines: Sequence[EngineT] = engines
+        self.key: Optional[Callable[[Any], int]] = key
+
+    def shard(self, value: Any) -> int:
+        """Returns the number of the shard of the given shard key value."""
+        if value is None:
+            raise ValueError(f"The shard key '{self.column}' can't be None")
+
+        if self.key is not None:
+            number = self.key(value)
+        elif isinstance(value, int):
+            number = value
+        else:
+            # Unlike `hash`, stable between processes
+            number = crc32(str(value).encode())
+        return number % len(self.engines)
+
+    def route(self, value: Any) -> EngineT:
+        """Returns the engine of the shard of the given shard key value."""
+        return self.engines[self.shard(value)]
@@ -1,3 +1,9 @@
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from grace.instrumentation import QueryReport
+
+
 class GraceError(Exception):
     """Base exception for Grace.
 
@@ -32,3 +38,38 @@ class ValidationError(GeneratorError):
     """Exception raised for validation errors inside a generator."""
 
     pass
+
+
+class RecordNotFoundError(GraceError):
+    """Exception raised when some of the requested records do not exist."""
+
+    def __init__(self, model_name: str, missing: List[Any]) -> None:
+        self.model_name: str = model_name
+        self.missing: List[Any] = missing
+        super().__init__(f"{model_name} records not found: {missing}")
+
+
+class QueryBudgetError(GraceError):
+    """Exception raised when a command exceeds its query budget.
+
+    It is only raised when the N+1 detection is set to `raise`, generally in
+    the test environment.
+    """
+
+    def __init__(self, report: "QueryReport") -> None:
+        self.report: "QueryReport" = report
+        super().__init__(str(report))
+
+
+class BufferFlushError(GraceError):
+    """Exception raised when some write buffers could not be flushed.
+
+    The changes of the failed buffers are kept in them to be written by the
+    next flush, the other buffers are flushed normally.
+    """
+
+    def __init__(self, errors: Dict[str, Exception], flushed: int) -> None:
+        self.errors: Dict[str, Exception] = errors
+        self.flushed: int = flushed
+        failures = ", ".join(f"{name} ({error})" for name, error in errors.items())
+        super().__init__(f"Unable to flush the buffers of: {failures}")
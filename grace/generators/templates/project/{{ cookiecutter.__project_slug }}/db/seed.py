@@ -17,6 +17,13 @@ def seed_database():
     model.save()
 ```
 
+When seeding a large amount of data, prefer `insert_all` which inserts the
+records in batches instead of one at a time.
+
+```python
+Model.insert_all([{"name": f"Example {i}"} for i in range(10_000)])
+```
+
 If you have multiple seed file or prefer a structured approach, consider
 creating a `db/seeds/` directory to organize your seeding scripts.
 You can then import and execute these modules within this script as needed.
@@ -0,0 +1,494 @@
+import sys
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from logging import warning
+from math import inf
+from os.path import dirname
+from re import IGNORECASE, compile
+from sysconfig import get_paths
+from threading import Lock
+from time import perf_counter
+from types import FrameType
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from grace.exceptions import QueryBudgetError
+
+try:
+    from greenlet import getcurrent
+except ImportError:  # pragma: no cover
+    getcurrent = None
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+N_PLUS_ONE_MODES: Tuple[str, ...] = ("off", "warn", "raise")
+
+_STRING = compile(r"'(?:[^']|'')*'")
+_NUMBER = compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", IGNORECASE)
+_VALUES_LIST = compile(
+    r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+"
+)
+_PARAMETER = compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+")
+_WHITESPACE = compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(statement: str) -> str:
+    """Returns the shape of a SQL statement, without its values.
+
+    Literals and parameters are replaced by `?` and lists of values are
+    collapsed, so the statements differing only by their values (ex. the
+    number of ids of an `IN`) are grouped together. The shapes are memoized,
+    the same few statements being executed again and again.
+
+    ## Examples
+    ```python
+    normalize_sql("SELECT * FROM user WHERE id IN (?, ?, ?) AND age > 18")
+    # "SELECT * FROM user WHERE id IN (...) AND age > ?"
+    ```
+    """
+    statement = _STRING.sub("?", statement)
+    statement = _PARAMETER.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _IN_LIST.sub("IN (...)", statement)
+    statement = _VALUES_LIST.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class LatencyHistogram:
+    """Distribution of latencies, counted in fixed buckets (in seconds)."""
+
+    BUCKETS: List[float] = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, inf]
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * len(self.BUCKETS)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def record(self, latency: float) -> None:
+        self.counts[bisect_left(self.BUCKETS, latency)] += 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    def percentile(self, percent: float) -> float:
+        """Returns the upper bound of the bucket of the given percentile.
+
+        The latency of the slowest record is returned for the last bucket.
+        """
+        if not self.count:
+            return 0.0
+
+        rank = percent / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.BUCKETS, self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(bound, self.max)
+        return self.max
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class SlowQuery(NamedTuple):
+    """A statement slower than the slow query threshold."""
+
+    statement: str
+    latency: float
+    command: Optional[str]
+
+
+class CommandStats:
+    """The database usage of a command, over all its invocations."""
+
+    __slots__ = ("invocations", "queries", "db_time", "max_queries", "max_db_time")
+
+    def __init__(self) -> None:
+        self.invocations: int = 0
+        self.queries: int = 0
+        self.db_time: float = 0.0
+        self.max_queries: int = 0
+        self.max_db_time: float = 0.0
+
+    def record(self, queries: int, db_time: float) -> None:
+        self.invocations += 1
+        self.queries += queries
+        self.db_time += db_time
+        self.max_queries = max(self.max_queries, queries)
+        self.max_db_time = max(self.max_db_time, db_time)
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        invocations = self.invocations or 1
+        return {
+            "invocations": self.invocations,
+            "queries": self.queries,
+            "db_time": self.db_time,
+            "queries_per_invocation": self.queries / invocations,
+            "db_time_per_invocation": self.db_time / invocations,
+            "max_queries": self.max_queries,
+            "max_db_time": self.max_db_time,
+        }
+
+
+class QueryOrigin(NamedTuple):
+    """Where a statement comes from: the model and relationship it loads, if
+    known, and the line of the application code that executed it."""
+
+    model: Optional[str]
+    relationship: Optional[str]
+    call_site: Optional[str]
+
+    def __str__(self) -> str:
+        parts = []
+        if self.model is not None:
+            target = self.model
+            if self.relationship is not None:
+                target += f".{self.relationship}"
+            parts.append(target)
+        if self.call_site is not None:
+            parts.append(f"at {self.call_site}")
+        return " ".join(parts) or "unknown origin"
+
+
+class RepeatedStatement(NamedTuple):
+    """A statement executed several times by a command, only its values differ."""
+
+    statement: str
+    executions: int
+    origin: Optional[QueryOrigin]
+
+
+class QueryReport(NamedTuple):
+    """The statements of a command that exceeded its query budget."""
+
+    command: str
+    queries: int
+    budget: Optional[int]
+    repeated: List[RepeatedStatement]
+
+    def __str__(self) -> str:
+        budget = f" for a budget of {self.budget}" if self.budget is not None else ""
+        lines = [f"'{self.command}' executed {self.queries} queries{budget}"]
+
+        for repeated in self.repeated:
+            lines.append(
+                f"  {repeated.executions} x {repeated.statement}\n"
+                f"    from {repeated.origin or 'unknown origin'}"
+            )
+        return "\n".join(lines)
+
+
+class Invocation:
+    """The statements executed while running a command."""
+
+    __slots__ = (
+        "command",
+        "queries",
+        "db_time",
+        "statements",
+        "budget",
+        "origins",
+        "origin",
+    )
+
+    def __init__(
+        self, command: str, budget: Optional[int] = None, detect: bool = False
+    ) -> None:
+        self.command: str = command
+        self.queries: int = 0
+        self.db_time: float = 0.0
+        self.statements: List[str] = []
+        self.budget: Optional[int] = budget
+
+        # The origin of the first execution of each statement, when detecting
+        # N+1 queries, and the one of the ORM statement being executed
+        self.origins: Optional[Dict[str, QueryOrigin]] = {} if detect else None
+        self.origin: Optional[Tuple[Optional[str], Optional[str]]] = None
+
+    def repeated(self, threshold: int) -> List[RepeatedStatement]:
+        """Returns the statements executed at least `threshold` times."""
+        origins = self.origins or {}
+        return [
+            RepeatedStatement(statement, count, origins.get(statement))
+            for statement, count in Counter(self.statements).most_common()
+            if count >= threshold
+        ]
+
+
+_invocation: ContextVar[Optional[Invocation]] = ContextVar("invocation", default=None)
+
+# The frames of these directories are skipped to find the call site of a query
+_LIBRARY_PATHS: Tuple[str, ...] = tuple(
+    {dirname(__file__)} | {get_paths()[name] for name in ("stdlib", "purelib")}
+)
+
+
+def _call_site() -> Optional[str]:
+    """Returns the first frame of the application code in the current stack.
+
+    The statements of the asyncio engines are executed in a greenlet, the
+    stack of the coroutine awaiting them is the one of the parent greenlet.
+    """
+    frame: Optional[FrameType] = sys._getframe(1)
+    current = getcurrent() if getcurrent is not None else None
+
+    while True:
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if not filename.startswith(_LIBRARY_PATHS + ("<",)):
+                return f"{filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+            frame = frame.f_back
+
+        if current is None or current.parent is None:
+            return None
+        current = current.parent
+        frame = current.gr_frame
+
+
+def _record_origin(state: ORMExecuteState) -> None:
+    """Keeps the model and relationship of the ORM statement being executed."""
+    invocation = _invocation.get()
+    if invocation is None or invocation.origins is None:
+        return
+
+    path = state.loader_strategy_path
+    if state.is_relationship_load and path is not None and len(path) >= 2:
+        # The path ends by the mapper of the parent and its relationship
+        parent: Any = path[-2]
+        relationship: Any = path[-1]
+        invocation.origin = (parent.class_.__name__, relationship.key)
+    elif state.all_mappers:
+        invocation.origin = (state.all_mappers[0].class_.__name__, None)
+    else:
+        invocation.origin = None
+
+
+def query_budget(queries: int) -> Callable[[F], F]:
+    """Sets the maximum number of queries of a command.
+
+    It overrides the `query_budget` of the environment for the decorated
+    command and is checked when the N+1 detection is enabled.
+
+    ## Examples
+    ```python
+    @commands.hybrid_command()
+    @query_budget(3)
+    async def profile(self, ctx: Context) -> None:
+        ...
+    ```
+    """
+
+    def decorator(func: F) -> F:
+        setattr(getattr(func, "callback", func), "__query_budget__", queries)
+        return func
+
+    return decorator
+
+
+class QueryInstrumentation:
+    """Records the latency of the statements executed by the instrumented engines.
+
+    Latencies are kept in a histogram per normalized statement, statements
+    slower than `slow_query_threshold` (in seconds) are logged, and the
+    statements executed while a command is `track`ed are counted for it.
+
+    In development and CI, the N+1 detection (`n_plus_one` set to `"warn"` or
+    `"raise"`) checks each tracked command once it has run: a report is logged
+    or raised as a `QueryBudgetError` when the command executed more queries
+    than its budget, or the same statement `n_plus_one_threshold` times or more
+    with different values (ex. a relationship lazy loaded in a loop). The
+    report names the model, the relationship and the call site of the
+    repeated statements.
+
+    ## Examples
+    ```python
+    instrumentation = QueryInstrumentation(slow_query_threshold=0.1)
+    instrumentation.instrument(engine)
+
+    with instrumentation.track("profile"):
+        User.find(1)
+
+    instrumentation.commands["profile"].stats  # {"queries": 1, ...}
+
+    instrumentation.n_plus_one = "raise"
+    with instrumentation.track("profile", budget=5):
+        for user in User.all():
+            user.posts  # QueryBudgetError: 'SELECT post... FROM post...' 10 times
+    ```
+    """
+
+    def __init__(
+        self,
+        slow_query_threshold: Optional[float] = 0.2,
+        max_slow_queries: int = 100,
+        n_plus_one: str = "off",
+        query_budget: Optional[int] = None,
+        n_plus_one_threshold: int = 3,
+    ) -> None:
+        self.slow_query_threshold: Optional[float] = slow_query_threshold
+        self.statements: Dict[str, LatencyHistogram] = {}
+        self.commands: Dict[str, CommandStats] = {}
+        self.slow_queries: Deque[SlowQuery] = deque(maxlen=max_slow_queries)
+
+        self.n_plus_one = n_plus_one
+        self.query_budget: Optional[int] = query_budget
+        self.n_plus_one_threshold: int = n_plus_one_threshold
+
+        self.__lock: Lock = Lock()
+
+    @property
+    def n_plus_one(self) -> str:
+        """What to do when a command exceeds its budget: off, warn or raise."""
+        return self.__n_plus_one
+
+    @n_plus_one.setter
+    def n_plus_one(self, mode: str) -> None:
+        if mode not in N_PLUS_ONE_MODES:
+            raise ValueError(
+                f"Invalid N+1 detection mode '{mode}', "
+                f"expected one of: {', '.join(N_PLUS_ONE_MODES)}"
+            )
+        self.__n_plus_one: str = mode
+
+    @staticmethod
+    def current() -> Optional[Invocation]:
+        """Returns the invocation of the command being run, if any."""
+        return _invocation.get()
+
+    def instrument(self, engine: Union[Engine, AsyncEngine]) -> None:
+        """Records the statements executed by the given engine."""
+        if isinstance(engine, AsyncEngine):
+            engine = engine.sync_engine
+
+        event.listen(engine, "before_cursor_execute", self.__before_execute)
+        event.listen(engine, "after_cursor_execute", self.__after_execute)
+        event.listen(engine, "handle_error", self.__on_error)
+
+        if not event.contains(Session, "do_orm_execute", _record_origin):
+            event.listen(Session, "do_orm_execute", _record_origin)
+
+    @contextmanager
+    def track(self, command: str, budget: Optional[int] = None) -> Iterator[Invocation]:
+        """Counts the statements executed in the block for the given command.
+
+        The `budget` overrides the `query_budget` of the instrumentation for
+        this command.
+        """
+        detect = self.n_plus_one != "off"
+        invocation = Invocation(
+            command, self.query_budget if budget is None else budget, detect
+        )
+        token = _invocation.set(invocation)
+
+        try:
+            yield invocation
+        finally:
+            _invocation.reset(token)
+            with self.__lock:
+                stats = self.commands.setdefault(command, CommandStats())
+                stats.record(invocation.queries, invocation.db_time)
+
+        # Not reached when the command failed, its error is more relevant
+        if detect:
+            self.check(invocation)
+
+    def check(self, invocation: Invocation) -> Optional[QueryReport]:
+        """Returns the report of an invocation that exceeded its query budget.
+
+        Depending on `n_plus_one`, the report is also logged or raised.
+        """
+        repeated = invocation.repeated(self.n_plus_one_threshold)
+        budget = invocation.budget
+
+        if not repeated and (budget is None or invocation.queries <= budget):
+            return None
+
+        report = QueryReport(invocation.command, invocation.queries, budget, repeated)
+        if self.n_plus_one == "raise":
+            raise QueryBudgetError(report)
+        if self.n_plus_one == "warn":
+            warning(f"N+1 detection: {report}")
+        return report
+
+    def reset(self) -> None:
+        """Clears the recorded statistics."""
+        with self.__lock:
+            self.statements.clear()
+            self.commands.clear()
+            self.slow_queries.clear()
+
+    def __before_execute(self, conn: Any, *args: Any) -> None:
+        conn.info.setdefault("query_start_time", []).append(perf_counter())
+
+    def __after_execute(
+        self, conn: Any, cursor: Any, statement: str, *args: Any
+    ) -> None:
+        latency = perf_counter() - conn.info["query_start_time"].pop()
+        normalized = normalize_sql(statement)
+        invocation = _invocation.get()
+
+        with self.__lock:
+            if normalized not in self.statements:
+                self.statements[normalized] = LatencyHistogram()
+            self.statements[normalized].record(latency)
+
+        if invocation is not None:
+            invocation.queries += 1
+            invocation.db_time += latency
+            invocation.statements.append(normalized)
+
+            if invocation.origins is not None:
+                if normalized not in invocation.origins:
+                    model, relationship = invocation.origin or (None, None)
+                    invocation.origins[normalized] = QueryOrigin(
+                        model, relationship, _call_site()
+                    )
+                invocation.origin = None
+
+        threshold = self.slow_query_threshold
+        if threshold is not None and latency >= threshold:
+            command = invocation.command if invocation is not None else None
+            self.slow_queries.append(SlowQuery(normalized, latency, command))
+
+            origin = f" in '{command}'" if command is not None else ""
+            warning(f"Slow query ({latency * 1000:.1f} ms){origin}: {normalized}")
+
+    def __on_error(self, context: Any) -> None:
+        if context.connection is not None:
+            starts = context.connection.info.get("query_start_time")
+            if starts:
+                starts.pop()
@@ -1,23 +1,467 @@
-from typing import TYPE_CHECKING, Any, List, Optional, Self, Type, TypeVar, Union
-
-from sqlalchemy import Engine
-from sqlalchemy.orm import selectinload
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from contextvars import ContextVar
+from copy import copy
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum as PyEnum
+from functools import partial, update_wrapper
+from itertools import count, groupby, islice
+from json import dumps, loads
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    ClassVar,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Self,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    overload,
+)
+from uuid import UUID as PyUUID
+
+from sqlalchemy import Engine, Row
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import (
+    RelationshipProperty,
+    defer,
+    joinedload,
+    selectinload,
+    subqueryload,
+)
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.base import PASSIVE_NO_RESULT, SQL_OK
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import (
+    BinaryExpression,
+    BindParameter,
+    BooleanClauseList,
+    UnaryExpression,
+)
+from sqlalchemy.sql.util import find_tables
+from sqlalchemy.types import TypeDecorator
 from sqlmodel import *
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.main import SQLModelMetaclass
 
+from grace.buffer import WriteBuffer
+from grace.cache import MISSING, MemoryCache
+from grace.engine import ShardRouter, writer_lock
+from grace.exceptions import RecordNotFoundError
+
 if TYPE_CHECKING:
     from sqlmodel import Session, SQLModel, func, select
     from sqlmodel.sql._expression_select_gen import Select, SelectOfScalar
 
 
 T = TypeVar("T", bound="Model")
+E = TypeVar("E")
+
+# Types that are not supported by JSON, encoded as {"$name": str(value)} in cursors
+CURSOR_TYPES: List[Tuple[type, str]] = [
+    (datetime, "$datetime"),
+    (date, "$date"),
+    (Decimal, "$decimal"),
+    (PyUUID, "$uuid"),
+]
+
+UPSERT_DIALECTS: Dict[str, Callable[[Any], Any]] = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+LOADING_STRATEGIES: Dict[str, Callable[..., Any]] = {
+    "selectin": selectinload,
+    "joined": joinedload,
+    "subquery": subqueryload,
+}
+
+
+def _batched(iterable: Iterable[E], size: int) -> Iterator[List[E]]:
+    """Splits an iterable into lists of at most `size` elements."""
+    if size < 1:
+        raise ValueError("Batch size must be at least 1")
+
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class _Transaction:
+    """The session shared by the operations of a `Model.transaction` block."""
+
+    __slots__ = ("session", "invalidations")
+
+    def __init__(self, session: Any) -> None:
+        self.session: Any = session
+        # The identities are None when only the cached queries are invalidated
+        self.invalidations: List[Tuple[Type["Model"], Optional[Tuple]]] = []
+
+
+# Rotates the read queries over the replicas of the models
+_read_turns: Iterator[int] = count()
+
+# The transactions opened in the current context, by engine
+_transactions: ContextVar[Dict[Any, _Transaction]] = ContextVar(
+    "transactions", default={}
+)
+
+
+@contextmanager
+def _session(engine: Engine, **options: Any) -> Iterator[Session]:
+    """
+    Yields the session of the transaction opened on the engine in the current
+    context, or a new session if there is none.
+    """
+    transaction = _transactions.get().get(engine)
+    if transaction is not None:
+        yield transaction.session
+        return
+
+    with Session(engine, **options) as session:
+        yield session
+
+
+@asynccontextmanager
+async def _async_session(
+    engine: AsyncEngine, write: bool = False, **options: Any
+) -> AsyncIterator[AsyncSession]:
+    """
+    Asynchronous version of `_session`.
+
+    New sessions used to `write` wait for their turn when the engine has a
+    single writer (see `enable_single_writer`).
+    """
+    transaction = _transactions.get().get(engine)
+    if transaction is not None:
+        yield transaction.session
+        return
+
+    async with writer_lock(engine) if write else nullcontext():
+        async with AsyncSession(engine, **options) as session:
+            yield session
+
+
+def _commit(session: Session) -> None:
+    """Commits the session, or only flushes it when it's part of a transaction."""
+    if session.info.get("transaction"):
+        session.flush()
+    else:
+        session.commit()
+
+
+async def _commit_async(session: AsyncSession) -> None:
+    """Asynchronous version of `_commit`."""
+    if session.info.get("transaction"):
+        await session.flush()
+    else:
+        await session.commit()
+
+
+def scope(function: Callable[..., "Query"]) -> Any:
+    """
+    Declares a named scope: a reusable set of query conditions of a model.
+
+    The decorated function receives the query to restrict (and the arguments
+    of the scope) and returns it. Scopes are called on the model like the
+    query methods, and can be chained with them and with other scopes.
+
+    ## Examples
+    ```python
+    class Member(Model, table=True):
+        @scope
+        def veterans(query, days: int = 365):
+            return query.where(Member.joined_at < datetime.now() - timedelta(days))
+
+        @scope
+        def top(query, limit: int = 10):
+            return query.order_by(Member.xp.desc()).limit(limit)
+
+    Member.veterans().top(5).all()
+    Member.where(guild_id=guild_id).veterans(days=30).count()
+    ```
+    """
+
+    def apply(cls: Type["Model"], *args: Any, **kwargs: Any) -> "Query":
+        return function(cls.query(), *args, **kwargs)
+
+    update_wrapper(apply, function)
+    setattr(apply, "__scope__", function)
+    return classmethod(apply)
+
+
+class Page(NamedTuple, Generic[T]):
+    """A page of records returned by `Query.paginate`."""
+
+    items: List[T]
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+    total: Optional[int]
+
+
+def _encode_cursor(values: List[Any]) -> str:
+    """Encodes the keyset values of a record into an opaque cursor."""
+
+    def encode(value: Any) -> Any:
+        for type_, name in CURSOR_TYPES:
+            if isinstance(value, type_):
+                return {name: str(value)}
+        return value
+
+    payload = dumps([encode(value) for value in values], separators=(",", ":"))
+    return urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_cursor(cursor: str, columns: List[Any]) -> List[Any]:
+    """
+    Decodes the keyset values of a cursor made by `_encode_cursor`, checking
+    that they match the types of the keyset `columns`.
+    """
+    decoders = {name: type_ for type_, name in CURSOR_TYPES}
+
+    def decode(value: Any) -> Any:
+        if isinstance(value, dict) and len(value) == 1:
+            [(name, encoded)] = value.items()
+            type_ = decoders.get(name)
+            if type_ is not None and not isinstance(encoded, str):
+                raise ValueError(f"Invalid {name} value {encoded!r}")
+            if type_ in (datetime, date):
+                return type_.fromisoformat(encoded)  # type: ignore[union-attr]
+            if type_ is not None:
+                return type_(encoded)
+        return value
+
+    try:
+        values = loads(urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("Unexpected number of values")
+
+        decoded = [decode(value) for value in values]
+        for column, value in zip(columns, decoded):
+            if not _matches_type(value, _python_type(column)):
+                raise ValueError(f"Unexpected value {value!r} for {column}")
+        return decoded
+    except (ValueError, ArithmeticError) as e:
+        raise ValueError(f"Invalid cursor '{cursor}'") from e
+
+
+def _python_type(column: Any) -> Optional[type]:
+    """Returns the Python type of the values of a column, when it's known."""
+    type_ = column.type
+    if isinstance(type_, TypeDecorator):
+        type_ = type_.impl_instance
+
+    try:
+        python_type = type_.python_type
+    except NotImplementedError:
+        return None
+
+    if python_type is object or issubclass(python_type, PyEnum):
+        return None
+    return python_type
+
+
+def _matches_type(value: Any, python_type: Optional[type]) -> bool:
+    """Returns whether a decoded cursor value can be compared to the column."""
+    if value is None or python_type is None:
+        return True
+    if isinstance(value, bool):
+        return python_type is bool
+    if python_type in (float, Decimal):
+        return isinstance(value, (int, float, Decimal))
+    return isinstance(value, python_type)
+
+
+def _keyset_condition(keys: List[Tuple[Any, bool]], values: List[Any], backward: bool):
+    """
+    Returns the condition matching the records after the given keyset values
+    (or before them when `backward`).
+
+    For `ORDER BY a, b DESC`, the records after `(x, y)` are the ones where
+    `a > x OR (a = x AND b < y)`.
+    """
+    conditions = []
+    for index, (column, descending) in enumerate(keys):
+        value = values[index]
+        greater = descending == backward
+        comparison = column > value if greater else column < value
+
+        equalities = [c == v for (c, _), v in zip(keys[:index], values[:index])]
+        conditions.append(and_(*equalities, comparison))
+    return or_(*conditions)
+
+
+def _conjuncts(clause: Any) -> Iterator[Any]:
+    """Yields the conditions combined by the `AND` of a `WHERE` clause."""
+    if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_:
+        for child in clause.clauses:
+            yield from _conjuncts(child)
+    else:
+        yield clause
+
+
+class _LoadDeferred:
+    """
+    Loads a deferred column of a record on first access, even when the record
+    is detached (unlike the loader of SQLAlchemy, which needs its session).
+    """
 
+    __slots__ = ("key",)
 
-class Query:
+    def __init__(self, key: str) -> None:
+        self.key: str = key
+
+    def __call__(self, state: Any, passive: Any) -> Any:
+        if not passive & SQL_OK:
+            return PASSIVE_NO_RESULT
+
+        instance = state.obj()
+        query = instance._instance_query()
+        statement = select(instance.__table__.c[self.key]).where(
+            instance._primary_key_condition("load a deferred column")
+        )
+
+        with _session(query.read_engine) as session:
+            row = session.execute(statement).first()
+
+        if row is None:
+            raise RecordNotFoundError(
+                instance.__class__.__name__,
+                [instance._primary_key_identity("load a deferred column")],
+            )
+        return row[0]
+
+
+class _Preload:
+    """The loading of a relationship of several records by `Model.preload`."""
+
+    __slots__ = ("relationship", "columns", "pending", "loaded", "related")
+
+    def __init__(self, attribute: Any, parents: Iterable[Any]) -> None:
+        self.relationship: Any = attribute.property
+        secondary = self.relationship.secondary is not None
+        pairs = (
+            self.relationship.synchronize_pairs
+            if secondary
+            else self.relationship.local_remote_pairs
+        )
+        keys = [
+            self.relationship.parent.get_property_by_column(local).key
+            for local, _ in pairs
+        ]
+
+        # The columns of the related records matching the keys of the parents
+        self.columns: List[Any] = [remote for _, remote in pairs]
+        self.pending: Dict[Tuple, List[Any]] = {}
+        self.loaded: List[Any] = []
+        self.related: Dict[Tuple, List[Any]] = {}
+
+        for parent in parents:
+            if self.relationship.key in inspect(parent).dict:
+                self.loaded.append(parent)
+            else:
+                key = tuple(getattr(parent, k) for k in keys)
+                self.pending.setdefault(key, []).append(parent)
+
+    @property
+    def target(self) -> Type["Model"]:
+        return self.relationship.mapper.class_
+
+    def statements(self, batch_size: int) -> Iterator[Any]:
+        """Yields the statements loading the related records, `IN` the keys."""
+        keys = [key for key in self.pending if None not in key]
+        entities: Any = [*self.columns, self.target]
+
+        for batch in _batched(keys, batch_size):
+            condition = (
+                self.columns[0].in_([key[0] for key in batch])
+                if len(self.columns) == 1
+                else tuple_(*self.columns).in_(batch)
+            )
+            statement = select(*entities).where(condition)
+
+            if self.relationship.secondary is not None:
+                statement = statement.select_from(self.target).join(
+                    self.relationship.secondary, self.relationship.secondaryjoin
+                )
+            if self.relationship.order_by:
+                statement = statement.order_by(*self.relationship.order_by)
+            yield statement
+
+    def collect(self, rows: Iterable[Row]) -> None:
+        """Groups the loaded related records by the key of their parent."""
+        for *key, instance in rows:
+            self.related.setdefault(tuple(key), []).append(instance)
+
+    def attach(self) -> List[Any]:
+        """
+        Sets the related records of the parents and returns the related records
+        of every parent, to load their own relationships.
+        """
+        name = self.relationship.key
+
+        for key, parents in self.pending.items():
+            related = self.related.get(key, [])
+            for parent in parents:
+                if self.relationship.uselist:
+                    set_committed_value(parent, name, list(related))
+                else:
+                    set_committed_value(parent, name, related[0] if related else None)
+
+        children: Dict[int, Any] = {}
+        for parents in [self.loaded, *self.pending.values()]:
+            for parent in parents:
+                value = getattr(parent, name)
+                for child in value if self.relationship.uselist else [value]:
+                    if child is not None:
+                        children[id(child)] = child
+        return list(children.values())
+
+
+class Query(Generic[T]):
     def __init__(self, model_class: Type[T]):
         self.model_class = model_class
-        self.engine: Engine = model_class.get_engine()
         self._statement: Optional[Union[Select, SelectOfScalar]] = None  # defer
+        self._limited: bool = False
+        self._distinct: bool = False
+        self._order_by: List[Any] = []
+        self._loads: List[str] = []
+        self._joined: bool = False
+        self._buffered: bool = False
+        self._counts: List[str] = []
+        self._only: Optional[Set[str]] = None
+        self._deferred: Set[str] = set()
+        self._undeferred: Set[str] = set()
+        self._cache_ttl: Optional[float] = None
+        self._cached: bool = False
+        self._primary: bool = False
+        self._shard: Any = MISSING
+
+    def __getattr__(self, name: str) -> Any:
+        """Returns the named scopes of the model (see `scope`), applied to the query."""
+        if not name.startswith("_"):
+            for model_class in self.model_class.__mro__:
+                attribute = model_class.__dict__.get(name)
+                function = getattr(attribute, "__func__", None)
+                if isinstance(attribute, classmethod) and hasattr(
+                    function, "__scope__"
+                ):
+                    return partial(getattr(function, "__scope__"), self)
+
+        raise AttributeError(f"'Query' object has no attribute '{name}'")
 
     @property
     def statement(self):
@@ -30,27 +474,256 @@ class Query:
     def statement(self, value):
         self._statement = value
 
+    @property
+    def engine(self) -> Engine:
+        """The engine of the model, or of the shard the query is restricted to."""
+        router = self.model_class._shard_router()
+        if router is None:
+            return self.model_class.get_engine()
+        return router.route(self._shard_key(router.column))
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        router = self.model_class._async_shard_router()
+        if router is None:
+            return self.model_class.get_async_engine()
+        return router.route(self._shard_key(router.column))
+
+    @property
+    def read_engine(self) -> Engine:
+        """
+        The engine of the read queries: a read replica of the model, unless
+        the query is `on_primary` or runs in a transaction of the primary.
+        """
+        engine = self.engine
+        if self._primary or engine in _transactions.get() or self._bound:
+            return engine
+        return self.model_class.get_read_engine()
+
+    @property
+    def async_read_engine(self) -> AsyncEngine:
+        """The asyncio version of `read_engine`."""
+        engine = self.async_engine
+        if self._primary or engine in _transactions.get() or self._bound:
+            return engine
+        return self.model_class.get_async_read_engine()
+
+    @property
+    def _bound(self) -> bool:
+        """Whether the model is bound to a named database (without replicas)."""
+        return getattr(self.model_class, "__bind__", None) is not None
+
+    def _shard_key(self, column: str) -> Any:
+        """
+        Returns the shard key of the query: the value given to `on_shard`, or
+        the value of an equality condition on the shard key column.
+        """
+        if self._shard is not MISSING:
+            return self._shard
+
+        if (parameter := self._shard_parameter(column)) is not None:
+            return parameter.effective_value
+
+        raise RuntimeError(
+            f"{self.model_class.__name__} is sharded by '{column}', filter the "
+            "query on it or call on_shard() to pick the shard"
+        )
+
+    def _shard_parameter(self, column: str) -> Optional[BindParameter]:
+        """Returns the parameter of the equality condition on the shard key."""
+        table = self.model_class.__table__
+        if self._statement is not None and self.statement.whereclause is not None:
+            for condition in _conjuncts(self.statement.whereclause):
+                if (
+                    isinstance(condition, BinaryExpression)
+                    and condition.operator is operators.eq
+                    and isinstance(condition.right, BindParameter)
+                    and getattr(condition.left, "key", None) == column
+                    and getattr(condition.left, "table", None) is table
+                ):
+                    return condition.right
+        return None
+
+    @property
+    def count_statement(self) -> "SelectOfScalar[int]":
+        return self._aggregate_statement(func.count)
+
     def find(self, value: Any) -> Optional[T]:
         """
-        Finds a record by its primary key (id only).
+        Finds a record by its primary key.
 
-        Returns `None` if the record does not exist.
+        Returns `None` if the record does not exist. Records with a composite
+        primary key are found by a tuple of values, in the order of the key
+        columns. When the model declares a `__cache__`, the record is looked
+        up in its identity cache first.
 
         ## Examples
         ```python
         user = User.find(1)
+        member = GuildMember.find((guild_id, user_id))
         ```
         """
-        mapper = inspect(self.model_class)
-        pk_columns = mapper.primary_key
+        key = self._identity_key(None, value)
+        if (cached := self._cached_identity(key)) is not None:
+            return cached
+
+        instance = self.where(self._primary_key_condition(value)).first()
+        return self._cache_identity(key, instance)
+
+    async def find_async(self, value: Any) -> Optional[T]:
+        """
+        Asynchronous version of `find`.
+
+        ## Examples
+        ```python
+        user = await User.find_async(1)
+        ```
+        """
+        key = self._identity_key(None, value)
+        if (cached := self._cached_identity(key)) is not None:
+            return cached
+
+        query = self.where(self._primary_key_condition(value))
+        return self._cache_identity(key, await query.first_async())
+
+    def find_many(
+        self, ids: Iterable[Any], batch_size: int = 1000, strict: bool = False
+    ) -> List[Optional[T]]:
+        """
+        Finds the records with the given primary keys.
+
+        The records are loaded with one `IN (...)` query per `batch_size` keys
+        (skipping the ones found in the identity cache), and returned in the
+        order of `ids`. Missing records are returned as `None`, or reported by
+        a `RecordNotFoundError` when `strict` is set.
+
+        ## Examples
+        ```python
+        users = User.find_many([3, 1, 2])  # [<User 3>, <User 1>, <User 2>]
+        User.find_many([1, 404])  # [<User 1>, None]
+
+        members = GuildMember.find_many([(guild_id, 1), (guild_id, 2)])
+        ```
+        """
+        ids = list(ids)
+        found, pending = self._find_cached_identities(ids)
+        cache = self._caches_identities
+
+        with _session(self.read_engine, expire_on_commit=False) as session:
+            for batch in _batched(pending, batch_size):
+                statement = self._loading(self.statement)
+                statement = statement.where(self._primary_key_in(batch))
+                records = list(self._records(session.exec(statement)).all())
+                self._complete(session, records)
+                self._collect_identities(found, records, cache)
+
+        return self._ordered_identities(ids, found, strict)
+
+    async def find_many_async(
+        self, ids: Iterable[Any], batch_size: int = 1000, strict: bool = False
+    ) -> List[Optional[T]]:
+        """
+        Asynchronous version of `find_many`.
+
+        ## Examples
+        ```python
+        users = await User.find_many_async(user_ids)
+        ```
+        """
+        ids = list(ids)
+        found, pending = self._find_cached_identities(ids)
+        cache = self._caches_identities
+
+        async with _async_session(
+            self.async_read_engine, expire_on_commit=False
+        ) as session:
+            for batch in _batched(pending, batch_size):
+                statement = self._loading(self.statement)
+                statement = statement.where(self._primary_key_in(batch))
+                records = list(self._records(await session.exec(statement)).all())
+                await self._complete_async(session, records)
+                self._collect_identities(found, records, cache)
+
+        return self._ordered_identities(ids, found, strict)
+
+    def _find_cached_identities(self, ids: List[Any]) -> Tuple[Dict[Any, T], List]:
+        """
+        Splits the given primary keys between the records found in the identity
+        cache and the keys that must be loaded.
+        """
+        found: Dict[Any, T] = {}
+        pending = []
+
+        for value in dict.fromkeys(ids):
+            cached = self._cached_identity(self._identity_key(None, value))
+            if cached is not None:
+                found[value] = cached
+            else:
+                pending.append(value)
+        return found, pending
+
+    def _collect_identities(
+        self, found: Dict[Any, T], instances: Iterable[T], cache: bool
+    ) -> None:
+        """Adds the loaded records to `found`, caching them by identity if `cache`."""
+        for instance in instances:
+            identity = instance._primary_key_identity("find")
+            found[identity] = instance
+            if cache:
+                self._cache_identity((None, identity), instance)
+
+    def _ordered_identities(
+        self, ids: List[Any], found: Dict[Any, T], strict: bool
+    ) -> List[Optional[T]]:
+        """Returns the found records in the order of `ids`."""
+        if strict:
+            missing = [value for value in ids if value not in found]
+            if missing:
+                raise RecordNotFoundError(self.model_class.__name__, missing)
+        return [found.get(value) for value in ids]
+
+    def _primary_key_columns(self) -> List[Any]:
+        """Returns the primary key columns of the model."""
+        pk_columns = inspect(self.model_class).primary_key
 
         if not pk_columns:
             raise ValueError(f"No primary key defined for {self.model_class.__name__}")
+        return list(pk_columns)
+
+    def _primary_key_condition(self, value: Any):
+        """Returns the condition matching the given primary key value."""
+        pk_columns = self._primary_key_columns()
+
+        if len(pk_columns) == 1:
+            return pk_columns[0] == value
+
+        self._check_composite_key(value, pk_columns)
+        return and_(*(column == v for column, v in zip(pk_columns, value)))
+
+    def _primary_key_in(self, values: List[Any]):
+        """Returns the condition matching any of the given primary key values."""
+        pk_columns = self._primary_key_columns()
+
+        if len(pk_columns) == 1:
+            return pk_columns[0].in_(values)
+
+        for value in values:
+            self._check_composite_key(value, pk_columns)
+        return tuple_(*pk_columns).in_(values)
 
-        if len(pk_columns) > 1:
-            raise ValueError("Composite primary keys are not yet supported")
+    def _check_composite_key(self, value: Any, pk_columns: List[Any]) -> None:
+        if not isinstance(value, tuple) or len(value) != len(pk_columns):
+            raise ValueError(
+                f"{self.model_class.__name__} has a composite primary key, "
+                f"expected a tuple of {len(pk_columns)} values"
+            )
 
-        return self.where(pk_columns[0] == value).first()
+    def _column(self, key: str):
+        """Returns the column attribute of the model with the given name."""
+        column_ = getattr(self.model_class, key, None)
+        if column_ is None:
+            raise AttributeError(f"{self.model_class.__name__} has no column '{key}'")
+        return column_
 
     def find_by(self, **kwargs) -> Optional[T]:
         """
@@ -66,7 +739,86 @@ class Query:
         """
         if not kwargs:
             raise ValueError("At least one keyword argument must be provided.")
-        return self.where(**kwargs).first()
+
+        (column, value), *others = kwargs.items()
+        key = None if others else self._identity_key(column, value)
+        if (cached := self._cached_identity(key)) is not None:
+            return cached
+
+        return self._cache_identity(key, self.where(**kwargs).first())
+
+    async def find_by_async(self, **kwargs) -> Optional[T]:
+        """
+        Asynchronous version of `find_by`.
+
+        ## Examples
+        ```python
+        user = await User.find_by_async(name="Alice")
+        ```
+        """
+        if not kwargs:
+            raise ValueError("At least one keyword argument must be provided.")
+
+        (column, value), *others = kwargs.items()
+        key = None if others else self._identity_key(column, value)
+        if (cached := self._cached_identity(key)) is not None:
+            return cached
+
+        return self._cache_identity(key, await self.where(**kwargs).first_async())
+
+    @property
+    def _caches_identities(self) -> bool:
+        """
+        Whether the records of the query can be served from and stored in the
+        identity cache: the query has no conditions, counts or column options.
+        """
+        return (
+            self._statement is None
+            and not self._counts
+            and self._only is None
+            and not self._deferred
+            and not self._undeferred
+        )
+
+    def _identity_key(self, column: Optional[str], value: Any) -> Optional[Tuple]:
+        """
+        Returns the identity cache key of a lookup by primary key (when `column`
+        is `None`) or by unique column.
+
+        Returns `None` when the lookup can't be cached, because the model has
+        no identity cache, the column isn't unique or the query has conditions
+        or changes the loaded columns (see `_caches_identities`).
+        """
+        if not self._caches_identities or self.model_class.identity_cache() is None:
+            return None
+
+        if column is None:
+            return (None, value)
+
+        table_column = self.model_class.__table__.columns.get(column)
+        if table_column is None:
+            return None
+
+        pk_columns = inspect(self.model_class).primary_key
+        if len(pk_columns) == 1 and table_column is pk_columns[0]:
+            return (None, value)
+        return (column, value) if table_column.unique else None
+
+    def _cached_identity(self, key: Optional[Tuple]) -> Optional[T]:
+        """Returns the record cached under the given identity key, if any."""
+        cache = self.model_class.identity_cache()
+        if key is None or cache is None:
+            return None
+        return cache.get(key)
+
+    def _cache_identity(
+        self, key: Optional[Tuple], instance: Optional[T]
+    ) -> Optional[T]:
+        """Caches the record under the given identity key and returns it."""
+        cache = self.model_class.identity_cache()
+        if key is not None and cache is not None and instance is not None:
+            cache.set(key, instance, tags=[instance._primary_key_identity("cache")])
+        return instance
 
     def where(self, *conditions, **kwargs) -> Self:
         """
@@ -88,12 +840,7 @@ class Query:
         ```
         """
         for key, value in kwargs.items():
-            column_ = getattr(self.model_class, key, None)
-            if column_ is None:
-                raise AttributeError(
-                    f"{self.model_class.__name__} has no column '{key}'"
-                )
-            conditions += (column_ == value,)
+            conditions += (self._column(key) == value,)
 
         for condition in conditions:
             self.statement = self.statement.where(condition)
@@ -122,18 +869,13 @@ class Query:
         ```
         """
         for key, value in kwargs.items():
-            column_ = getattr(self.model_class, key, None)
-            if column_ is None:
-                raise AttributeError(
-                    f"{self.model_class.__name__} has no column '{key}'"
-                )
-            conditions += (column_ == value,)
+            conditions += (self._column(key) == value,)
 
         for condition in conditions:
             self.statement = self.statement.where(not_(condition))
         return self
 
-    def with_(self, *relationships: str) -> Self:
+    def with_(self, *relationships: str, strategy: str = "selectin") -> Self:
         """
         Eagerly loads specified relationships for optimization.
 
@@ -141,6 +883,18 @@ class Query:
         For relationships configured with lazy="selectin", this combines
         the relationship loading into the main query instead of a separate one.
 
+        Nested relationships are loaded with a dotted path, every relationship
+        of the path being loaded. The `strategy` is how they are loaded:
+        - `selectin` (default): one `SELECT ... WHERE id IN (...)` per relationship.
+        - `joined`: a `LEFT OUTER JOIN` in the query itself, best for the
+        many-to-one relationships.
+        - `subquery`: one `SELECT` per relationship, joined to the original
+        query as a subquery.
+
+        The `joined` and `subquery` strategies need the whole result to load
+        the relationships, so ordered queries iterated with `in_batches`,
+        `find_each` or `stream` fetch all their rows at once.
+
         ## Examples
         ```python
         # Loading a single record: with_() doesn't help much
@@ -155,17 +909,237 @@ class Query:
 
         # Load multiple relationships at once
         User.with_("posts", "comments").where(User.active == True).all()
+
+        # Load the posts of the users and the comments of the posts
+        User.with_("posts.comments").all()
+
+        # Load the author of each post in the same query
+        Post.with_("author", strategy="joined").all()
         ```
         """
+        if strategy not in LOADING_STRATEGIES:
+            raise ValueError(
+                f"Invalid loading strategy '{strategy}', "
+                f"expected one of: {', '.join(LOADING_STRATEGIES)}"
+            )
+
+        loader_name = LOADING_STRATEGIES[strategy].__name__
+
         for relationship in relationships:
-            relationship_attr = getattr(self.model_class, relationship, None)
-            if relationship_attr is None:
-                raise AttributeError(
-                    f"{self.model_class.__name__} has no relationship '{relationship}'"
+            loader: Any = None
+            for attribute in self._relationship_path(relationship):
+                if loader is None:
+                    loader = LOADING_STRATEGIES[strategy](attribute)
+                else:
+                    loader = getattr(loader, loader_name)(attribute)
+
+            self.statement = self.statement.options(loader)
+            self._loads.append(relationship)
+
+        self._joined = self._joined or strategy == "joined"
+        self._buffered = self._buffered or strategy in ("joined", "subquery")
+        return self
+
+    def with_count(self, *relationships: str) -> Self:
+        """
+        Counts the related records of each loaded record.
+
+        The count of a relationship is set in the `<relationship>_count`
+        attribute of the records. Instead of a `count()` per record, the counts
+        of all the records are loaded with a single grouped query per
+        relationship (`SELECT ..., count(*) ... WHERE ... IN (...) GROUP BY ...`)
+        once the records are loaded by `all`, `first`, `one`, `paginate`,
+        `in_batches` and their asynchronous versions.
+
+        The related records are counted by the foreign key of the relationship,
+        its additional join conditions are ignored.
+
+        ## Examples
+        ```python
+        for user in User.with_count("posts", "followers").all():
+            print(user.name, user.posts_count, user.followers_count)
+        ```
+        """
+        for relationship in relationships:
+            [attribute] = self._relationship_path(relationship)
+            if not attribute.property.uselist:
+                raise ValueError(
+                    f"Cannot count '{relationship}', it is not a collection "
+                    f"of {self.model_class.__name__}"
+                )
+            if f"{relationship}_count" in self.model_class.model_fields:
+                raise ValueError(
+                    f"{self.model_class.__name__} already has a field "
+                    f"'{relationship}_count'"
                 )
-            self.statement = self.statement.options(selectinload(relationship_attr))
+            self._counts.append(relationship)
+        return self
+
+    def only(self, *columns: str) -> Self:
+        """
+        Loads only the given columns of the records (and their primary key).
+
+        The other columns are deferred: they are not selected, and loaded by a
+        query of their own when they are first accessed on a record. Use it to
+        leave large columns out of the queries that don't need them.
+
+        ## Examples
+        ```python
+        # SELECT message.id, message.author_id FROM message
+        messages = Message.only("author_id").all()
+
+        messages[0].content  # SELECT message.content FROM message WHERE ...
+        ```
+        """
+        for column in columns:
+            self._column(column)
+        self._only = set(columns)
+        return self
+
+    def defer(self, *columns: str) -> Self:
+        """
+        Doesn't load the given columns until they are accessed on a record.
+
+        Columns can be deferred by default with the `__deferred__` attribute
+        of the model, `undefer` loads them in the queries that need them.
+
+        ## Examples
+        ```python
+        Message.defer("content", "embeds").where(author_id=user_id).all()
+
+        class Message(Model, table=True):
+            __deferred__ = ("content", "embeds")
+            ...
+
+        Message.undefer("content").find(message_id)
+        ```
+        """
+        for column in columns:
+            self._column(column)
+        self._deferred.update(columns)
+        self._undeferred.difference_update(columns)
+        return self
+
+    def undefer(self, *columns: str) -> Self:
+        """Loads the given columns, even if the model defers them by default."""
+        for column in columns:
+            self._column(column)
+        self._undeferred.update(columns)
+        self._deferred.difference_update(columns)
         return self
 
+    def _deferred_columns(self) -> Set[str]:
+        """Returns the name of the columns not loaded by the query."""
+        default = getattr(self.model_class, "__deferred__", ())
+        if self._only is None and not self._deferred and not default:
+            return set()
+
+        mapper = inspect(self.model_class)
+        primary_keys = {column.key for column in mapper.primary_key}
+
+        if self._only is not None:
+            deferred = {c.key for c in mapper.column_attrs} - self._only
+        else:
+            deferred = (set(default) | self._deferred) - self._undeferred
+        return deferred - primary_keys
+
+    def _loading(self, statement: Any) -> Any:
+        """Returns the statement loading the records, without the deferred columns."""
+        deferred = self._deferred_columns()
+        if not deferred:
+            return statement
+        return statement.options(
+            *(defer(self._column(column)) for column in sorted(deferred))
+        )
+
+    def _defer_loading(self, instances: Iterable[Any]) -> None:
+        """Sets the loaders of the deferred columns of the loaded instances."""
+        deferred = self._deferred_columns()
+        if not deferred:
+            return
+
+        for instance in instances:
+            if instance is None:
+                continue
+            state = inspect(instance)
+            for column in deferred:
+                if column not in state.dict:
+                    state.callables[column] = _LoadDeferred(column)
+
+    def _relationship_path(self, path: str) -> List[Any]:
+        """Returns the relationship attributes of a dotted path of relationships."""
+        attributes = []
+        model_class: Any = self.model_class
+
+        for name in path.split("."):
+            attribute = getattr(model_class, name, None)
+            if not isinstance(
+                getattr(attribute, "property", None), RelationshipProperty
+            ):
+                raise AttributeError(
+                    f"{model_class.__name__} has no relationship '{name}'"
+                )
+            attributes.append(attribute)
+            model_class = attribute.property.mapper.class_  # type: ignore[union-attr]
+        return attributes
+
+    def _records(self, result: Any) -> Any:
+        """
+        Returns the result of the loaded records, without the duplicated rows
+        of the collections loaded with a join.
+        """
+        return result.unique() if self._joined else result
+
+    def _count_loaders(
+        self, instances: Iterable[Optional[T]], batch_size: int = 1000
+    ) -> Iterator[Tuple[Any, Callable[[Iterable[Row]], None]]]:
+        """
+        Yields the grouped statements counting the related records of the given
+        instances, with the function setting the counts from their rows.
+        """
+        loaded = [instance for instance in instances if instance is not None]
+        mapper = inspect(self.model_class)
+
+        for relationship in self._counts:
+            attribute = f"{relationship}_count"
+            pairs = getattr(self.model_class, relationship).property.synchronize_pairs
+            keys = [mapper.get_property_by_column(local).key for local, _ in pairs]
+            remote = [column for _, column in pairs]
+
+            by_key: Dict[Tuple, List[T]] = {}
+            for instance in loaded:
+                instance.__dict__[attribute] = 0
+                key = tuple(getattr(instance, k) for k in keys)
+                by_key.setdefault(key, []).append(instance)
+
+            def attach(rows: Iterable[Row], attribute: str = attribute) -> None:
+                for *key, total in rows:
+                    for instance in by_key.get(tuple(key), ()):
+                        instance.__dict__[attribute] = total
+
+            for batch in _batched(by_key, batch_size):
+                condition = (
+                    remote[0].in_([key[0] for key in batch])
+                    if len(remote) == 1
+                    else tuple_(*remote).in_(batch)
+                )
+                columns: Any = [*remote, func.count()]
+                yield select(*columns).where(condition).group_by(*remote), attach
+
+    def _complete(self, session: Session, instances: List[Any]) -> None:
+        """Sets the `with_count` counts and deferred loaders of the loaded instances."""
+        for statement, attach in self._count_loaders(instances):
+            attach(session.exec(statement).all())
+        self._defer_loading(instances)
+
+    async def _complete_async(
+        self, session: AsyncSession, instances: List[Any]
+    ) -> None:
+        """Asynchronous version of `_complete`."""
+        for statement, attach in self._count_loaders(instances):
+            attach((await session.exec(statement)).all())
+        self._defer_loading(instances)
+
     def order_by(self, *args, **kwargs) -> Self:
         """
         Orders query results by one or more columns.
@@ -181,11 +1155,7 @@ class Query:
         ```
         """
         for key, direction in kwargs.items():
-            column_ = getattr(self.model_class, key, None)
-            if column_ is None:
-                raise AttributeError(
-                    f"{self.model_class.__name__} has no column '{key}'"
-                )
+            column_ = self._column(key)
 
             if isinstance(direction, str):
                 if direction.lower() == "asc":
@@ -202,6 +1172,7 @@ class Query:
 
         if args:
             self.statement = self.statement.order_by(*args)
+            self._order_by.extend(args)
         return self
 
     def limit(self, count: int) -> Self:
@@ -214,6 +1185,7 @@ class Query:
         ```
         """
         self.statement = self.statement.limit(count)
+        self._limited = True
         return self
 
     def offset(self, count: int) -> Self:
@@ -228,6 +1200,7 @@ class Query:
         ```
         """
         self.statement = self.statement.offset(count)
+        self._limited = True
         return self
 
     def distinct(self) -> Self:
@@ -249,180 +1222,1663 @@ class Query:
         ```
         """
         self.statement = self.statement.distinct()
+        self._distinct = True
         return self
 
-    def all(self) -> List[T]:
+    def cached(self, ttl: Optional[float] = None) -> Self:
         """
-        Executes the query and returns all matching records as a list.
+        Caches the results of the query in the query cache of the models.
+
+        The results are cached by statement and parameters, and invalidated
+        as soon as a write done through a model hits one of the tables used by
+        the query. Writes made outside of the models are not detected, so `ttl`
+        (in seconds) bounds how long such changes can be missed.
 
         ## Examples
         ```python
-        users = User.where(User.active == True).all()
+        # Cached until a user is written, or for 60 seconds at most
+        leaderboard = User.order_by(User.xp.desc()).limit(10).cached(ttl=60).all()
         ```
         """
-        with Session(self.engine, expire_on_commit=False) as session:
-            return list(session.exec(self.statement).all())
+        self._cached = True
+        self._cache_ttl = ttl
+        return self
 
-    def first(self) -> Optional[T]:
+    def on_primary(self) -> Self:
         """
-        Executes the query and returns the first matching record.
+        Runs the query on the primary database instead of a read replica.
 
-        Returns `None` if no result is found.
+        Replicas can lag behind the primary, use it to read the records that
+        were just written.
 
         ## Examples
         ```python
-        user = User.where(User.name == "Alice").first()
+        user.update(xp=100)
+        User.on_primary().find(user.id).xp  # 100
         ```
         """
-        with Session(self.engine, expire_on_commit=False) as session:
-            return session.exec(self.statement).first()
+        self._primary = True
+        return self
 
-    def one(self) -> Type[T]:
+    def on_shard(self, key: Any) -> Self:
         """
-        Executes the query and returns exactly one result.
+        Runs the query on the shard of the given shard key value.
 
-        Raises an exception if no result or multiple results are found.
+        Only needed for sharded models when the query has no equality
+        condition on the shard key column.
 
         ## Examples
         ```python
-        user = User.where(User.email == "alice@example.com").one()
+        Message.on_shard(guild_id).where(Message.author_id == user_id).all()
         ```
         """
-        with Session(self.engine, expire_on_commit=False) as session:
-            return session.exec(self.statement).one()
+        self._shard = key
+        return self
 
-    def count(self) -> int:
+    def all(self) -> List[T]:
         """
-        Returns the number of records matching the current query.
+        Executes the query and returns all matching records as a list.
 
         ## Examples
         ```python
-        total = User.where(User.active == True).count()
+        users = User.where(User.active == True).all()
         ```
         """
-        with Session(self.engine) as session:
-            count_statement: SelectOfScalar[int] = select(func.count()).select_from(
-                self.statement.subquery()
-            )
-            return session.exec(count_statement).one()
-
+        if (cached := self._cached_result("all")) is not MISSING:
+            return cached
 
-class _ModelMeta(SQLModelMetaclass):
-    """
-    Metaclass that enables class-level query delegation for models.
+        statement = self._loading(self.statement)
 
-    It allows calling query methods directly on the model class
-    (e.g. `User.where(...)` instead of `User.query().where(...)`).
+        with _session(self.read_engine, expire_on_commit=False) as session:
+            records = list(self._records(session.exec(statement)).all())
+            self._complete(session, records)
+            return self._cache_result("all", records)
 
-    ## Examples
+    def first(self) -> Optional[T]:
+        """
+        Executes the query and returns the first matching record.
+
+        Returns `None` if no result is found.
+
+        ## Examples
+        ```python
+        user = User.where(User.name == "Alice").first()
+        ```
+        """
+        if (cached := self._cached_result("first")) is not MISSING:
+            return cached
+
+        statement = self._loading(self.statement)
+
+        with _session(self.read_engine, expire_on_commit=False) as session:
+            record = self._records(session.exec(statement)).first()
+            self._complete(session, [record])
+            return self._cache_result("first", record)
+
+    def one(self) -> Type[T]:
+        """
+        Executes the query and returns exactly one result.
+
+        Raises an exception if no result or multiple results are found.
+
+        ## Examples
+        ```python
+        user = User.where(User.email == "alice@example.com").one()
+        ```
+        """
+        if (cached := self._cached_result("one")) is not MISSING:
+            return cached
+
+        statement = self._loading(self.statement)
+
+        with _session(self.read_engine, expire_on_commit=False) as session:
+            record = self._records(session.exec(statement)).one()
+            self._complete(session, [record])
+            return self._cache_result("one", record)
+
+    def count(self) -> int:
+        """
+        Returns the number of records matching the current query.
+
+        ## Examples
+        ```python
+        total = User.where(User.active == True).count()
+        ```
+        """
+        if (cached := self._cached_result("count")) is not MISSING:
+            return cached
+
+        with _session(self.read_engine) as session:
+            return self._cache_result("count", session.exec(self.count_statement).one())
+
+    def exists(self) -> bool:
+        """
+        Returns whether at least one record matches the current query.
+
+        The database stops at the first matching row, which is cheaper than
+        `count() > 0` on large tables.
+
+        ## Examples
+        ```python
+        if User.where(User.email == email).exists():
+            ...
+        ```
+        """
+        statement = select(self.statement.exists())
+
+        if (cached := self._cached_result("exists", statement)) is not MISSING:
+            return cached
+
+        with _session(self.read_engine) as session:
+            return self._cache_result(
+                "exists", bool(session.exec(statement).one()), statement
+            )
+
+    def sum(self, column: Union[str, Any]) -> Any:
+        """
+        Returns the sum of a column over the matching records.
+
+        The sum is computed by the database, `None` is returned when no record
+        matches.
+
+        ## Examples
+        ```python
+        total_xp = User.where(User.active == True).sum("xp")
+        ```
+        """
+        return self._aggregate(func.sum, column)
+
+    def avg(self, column: Union[str, Any]) -> Any:
+        """
+        Returns the average of a column over the matching records.
+
+        ## Examples
+        ```python
+        average_age = User.avg(User.age)
+        ```
+        """
+        return self._aggregate(func.avg, column)
+
+    def min(self, column: Union[str, Any]) -> Any:
+        """
+        Returns the smallest value of a column over the matching records.
+
+        ## Examples
+        ```python
+        first_join = Member.where(Member.guild_id == guild_id).min("joined_at")
+        ```
+        """
+        return self._aggregate(func.min, column)
+
+    def max(self, column: Union[str, Any]) -> Any:
+        """
+        Returns the largest value of a column over the matching records.
+
+        ## Examples
+        ```python
+        best_score = Score.max("points")
+        ```
+        """
+        return self._aggregate(func.max, column)
+
+    def group_by(self, *columns: Union[str, Any]) -> "GroupedQuery[T]":
+        """
+        Groups the matching records by the given columns.
+
+        The aggregates of the returned query (`count`, `sum`, `avg`, `min`
+        and `max`) are computed per group in a single statement, and returned
+        as a dictionary keyed by the values of the columns (a tuple of values
+        when grouping by several columns).
+
+        ## Examples
+        ```python
+        User.group_by("country").count()  # {"FR": 12, "US": 30}
+        Message.group_by(Message.channel_id).sum("length")
+        ```
+        """
+        if not columns:
+            raise ValueError("At least one column must be provided.")
+
+        return GroupedQuery(self, [self._resolve(c) for c in columns])
+
+    def _aggregate(self, function: Any, column: Union[str, Any]) -> Any:
+        """Executes an aggregate function over a column of the matching records."""
+        statement = self._aggregate_statement(function, self._resolve(column))
+
+        if (cached := self._cached_result("aggregate", statement)) is not MISSING:
+            return cached
+
+        with _session(self.read_engine) as session:
+            result = session.exec(statement).one()
+            return self._cache_result("aggregate", result, statement)
+
+    def _aggregate_statement(
+        self, function: Any, column: Any = None, group_by: Iterable[Any] = ()
+    ):
+        """
+        Returns the statement computing `function(column)` over the matching
+        records, preceded by the `group_by` columns.
+
+        The aggregate is selected directly from the table with the conditions
+        of the query. Queries using `limit`, `offset` or `distinct` are wrapped
+        in a subquery instead, so the aggregate applies to their results: the
+        aggregated and grouped columns (or expressions) are labeled in it.
+        """
+        if self._limited or self._distinct:
+            expressions = [*group_by, *([] if column is None else [column])]
+            labels = [f"_aggregated_{index}" for index in range(len(expressions))]
+            source = self.statement.add_columns(
+                *(e.label(label) for e, label in zip(expressions, labels))
+            ).subquery()
+
+            columns = [source.c[label] for label in labels]
+            arguments = [] if column is None else [columns.pop()]
+            aggregate = function(*arguments)
+            statement: Any = select(aggregate).select_from(source)
+            if columns:
+                statement = statement.with_only_columns(
+                    *columns, aggregate, maintain_column_froms=True
+                )
+        else:
+            columns = list(group_by)
+            arguments = [] if column is None else [column]
+            statement = self.statement.with_only_columns(
+                *columns, function(*arguments), maintain_column_froms=True
+            ).order_by(None)
+
+        if columns:
+            statement = statement.group_by(*columns)
+        return statement
+
+    def _resolve(self, column: Union[str, Any]) -> Any:
+        """Returns the column of the model with the given name, or the column."""
+        return self._column(column) if isinstance(column, str) else column
+
+    def pluck(self, column: Union[str, Any]) -> List[Any]:
+        """
+        Returns the values of a single column of the matching records.
+
+        Only the column is selected and no model instance is created, which is
+        much lighter than loading the records when only a value is needed.
+
+        ## Examples
+        ```python
+        channel_ids = Channel.where(Channel.enabled == True).pluck("channel_id")
+        names = User.order_by(User.name).pluck(User.name)
+        ```
+        """
+        statement = self._projection(column)
+
+        if (cached := self._cached_result("all", statement)) is not MISSING:
+            return cached
+
+        with _session(self.read_engine) as session:
+            return self._cache_result(
+                "all", list(session.exec(statement).all()), statement
+            )
+
+    def values(self, *columns: Union[str, Any]) -> List[Row]:
+        """
+        Returns the values of the given columns of the matching records.
+
+        Each record is returned as a lightweight named tuple instead of a model
+        instance.
+
+        ## Examples
+        ```python
+        for id, name in User.where(User.active == True).values("id", "name"):
+            ...
+
+        rows = User.values(User.id, User.email)
+        rows[0].email
+        ```
+        """
+        if not columns:
+            raise ValueError("At least one column must be provided.")
+
+        statement = self._projection(*columns)
+
+        if (cached := self._cached_result("all", statement)) is not MISSING:
+            return cached
+
+        with _session(self.read_engine) as session:
+            # `exec` would only return the first column of each row
+            rows = list(session.execute(statement).all())
+            return self._cache_result("all", rows, statement)
+
+    def ids(self) -> List[Any]:
+        """
+        Returns the primary keys of the matching records.
+
+        Composite primary keys are returned as tuples.
+
+        ## Examples
+        ```python
+        inactive_ids = User.where(User.active == False).ids()
+        ```
+        """
+        pk_columns = inspect(self.model_class).primary_key
+
+        if len(pk_columns) == 1:
+            return self.pluck(pk_columns[0])
+        return [tuple(row) for row in self.values(*pk_columns)]
+
+    def _projection(self, *columns: Union[str, Any]):
+        """Returns the statement of the query selecting only the given columns."""
+        return self.statement.with_only_columns(
+            *(self._resolve(c) for c in columns),
+            maintain_column_froms=True,
+        )
+
+    def find_each(self, batch_size: int = 1000) -> Iterator[T]:
+        """
+        Iterates over the matching records, loading them in batches.
+
+        Only one batch is held in memory at a time, which makes it suitable to
+        process large tables. See `in_batches` for how batches are loaded.
+
+        ## Examples
+        ```python
+        for user in User.where(User.active == True).find_each(batch_size=500):
+            ...
+        ```
+        """
+        for batch in self.in_batches(batch_size):
+            yield from batch
+
+    def in_batches(self, batch_size: int = 1000) -> Iterator[List[T]]:
+        """
+        Iterates over the matching records in lists of `batch_size` records.
+
+        Batches are loaded with keyset pagination on the primary key, so every
+        batch costs the same, however deep in the table. Queries ordered by
+        other columns or using `limit`/`offset` are streamed from a single
+        result instead (using a server-side cursor where supported), unless
+        relationships are loaded with the `joined` or `subquery` strategy:
+        the whole result is then fetched before being split in batches.
+
+        ## Examples
+        ```python
+        for users in User.with_("posts").in_batches(batch_size=1000):
+            process(users)
+        ```
+        """
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+
+        pk_columns = inspect(self.model_class).primary_key
+
+        if self._order_by or self._limited or len(pk_columns) > 1:
+            yield from self._stream_batches(batch_size)
+            return
+
+        pk_column = pk_columns[0]
+        statement = self._loading(self.statement).order_by(pk_column).limit(batch_size)
+        last = None
+
+        while True:
+            batch_statement = statement
+            if last is not None:
+                batch_statement = statement.where(pk_column > last)
+
+            with _session(self.read_engine, expire_on_commit=False) as session:
+                batch = list(self._records(session.exec(batch_statement)).all())
+                self._complete(session, batch)
+
+            if batch:
+                yield batch
+            if len(batch) < batch_size:
+                return
+            last = getattr(batch[-1], pk_column.key)
+
+    def _stream_batches(self, batch_size: int) -> Iterator[List[T]]:
+        """Streams the results of the query in batches from a single result."""
+        statement = self._loading(self.statement)
+        if not self._buffered:
+            statement = statement.execution_options(yield_per=batch_size)
+
+        with _session(self.read_engine, expire_on_commit=False) as session:
+            result = self._records(session.exec(statement))
+            for partition in result.partitions(batch_size):
+                batch = list(partition)
+                self._complete(session, batch)
+                yield batch
+
+    def paginate(
+        self,
+        limit: int = 20,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        with_count: bool = False,
+    ) -> "Page[T]":
+        """
+        Returns a page of records using keyset (cursor) pagination.
+
+        Pages are ordered by the `order_by` columns of the query, followed by
+        the primary key to make the order deterministic. Instead of skipping
+        rows with `offset`, each page continues from the cursor of the
+        previous one, so deep pages cost the same as the first one.
+
+        `after` and `before` take the `next_cursor` and `prev_cursor` of a
+        page. The total number of records is only counted when `with_count`
+        is set. The ordering columns are expected to not contain `NULL`.
+
+        ## Examples
+        ```python
+        page = User.order_by(User.xp.desc()).paginate(limit=10)
+        page.items  # The first 10 users
+
+        next_page = User.order_by(User.xp.desc()).paginate(
+            limit=10, after=page.next_cursor
+        )
+        ```
+        """
+        if limit < 1:
+            raise ValueError("Limit must be at least 1")
+
+        if after is not None and before is not None:
+            raise ValueError("Cannot paginate both after and before a cursor")
+
+        if self._limited:
+            raise ValueError("Cannot paginate a query using limit or offset")
+
+        keys = self._keyset()
+        backward = before is not None
+        cursor = before if backward else after
+
+        # Pages before a cursor are fetched in reverse order, then reversed back
+        order = [
+            column.desc() if descending != backward else column.asc()
+            for column, descending in keys
+        ]
+        statement = self._loading(self.statement)
+        statement = statement.order_by(None).order_by(*order).limit(limit + 1)
+
+        if cursor is not None:
+            values = _decode_cursor(cursor, [column for column, _ in keys])
+            statement = statement.where(_keyset_condition(keys, values, backward))
+
+        with _session(self.read_engine, expire_on_commit=False) as session:
+            items = list(self._records(session.exec(statement)).all())
+            self._complete(session, items)
+
+        has_more = len(items) > limit
+        items = items[:limit]
+
+        if backward:
+            items.reverse()
+
+        def cursor_of(instance: T) -> str:
+            return _encode_cursor([getattr(instance, c.key) for c, _ in keys])
+
+        has_next = has_more if not backward else True
+        has_prev = has_more if backward else after is not None
+
+        return Page(
+            items=items,
+            next_cursor=cursor_of(items[-1]) if items and has_next else None,
+            prev_cursor=cursor_of(items[0]) if items and has_prev else None,
+            total=self.count() if with_count else None,
+        )
+
+    def _keyset(self) -> List[Tuple[Any, bool]]:
+        """
+        Returns the columns (and whether they are descending) ordering the
+        query, followed by the primary key columns not already in the order.
+        """
+        keys = []
+        for clause in self._order_by:
+            descending = False
+
+            if isinstance(clause, UnaryExpression):
+                if clause.modifier not in (operators.asc_op, operators.desc_op):
+                    raise ValueError(f"Cannot paginate on the order '{clause}'")
+                descending = clause.modifier is operators.desc_op
+                clause = clause.element
+
+            if not isinstance(getattr(clause, "key", None), str):
+                raise ValueError(f"Cannot paginate on the order '{clause}'")
+            keys.append((clause, descending))
+
+        keyed = {column.key for column, _ in keys}
+        for pk_column in inspect(self.model_class).primary_key:
+            if pk_column.key not in keyed:
+                keys.append((pk_column, False))
+        return keys
+
+    def update_all(self, **values) -> int:
+        """
+        Updates every record matching the query in a single `UPDATE` statement.
+
+        Values can be plain values or SQL expressions. The records are not
+        loaded, so instances already in memory keep their previous values.
+
+        Returns the number of updated rows.
+
+        ## Examples
+        ```python
+        User.where(User.active == False).update_all(flag=True)
+        User.update_all(age=User.age + 1)
+        ```
+        """
+        if not values:
+            raise ValueError("At least one keyword argument must be provided.")
+
+        statement = update(self.model_class).values(
+            {self._column(key): value for key, value in values.items()}
+        )
+        return self._execute_write(statement)
+
+    def delete_all(self) -> int:
+        """
+        Deletes every record matching the query in a single `DELETE` statement.
+
+        Returns the number of deleted rows.
+
+        ## Examples
+        ```python
+        Message.where(Message.created_at < last_month).delete_all()
+        ```
+        """
+        return self._execute_write(delete(self.model_class))
+
+    @overload
+    def increment_all(
+        self, column: str, by: Any = ..., returning: Literal[False] = ...
+    ) -> int: ...
+
+    @overload
+    def increment_all(
+        self, column: str, by: Any = ..., *, returning: Literal[True]
+    ) -> List[Any]: ...
+
+    def increment_all(
+        self, column: str, by: Any = 1, returning: bool = False
+    ) -> Union[int, List[Any]]:
+        """
+        Atomically increments a column of every record matching the query.
+
+        The increment is done by the database (`SET column = column + :by`) in a
+        single statement, so concurrent increments are never lost.
+
+        Returns the number of updated rows. With `returning=True`, the new
+        values are returned instead, which requires a dialect supporting
+        `RETURNING`.
+
+        ## Examples
+        ```python
+        User.where(User.guild_id == guild_id).increment_all("xp", by=5)
+        values = User.where(id=1).increment_all("xp", returning=True)
+        ```
+        """
+        return self._increment(column, by, returning)
+
+    def _increment(
+        self,
+        column: str,
+        by: Any,
+        returning: bool,
+        identities: Optional[Tuple[Any, ...]] = None,
+    ) -> Any:
+        """
+        Increments a column of the matching records, invalidating the cached
+        records with the given identities (every record of the model if none).
+        """
+        column_ = self._column(column)
+        statement = update(self.model_class).values({column_: column_ + by})
+
+        if returning:
+            return self._execute_write(statement, column_, identities)
+        return self._execute_write(statement, identities=identities)
+
+    @overload
+    def decrement_all(
+        self, column: str, by: Any = ..., returning: Literal[False] = ...
+    ) -> int: ...
+
+    @overload
+    def decrement_all(
+        self, column: str, by: Any = ..., *, returning: Literal[True]
+    ) -> List[Any]: ...
+
+    def decrement_all(
+        self, column: str, by: Any = 1, returning: bool = False
+    ) -> Union[int, List[Any]]:
+        """
+        Atomically decrements a column of every record matching the query.
+
+        Equivalent to `increment_all` with a negated `by`.
+
+        ## Examples
+        ```python
+        Item.where(Item.id == item_id).decrement_all("stock")
+        ```
+        """
+        if returning:
+            return self.increment_all(column, -by, returning=True)
+        return self.increment_all(column, -by)
+
+    @overload
+    def _execute_write(
+        self, statement, returning: None = ..., identities: Optional[Tuple] = ...
+    ) -> int: ...
+
+    @overload
+    def _execute_write(
+        self, statement, returning: Any, identities: Optional[Tuple] = ...
+    ) -> List[Any]: ...
+
+    def _execute_write(self, statement, returning=None, identities=None):
+        """
+        Restricts an `UPDATE` or `DELETE` statement to the records matching the
+        query, executes it and returns the number of affected rows, or the
+        values of the `returning` column.
+
+        The cached records with the given `identities` are invalidated, or
+        every cached record of the model when they're not known.
+        """
+        statement = self._restrict(statement).execution_options(
+            synchronize_session=False
+        )
+
+        if returning is not None:
+            dialect = self.engine.dialect
+            if not dialect.update_returning:
+                raise RuntimeError(f"{dialect.name} does not support RETURNING")
+            statement = statement.returning(returning)
+
+        with _session(self.engine) as session:
+            result = session.exec(statement)
+            values = list(result.scalars()) if returning is not None else None
+            _commit(session)
+
+        if identities is None:
+            self.model_class._invalidate()
+        else:
+            self.model_class._invalidate(*identities)
+        return result.rowcount if values is None else values
+
+    def _restrict(self, statement):
+        """Applies the filters of the query to an `UPDATE` or `DELETE` statement."""
+        if self._limited:
+            # UPDATE and DELETE don't support LIMIT/OFFSET on every dialect,
+            # so the matching primary keys are selected in a subquery instead.
+            pk_columns = inspect(self.model_class).primary_key
+            subquery = self.statement.with_only_columns(*pk_columns)
+            return statement.where(tuple_(*pk_columns).in_(subquery))
+
+        if self.statement.whereclause is not None:
+            return statement.where(self.statement.whereclause)
+        return statement
+
+    def _cached_result(self, kind: str, statement: Any = None) -> Any:
+        """Returns the cached result of the query, or `MISSING` if not cached."""
+        if not self._cached:
+            return MISSING
+
+        key = self._cache_key(kind, statement)
+        result = self.model_class.get_query_cache().get(key, MISSING)
+        return self._copy_result(result)
+
+    def _cache_result(self, kind: str, result: E, statement: Any = None) -> E:
+        """Caches the result of the query, tagged with the tables it uses."""
+        if self._cached:
+            self.model_class.get_query_cache().set(
+                self._cache_key(kind, statement),
+                self._copy_result(result),
+                ttl=self._cache_ttl,
+                tags=self._cache_tags(),
+            )
+        return result
+
+    @staticmethod
+    def _copy_result(result: Any) -> Any:
+        """Copies mutable results so callers can't alter the cached ones."""
+        if isinstance(result, (list, dict)):
+            return type(result)(result)
+        return result
+
+    def _cache_key(self, kind: str, statement: Any = None) -> Tuple:
+        """
+        Returns the cache key of the query: its compiled statement and parameters.
+
+        The statement defaults to the one of the query (or its count statement).
+        """
+        if statement is None:
+            statement = self.count_statement if kind == "count" else self.statement
+        compiled = statement.compile(dialect=self.engine.dialect)
+
+        return (
+            kind,
+            str(compiled),
+            repr(sorted(compiled.params.items())),
+            tuple(self._loads),
+            tuple(self._counts),
+            tuple(sorted(self._deferred_columns())),
+        )
+
+    def _cache_tags(self) -> Set[str]:
+        """Returns the name of the tables used by the query."""
+        tables = {
+            table.name for table in find_tables(self.statement, check_columns=True)
+        }
+
+        for path in self._loads + self._counts:
+            for attribute in self._relationship_path(path):
+                related = attribute.property
+                tables.add(related.mapper.local_table.name)
+                if related.secondary is not None:
+                    tables.add(related.secondary.name)
+        return tables
+
+    async def all_async(self) -> List[T]:
+        """
+        Asynchronous version of `all`.
+
+        The query is executed on the async engine, so it doesn't block the
+        event loop while waiting for the database.
+
+        ## Examples
+        ```python
+        users = await User.where(User.active == True).all_async()
+        ```
+        """
+        if (cached := self._cached_result("all")) is not MISSING:
+            return cached
+
+        async with _async_session(
+            self.async_read_engine, expire_on_commit=False
+        ) as session:
+            result = await session.exec(self._loading(self.statement))
+            records = list(self._records(result).all())
+            await self._complete_async(session, records)
+            return self._cache_result("all", records)
+
+    async def first_async(self) -> Optional[T]:
+        """
+        Asynchronous version of `first`.
+
+        ## Examples
+        ```python
+        user = await User.where(User.name == "Alice").first_async()
+        ```
+        """
+        if (cached := self._cached_result("first")) is not MISSING:
+            return cached
+
+        async with _async_session(
+            self.async_read_engine, expire_on_commit=False
+        ) as session:
+            result = await session.exec(self._loading(self.statement))
+            record = self._records(result).first()
+            await self._complete_async(session, [record])
+            return self._cache_result("first", record)
+
+    async def one_async(self) -> T:
+        """
+        Asynchronous version of `one`.
+
+        ## Examples
+        ```python
+        user = await User.where(User.email == "alice@example.com").one_async()
+        ```
+        """
+        if (cached := self._cached_result("one")) is not MISSING:
+            return cached
+
+        async with _async_session(
+            self.async_read_engine, expire_on_commit=False
+        ) as session:
+            result = await session.exec(self._loading(self.statement))
+            record = self._records(result).one()
+            await self._complete_async(session, [record])
+            return self._cache_result("one", record)
+
+    async def count_async(self) -> int:
+        """
+        Asynchronous version of `count`.
+
+        ## Examples
+        ```python
+        total = await User.where(User.active == True).count_async()
+        ```
+        """
+        if (cached := self._cached_result("count")) is not MISSING:
+            return cached
+
+        async with _async_session(self.async_read_engine) as session:
+            result = await session.exec(self.count_statement)
+            return self._cache_result("count", result.one())
+
+    async def stream(self, batch_size: int = 1000) -> AsyncIterator[T]:
+        """
+        Streams the matching records asynchronously.
+
+        Rows are fetched from the database `batch_size` at a time instead of
+        loading the whole result set in memory, which makes it suitable for
+        large tables. Relationships loaded with the `joined` or `subquery`
+        strategy need the whole result, which is then fetched at once. The
+        `with_count` counts are loaded for each batch of records.
+
+        ## Examples
+        ```python
+        async for user in User.where(User.active == True).stream():
+            ...
+        ```
+        """
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+
+        statement = self._loading(self.statement)
+
+        async with _async_session(
+            self.async_read_engine, expire_on_commit=False
+        ) as session:
+            if self._buffered:
+                records = self._records(await session.exec(statement)).all()
+                for batch in _batched(records, batch_size):
+                    await self._complete_async(session, batch)
+                    for instance in batch:
+                        yield instance
+                return
+
+            statement = statement.execution_options(yield_per=batch_size)
+            result = await session.stream_scalars(statement)
+            async for partition in result.partitions(batch_size):
+                batch = list(partition)
+                await self._complete_async(session, batch)
+                for instance in batch:
+                    yield instance
+
+
+class GroupedQuery(Generic[T]):
+    """
+    A query grouped by some columns, returned by `Query.group_by`.
+
+    Each aggregate returns a dictionary mapping the values of the grouped
+    columns to the aggregate of the group.
+    """
+
+    def __init__(self, query: Query[T], columns: List[Any]):
+        self.query = query
+        self.columns = columns
+
+    def count(self) -> Dict[Any, int]:
+        """
+        Returns the number of matching records of each group.
+
+        ## Examples
+        ```python
+        Member.group_by("guild_id").count()  # {1: 120, 2: 45}
+        ```
+        """
+        return self._aggregate(func.count)
+
+    def sum(self, column: Union[str, Any]) -> Dict[Any, Any]:
+        """Returns the sum of a column for each group."""
+        return self._aggregate(func.sum, column)
+
+    def avg(self, column: Union[str, Any]) -> Dict[Any, Any]:
+        """Returns the average of a column for each group."""
+        return self._aggregate(func.avg, column)
+
+    def min(self, column: Union[str, Any]) -> Dict[Any, Any]:
+        """Returns the smallest value of a column for each group."""
+        return self._aggregate(func.min, column)
+
+    def max(self, column: Union[str, Any]) -> Dict[Any, Any]:
+        """Returns the largest value of a column for each group."""
+        return self._aggregate(func.max, column)
+
+    def _aggregate(self, function: Any, column: Any = None) -> Dict[Any, Any]:
+        query = self.query
+        if column is not None:
+            column = query._resolve(column)
+
+        statement = query._aggregate_statement(function, column, self.columns)
+
+        if (cached := query._cached_result("group", statement)) is not MISSING:
+            return cached
+
+        with _session(query.read_engine) as session:
+            rows = session.execute(statement).all()
+
+        if len(self.columns) == 1:
+            result = {row[0]: row[1] for row in rows}
+        else:
+            result = {tuple(row[:-1]): row[-1] for row in rows}
+        return query._cache_result("group", result, statement)
+
+
+class PreparedQuery(Generic[T]):
+    """
+    A query template built once and executed with different parameters,
+    returned by `Model.prepare`.
+
+    The statement of the query is only built once, which saves the Python
+    overhead of building the query on each call (including the generation
+    of its SQLAlchemy cache key, used to find its compiled form). The values
+    of the `bindparam`s of the template are given to each execution.
+
+    Templates of sharded models filtering the shard key on a `bindparam` run
+    on the shard of the value given to each execution.
+    """
+
+    def __init__(self, query: Query[T]) -> None:
+        if query._cached:
+            raise ValueError("Cannot prepare a cached query")
+
+        self.query: Query[T] = query
+        self.statement: Any = query._loading(query.statement)
+        self.count_statement: Any = query.count_statement
+
+        # The name of the bindparam the shard key is filtered on, if any
+        self.__shard_parameter: Optional[str] = None
+
+        model_class = query.model_class
+        router = model_class._shard_router() or model_class._async_shard_router()
+        if router is not None and query._shard is MISSING:
+            parameter = query._shard_parameter(router.column)
+            if parameter is not None and not parameter.unique:
+                self.__shard_parameter = parameter.key
+
+    def __query(self, params: Dict[str, Any]) -> Query[T]:
+        """Returns the query of the template, on the shard given by the params."""
+        if self.__shard_parameter is None or self.__shard_parameter not in params:
+            return self.query
+        return copy(self.query).on_shard(params[self.__shard_parameter])
+
+    def all(self, **params: Any) -> List[T]:
+        """Executes the template and returns all matching records."""
+        query = self.__query(params)
+        with _session(query.read_engine, expire_on_commit=False) as session:
+            result = session.exec(self.statement, params=params)
+            records = list(query._records(result).all())
+            query._complete(session, records)
+            return records
+
+    def first(self, **params: Any) -> Optional[T]:
+        """Executes the template and returns the first matching record."""
+        query = self.__query(params)
+        with _session(query.read_engine, expire_on_commit=False) as session:
+            result = session.exec(self.statement, params=params)
+            record = query._records(result).first()
+            query._complete(session, [record])
+            return record
+
+    def one(self, **params: Any) -> T:
+        """Executes the template and returns exactly one record."""
+        query = self.__query(params)
+        with _session(query.read_engine, expire_on_commit=False) as session:
+            result = session.exec(self.statement, params=params)
+            record = query._records(result).one()
+            query._complete(session, [record])
+            return record
+
+    def count(self, **params: Any) -> int:
+        """Returns the number of records matching the template."""
+        query = self.__query(params)
+        with _session(query.read_engine) as session:
+            return session.exec(self.count_statement, params=params).one()
+
+    async def all_async(self, **params: Any) -> List[T]:
+        """Asynchronous version of `all`."""
+        query = self.__query(params)
+        async with _async_session(
+            query.async_read_engine, expire_on_commit=False
+        ) as session:
+            result = await session.exec(self.statement, params=params)
+            records = list(query._records(result).all())
+            await query._complete_async(session, records)
+            return records
+
+    async def first_async(self, **params: Any) -> Optional[T]:
+        """Asynchronous version of `first`."""
+        query = self.__query(params)
+        async with _async_session(
+            query.async_read_engine, expire_on_commit=False
+        ) as session:
+            result = await session.exec(self.statement, params=params)
+            record = query._records(result).first()
+            await query._complete_async(session, [record])
+            return record
+
+    async def one_async(self, **params: Any) -> T:
+        """Asynchronous version of `one`."""
+        query = self.__query(params)
+        async with _async_session(
+            query.async_read_engine, expire_on_commit=False
+        ) as session:
+            result = await session.exec(self.statement, params=params)
+            record = query._records(result).one()
+            await query._complete_async(session, [record])
+            return record
+
+    async def count_async(self, **params: Any) -> int:
+        """Asynchronous version of `count`."""
+        query = self.__query(params)
+        async with _async_session(query.async_read_engine) as session:
+            result = await session.exec(self.count_statement, params=params)
+            return result.one()
+
+
+class _ModelMeta(SQLModelMetaclass):
+    """
+    Metaclass that enables class-level query delegation for models.
+
+    It allows calling query methods directly on the model class
+    (e.g. `User.where(...)` instead of `User.query().where(...)`).
+
+    ## Examples
     ```python
     User.where(User.active == True).all()
     User.order_by(User.created_at.desc()).limit(5).all()
     ```
     """
 
-    def __new__(cls, name, bases, namespace, **kwargs):
+    def __new__(cls, name, bases, namespace, **kwargs):
+        """
+        Initializes a new instance of the model.
+
+        This method behaves like a regular class constructor,
+        but exists explicitly here to avoid conflicts with query delegation.
+        """
+        if name != "Model":
+            if "table" not in kwargs:
+                kwargs["table"] = True
+        return super().__new__(cls, name, bases, namespace, **kwargs)
+
+    def __getattr__(cls, name: str):
+        """
+        Delegates missing class attributes or methods to the model's query object.
+
+        When a method such as `where`, `order_by`, or `count` is not found on the model,
+        this metaclass automatically forwards it to a `Query` instance.
+
+        This allows expressive query syntax directly on the model.
+
+        ## Examples
+        ```python
+        # Equivalent to: User.query().where(User.name == "Alice").first()
+        user = User.where(User.name == "Alice").first()
+
+        # Equivalent to: User.query().count()
+        total = User.count()
+        ```
+        """
+        if cls.__name__ == "Model":
+            raise AttributeError(f"{name} not found on base Model class")
+
+        if name.startswith("_") or name in {
+            "get_engine",
+            "set_engine",
+            "get_async_engine",
+            "set_async_engine",
+            "get_read_engine",
+            "set_read_engines",
+            "get_async_read_engine",
+            "set_async_read_engines",
+            "query",
+            "buffered",
+            "set_query_cache",
+            "get_query_cache",
+        }:
+            raise AttributeError(name)
+
+        # Bound methods of a new query, without wrapping them on each call
+        attribute = getattr(cls.query(), name, MISSING)
+        if attribute is MISSING:
+            raise AttributeError(f"{cls.__name__} has no attribute '{name}'")
+        return attribute
+
+
+class Model(SQLModel, metaclass=_ModelMeta):
+    _engine: Engine | None = None
+    _async_engine: AsyncEngine | None = None
+    _read_engines: ClassVar[List[Engine]] = []
+    _binds: ClassVar[Dict[str, Union[Engine, ShardRouter[Engine]]]] = {}
+    _async_binds: ClassVar[Dict[str, Union[AsyncEngine, ShardRouter[AsyncEngine]]]] = {}
+    _async_read_engines: ClassVar[List[AsyncEngine]] = []
+    _identity_caches: ClassVar[Dict[type, Optional[MemoryCache]]] = {}
+    _query_cache: ClassVar[Optional[MemoryCache]] = None
+
+    @classmethod
+    def set_engine(cls, engine: Engine):
+        """
+        Sets the database engine used by the model.
+
+        Must be called before performing any queries.
+
+        ## Examples
+        ```python
+        from sqlmodel import create_engine
+        engine = create_engine("sqlite:///db.sqlite3")
+        User.set_engine(engine)
+        ```
+        """
+        cls._engine = engine
+
+    @classmethod
+    def get_engine(cls) -> Engine:
+        """
+        Returns the engine currently associated with this model.
+
+        Raises a `RuntimeError` if no engine has been set.
+
+        ## Examples
+        ```python
+        engine = User.get_engine()
+        ```
+        """
+        bind = cls._bind(Model._binds, "set_bind")
+        if isinstance(bind, ShardRouter):
+            raise RuntimeError(
+                f"{cls.__name__} is sharded by '{bind.column}', "
+                "its engine depends on the shard key"
+            )
+        if bind is not None:
+            return bind
+
+        if cls._engine is None:
+            raise RuntimeError(
+                f"No session set for {cls.__name__}. Call Model.set_engine() first."
+            )
+        return cls._engine
+
+    @classmethod
+    def set_async_engine(cls, engine: AsyncEngine):
+        """
+        Sets the asyncio engine used by the `*_async` methods of the model.
+
+        ## Examples
+        ```python
+        from sqlalchemy.ext.asyncio import create_async_engine
+        engine = create_async_engine("sqlite+aiosqlite:///db.sqlite3")
+        User.set_async_engine(engine)
+        ```
+        """
+        cls._async_engine = engine
+
+    @classmethod
+    def get_async_engine(cls) -> AsyncEngine:
+        """
+        Returns the asyncio engine currently associated with this model.
+
+        Raises a `RuntimeError` if no asyncio engine has been set.
+
+        ## Examples
+        ```python
+        engine = User.get_async_engine()
+        ```
+        """
+        bind = cls._bind(Model._async_binds, "set_async_bind")
+        if isinstance(bind, ShardRouter):
+            raise RuntimeError(
+                f"{cls.__name__} is sharded by '{bind.column}', "
+                "its engine depends on the shard key"
+            )
+        if bind is not None:
+            return bind
+
+        if cls._async_engine is None:
+            raise RuntimeError(
+                f"No async engine set for {cls.__name__}. "
+                "Call Model.set_async_engine() first."
+            )
+        return cls._async_engine
+
+    @classmethod
+    def set_bind(cls, name: str, engine: Union[Engine, ShardRouter[Engine]]) -> None:
+        """
+        Sets the engine of a named database, used by the models declaring it as
+        their `__bind__` instead of the default engine.
+
+        A `ShardRouter` can be given instead of an engine, the records of the
+        models bound to it are then spread over the engines of the router.
+
+        ## Examples
+        ```python
+        Model.set_bind("analytics", create_engine(ANALYTICS_URL))
+
+        class MessageLog(Model):
+            __bind__ = "analytics"
+        ```
+        """
+        Model._binds[name] = engine
+
+    @classmethod
+    def set_async_bind(
+        cls, name: str, engine: Union[AsyncEngine, ShardRouter[AsyncEngine]]
+    ) -> None:
+        """
+        Sets the asyncio engine of a named database (see `set_bind`).
+
+        ## Examples
+        ```python
+        Model.set_async_bind("analytics", create_async_engine(ANALYTICS_URL))
+        ```
+        """
+        Model._async_binds[name] = engine
+
+    @classmethod
+    def _bind(cls, binds: Dict[str, E], setter: str) -> Optional[E]:
+        """Returns the engine (or router) of the named database of the model."""
+        name = getattr(cls, "__bind__", None)
+        if name is None:
+            return None
+
+        if name not in binds:
+            raise RuntimeError(
+                f"No database '{name}' set for {cls.__name__}. "
+                f"Call Model.{setter}() first."
+            )
+        return binds[name]
+
+    @classmethod
+    def _shard_router(cls) -> Optional[ShardRouter[Engine]]:
+        """Returns the shard router of the model, if it's sharded."""
+        bind = cls._bind(Model._binds, "set_bind")
+        return bind if isinstance(bind, ShardRouter) else None
+
+    @classmethod
+    def _async_shard_router(cls) -> Optional[ShardRouter[AsyncEngine]]:
+        """Returns the asyncio shard router of the model, if it's sharded."""
+        bind = cls._bind(Model._async_binds, "set_async_bind")
+        return bind if isinstance(bind, ShardRouter) else None
+
+    @classmethod
+    def set_read_engines(cls, *engines: Engine) -> None:
+        """
+        Sets the engines of the read replicas used by the queries of the model.
+
+        Read queries (`all`, `first`, `count`, `find`, ...) are spread over
+        the replicas in turn, while writes always use the primary engine set
+        by `set_engine`. Without replicas, reads use the primary engine. The
+        models bound to another database (`__bind__`) don't use the replicas.
+
+        ## Examples
+        ```python
+        Model.set_read_engines(create_engine(REPLICA_URL))
+        ```
+        """
+        cls._read_engines = list(engines)
+
+    @classmethod
+    def get_read_engine(cls) -> Engine:
+        """
+        Returns the engine of the next read replica, or the primary engine if
+        the model has no replica.
+
+        ## Examples
+        ```python
+        engine = User.get_read_engine()
+        ```
+        """
+        if not cls._read_engines or getattr(cls, "__bind__", None) is not None:
+            return cls.get_engine()
+        return cls._read_engines[next(_read_turns) % len(cls._read_engines)]
+
+    @classmethod
+    def set_async_read_engines(cls, *engines: AsyncEngine) -> None:
+        """
+        Sets the asyncio engines of the read replicas used by the `*_async`
+        read queries of the model.
+
+        ## Examples
+        ```python
+        Model.set_async_read_engines(create_async_engine(REPLICA_URL))
+        ```
+        """
+        cls._async_read_engines = list(engines)
+
+    @classmethod
+    def get_async_read_engine(cls) -> AsyncEngine:
+        """
+        Returns the asyncio engine of the next read replica, or the primary
+        asyncio engine if the model has no replica.
+
+        ## Examples
+        ```python
+        engine = User.get_async_read_engine()
+        ```
+        """
+        if not cls._async_read_engines or getattr(cls, "__bind__", None) is not None:
+            return cls.get_async_engine()
+        return cls._async_read_engines[next(_read_turns) % len(cls._async_read_engines)]
+
+    @classmethod
+    def query(cls: Type[T]) -> Query[T]:
+        """
+        Returns a new query object for the model.
+
+        Enables chaining methods such as `where`, `order_by`, `limit`, etc.
+
+        ## Examples
+        ```python
+        User.query().where(User.active == True).order_by(User.created_at).all()
+        ```
+        """
+        if cls.__name__ == "Model":
+            raise RuntimeError("Cannot query the base Model class")
+        return Query(cls)
+
+    @classmethod
+    def identity_cache(cls) -> Optional[MemoryCache]:
         """
-        Initializes a new instance of the model.
+        Returns the identity cache of the model, or `None` if it has none.
 
-        This method behaves like a regular class constructor,
-        but exists explicitly here to avoid conflicts with query delegation.
-        """
-        if name != "Model":
-            if "table" not in kwargs:
-                kwargs["table"] = True
-        return super().__new__(cls, name, bases, namespace, **kwargs)
+        A model opts in by declaring its cache options. The cache is an LRU with
+        TTL expiration used by `find`, and by `find_by` on unique columns. It's
+        invalidated by the writes done through the model (`save`, `update`,
+        `delete`, `update_all`, ...), but not by writes made outside of it.
 
-    def __getattr__(cls, name: str):
+        Cached records are shared between the lookups, they should be treated as
+        read-only unless saved.
+
+        ## Examples
+        ```python
+        class GuildConfig(Model):
+            __cache__ = {"ttl": 60, "max_size": 10_000}
+
+        GuildConfig.find(guild_id)  # Cached for 60 seconds
+        GuildConfig.identity_cache().stats  # {"hits": 0, "misses": 1, ...}
+        ```
         """
-        Delegates missing class attributes or methods to the model's query object.
+        if cls not in Model._identity_caches:
+            options = getattr(cls, "__cache__", None)
+            Model._identity_caches[cls] = MemoryCache(**options) if options else None
+        return Model._identity_caches[cls]
 
-        When a method such as `where`, `order_by`, or `count` is not found on the model,
-        this metaclass automatically forwards it to a `Query` instance.
+    @classmethod
+    def set_query_cache(cls, cache: MemoryCache) -> None:
+        """
+        Sets the cache used by `Query.cached` for every model.
 
-        This allows expressive query syntax directly on the model.
+        By default, results are cached in memory. A `FileCache` can be used to
+        keep them in a local directory instead.
 
         ## Examples
         ```python
-        # Equivalent to: User.query().where(User.name == "Alice").first()
-        user = User.where(User.name == "Alice").first()
+        from grace.cache import FileCache
+        Model.set_query_cache(FileCache("tmp/cache", max_size=10_000))
+        ```
+        """
+        Model._query_cache = cache
 
-        # Equivalent to: User.query().count()
-        total = User.count()
+    @classmethod
+    def get_query_cache(cls) -> MemoryCache:
+        """
+        Returns the cache used by `Query.cached`, creating it if needed.
+
+        ## Examples
+        ```python
+        User.get_query_cache().stats  # {"hits": 0, "misses": 0, ...}
         ```
         """
-        if cls.__name__ == "Model":
-            raise AttributeError(f"{name} not found on base Model class")
+        if Model._query_cache is None:
+            Model._query_cache = MemoryCache()
+        return Model._query_cache
 
-        if name.startswith("_") or name in {"get_engine", "set_engine", "query"}:
-            raise AttributeError(name)
+    @classmethod
+    def _invalidate(cls, *identities: Any) -> None:
+        """
+        Invalidates the cached records with the given primary key identities,
+        or every cached record of the model if none are given, along with the
+        cached query results using the table of the model.
+        """
+        cls._invalidate_queries(identities)
 
-        query_instance = cls.query()
-        if hasattr(query_instance, name):
-            attr = getattr(query_instance, name)
-            if callable(attr):
+        cache = cls.identity_cache()
+        if cache is None:
+            return
 
-                def wrapper(*args, **kwargs):
-                    return attr(*args, **kwargs)
+        if not identities:
+            cache.clear()
+        for identity in identities:
+            cache.invalidate(identity)
 
-                return wrapper
-            return attr
+    @classmethod
+    def _invalidate_queries(cls, identities: Optional[Tuple] = None) -> None:
+        """
+        Invalidates the cached query results using the table of the model.
 
-        raise AttributeError(f"{cls.__name__} has no attribute '{name}'")
+        In a transaction, they're invalidated once more when it ends, along
+        with the cached records of the `identities` given by `_invalidate`.
+        """
+        if Model._query_cache is not None:
+            Model._query_cache.invalidate(cls.__table__.name)
 
+        # Cached data may be read again before the transaction ends, it is
+        # invalidated once more when it's committed (or rolled back).
+        for transaction in _transactions.get().values():
+            transaction.invalidations.append((cls, identities))
 
-class Model(SQLModel, metaclass=_ModelMeta):
-    _engine: Engine | None = None
+    @classmethod
+    @contextmanager
+    def transaction(cls) -> Iterator[Session]:
+        """
+        Runs the operations of the block in a single database transaction.
+
+        Inside the block, the queries and writes of the models sharing the
+        engine of the model (`save`, `update`, `delete`, `create`, ...) use
+        the same session. Writes are flushed as they happen but committed
+        once, when the block exits, and rolled back if it raises. Nested
+        blocks use savepoints, so an error only rolls back the nested block.
+
+        The records changed in a rolled back transaction should be reloaded
+        before being used again.
+
+        ## Examples
+        ```python
+        with Model.transaction():
+            sender.decrement("coins", by=10)
+            receiver.increment("coins", by=10)
+            Transfer.create(sender_id=sender.id, receiver_id=receiver.id)
+        ```
+        """
+        engine = cls.get_engine()
+        transactions = _transactions.get()
+
+        if engine in transactions:
+            session = transactions[engine].session
+            with session.begin_nested():
+                yield session
+            return
+
+        with Session(
+            engine, expire_on_commit=False, info={"transaction": True}
+        ) as session:
+            transaction = _Transaction(session)
+            token = _transactions.set({**transactions, engine: transaction})
+
+            try:
+                yield session
+                session.commit()
+            except BaseException:
+                session.rollback()
+                raise
+            finally:
+                _transactions.reset(token)
+                for model_class, identities in transaction.invalidations:
+                    if identities is None:
+                        model_class._invalidate_queries()
+                    else:
+                        model_class._invalidate(*identities)
 
     @classmethod
-    def set_engine(cls, engine: Engine):
+    @asynccontextmanager
+    async def transaction_async(cls) -> AsyncIterator[AsyncSession]:
         """
-        Sets the database engine used by the model.
+        Asynchronous version of `transaction`, shared by the asynchronous
+        operations of the block (`save_async`, `find_async`, ...).
 
-        Must be called before performing any queries.
+        When the engine has a single writer (see `enable_single_writer`), the
+        block waits for its turn and keeps it until it exits.
 
         ## Examples
         ```python
-        from sqlmodel import create_engine
-        engine = create_engine("sqlite:///db.sqlite3")
-        User.set_engine(engine)
+        async with Model.transaction_async():
+            await order.save_async()
+            await item.delete_async()
         ```
         """
-        cls._engine = engine
+        engine = cls.get_async_engine()
+        transactions = _transactions.get()
+
+        if engine in transactions:
+            session = transactions[engine].session
+            async with session.begin_nested():
+                yield session
+            return
+
+        async with (
+            writer_lock(engine),
+            AsyncSession(
+                engine, expire_on_commit=False, info={"transaction": True}
+            ) as session,
+        ):
+            transaction = _Transaction(session)
+            token = _transactions.set({**transactions, engine: transaction})
+
+            try:
+                yield session
+                await session.commit()
+            except BaseException:
+                await session.rollback()
+                raise
+            finally:
+                _transactions.reset(token)
+                for model_class, identities in transaction.invalidations:
+                    if identities is None:
+                        model_class._invalidate_queries()
+                    else:
+                        model_class._invalidate(*identities)
 
     @classmethod
-    def get_engine(cls) -> Engine:
+    def buffered(cls) -> WriteBuffer:
         """
-        Returns the engine currently associated with this model.
+        Returns the write-behind buffer of the model.
 
-        Raises a `RuntimeError` if no engine has been set.
+        Buffered writes are coalesced in memory and written in batches
+        periodically, which is useful for high-frequency writes such as counters.
+        Sharded models can't be buffered, their shard key isn't known.
 
         ## Examples
         ```python
-        engine = User.get_engine()
+        User.buffered().increment(user_id, "messages")
+        User.buffered().update(user_id, last_seen=datetime.now())
         ```
         """
-        if cls._engine is None:
+        if cls.__name__ == "Model":
+            raise RuntimeError("Cannot buffer writes of the base Model class")
+
+        router = cls._shard_router()
+        if router is not None:
             raise RuntimeError(
-                f"No session set for {cls.__name__}. Call Model.set_engine() first."
+                f"Cannot buffer writes of {cls.__name__}, it's sharded by "
+                f"'{router.column}' and the buffer only knows the primary keys"
             )
-        return cls._engine
+        return WriteBuffer.for_model(cls)
 
     @classmethod
-    def query(cls: Type[T]) -> Query:
+    def preload(
+        cls, instances: Iterable[T], *relationships: str, batch_size: int = 1000
+    ) -> List[T]:
         """
-        Returns a new query object for the model.
+        Loads the given relationships of already loaded records.
 
-        Enables chaining methods such as `where`, `order_by`, `limit`, etc.
+        Each relationship is loaded for all the records at once, with one
+        `IN (...)` query per `batch_size` records, and set on the records
+        (which don't need to be attached to a session). Nested relationships
+        are loaded with a dotted path. The relationships already loaded on a
+        record are kept and only traversed.
+
+        The related records are matched by the foreign keys of the
+        relationship, its additional join conditions are ignored.
 
         ## Examples
         ```python
-        User.query().where(User.active == True).order_by(User.created_at).all()
+        users = [cached_user, *User.where(User.active == True).all()]
+        Model.preload(users, "posts", "posts.comments")
+
+        for user in users:
+            print(len(user.posts))  # No additional query
         ```
         """
-        if cls.__name__ == "Model":
-            raise RuntimeError("Cannot query the base Model class")
-        return Query(cls)
+        instances = list(instances)
+        if not instances:
+            return instances
+
+        # The records can be of any model when called on the base class
+        query = type(instances[0]).query()
+
+        for path in relationships:
+            parents: List[Any] = instances
+            for attribute in query._relationship_path(path):
+                preload = _Preload(attribute, parents)
+                if preload.pending:
+                    engine = preload.target.query().read_engine
+                    with _session(engine, expire_on_commit=False) as session:
+                        for statement in preload.statements(batch_size):
+                            preload.collect(session.exec(statement).all())
+                parents = preload.attach()
+        return instances
+
+    @classmethod
+    async def preload_async(
+        cls, instances: Iterable[T], *relationships: str, batch_size: int = 1000
+    ) -> List[T]:
+        """
+        Asynchronous version of `preload`.
+
+        ## Examples
+        ```python
+        await Guild.preload_async(guilds, "channels")
+        ```
+        """
+        instances = list(instances)
+        if not instances:
+            return instances
+
+        # The records can be of any model when called on the base class
+        query = type(instances[0]).query()
+
+        for path in relationships:
+            parents: List[Any] = instances
+            for attribute in query._relationship_path(path):
+                preload = _Preload(attribute, parents)
+                if preload.pending:
+                    engine = preload.target.query().async_read_engine
+                    async with _async_session(
+                        engine, expire_on_commit=False
+                    ) as session:
+                        for statement in preload.statements(batch_size):
+                            preload.collect((await session.exec(statement)).all())
+                parents = preload.attach()
+        return instances
+
+    @classmethod
+    def prepare(cls: Type[T], query: Query[T]) -> PreparedQuery[T]:
+        """
+        Prepares a query template, built once and executed with parameters.
+
+        The values of the template are `bindparam`s, given by name to each
+        execution. Use it for the queries run on every command or event, to
+        avoid building the same query again and again.
+
+        ## Examples
+        ```python
+        from sqlalchemy import bindparam
+
+        by_guild = Member.prepare(
+            Member.where(guild_id=bindparam("guild_id")).order_by(Member.xp.desc())
+        )
+
+        by_guild.all(guild_id=guild.id)
+        await by_guild.first_async(guild_id=guild.id)
+        ```
+        """
+        return PreparedQuery(query)
 
     @classmethod
     def create(cls: Type[T], **kwargs) -> T:
@@ -437,24 +2893,366 @@ class Model(SQLModel, metaclass=_ModelMeta):
         instance = cls(**kwargs)
         return instance.save()
 
-    def save(self: T) -> T:
+    @classmethod
+    async def create_async(cls: Type[T], **kwargs) -> T:
+        """
+        Asynchronous version of `create`.
+
+        ## Examples
+        ```python
+        await User.create_async(name="Alice", email="alice@example.com")
+        ```
+        """
+        instance = cls(**kwargs)
+        return await instance.save_async()
+
+    @overload
+    @classmethod
+    def insert_all(
+        cls: Type[T],
+        rows: Iterable[Union[Dict[str, Any], T]],
+        batch_size: int = ...,
+        returning: Literal[False] = ...,
+    ) -> int: ...
+
+    @overload
+    @classmethod
+    def insert_all(
+        cls: Type[T],
+        rows: Iterable[Union[Dict[str, Any], T]],
+        batch_size: int = ...,
+        *,
+        returning: Literal[True],
+    ) -> List[Any]: ...
+
+    @classmethod
+    def insert_all(
+        cls: Type[T],
+        rows: Iterable[Union[Dict[str, Any], T]],
+        batch_size: int = 1000,
+        returning: bool = False,
+    ) -> Union[int, List[Any]]:
+        """
+        Inserts many records using batched `executemany` statements.
+
+        Rows can be dictionaries or model instances. Unlike `create`, the
+        records are inserted in a single transaction and are not refreshed,
+        which makes it suitable to seed or import large amounts of data.
+
+        Returns the number of inserted rows. With `returning=True`, the primary
+        keys of the inserted rows are returned instead (tuples for composite
+        keys), which requires a dialect supporting `RETURNING`.
+
+        Rows of a sharded model are inserted in one transaction per shard, and
+        their primary keys returned grouped by shard.
+
+        ## Examples
+        ```python
+        User.insert_all([{"name": "Alice"}, {"name": "Bob"}], batch_size=500)
+        ids = User.insert_all(users, returning=True)
+        ```
+        """
+        table = cls.__table__
+        pk_columns = inspect(cls).primary_key
+        shards = cls._shard_rows(rows)
+
+        for engine in shards:
+            if returning and not engine.dialect.insert_executemany_returning:
+                raise RuntimeError(
+                    f"{engine.dialect.name} does not support RETURNING on bulk inserts"
+                )
+
+        inserted: List[Any] = []
+        count = 0
+
+        for engine, values in shards.items():
+            with _session(engine) as session:
+                for params in cls._row_batches(values, batch_size):
+                    statement = insert(table)
+
+                    if returning:
+                        statement = statement.returning(
+                            *pk_columns, sort_by_parameter_order=True
+                        )
+                        result = session.exec(statement, params=params)
+                        inserted.extend(
+                            row[0] if len(pk_columns) == 1 else tuple(row)
+                            for row in result
+                        )
+                    else:
+                        session.exec(statement, params=params)
+                    count += len(params)
+                _commit(session)
+
+        cls._invalidate_queries()
+        return inserted if returning else count
+
+    @classmethod
+    def upsert(
+        cls: Type[T],
+        values: Union[Dict[str, Any], T],
+        conflict: Optional[List[str]] = None,
+        update: Optional[Union[List[str], Dict[str, Any]]] = None,
+    ) -> T:
+        """
+        Inserts a record or updates it if it conflicts with an existing one.
+
+        The operation is done in a single `INSERT ... ON CONFLICT` statement,
+        which avoids the race condition of finding the record first.
+
+        `conflict` lists the columns of the unique constraint to check (the
+        primary key by default). `update` lists the columns to update on
+        conflict (every given column except the conflict ones by default), or
+        maps them to SQL expressions. Returns the inserted or updated record.
+
+        ## Examples
+        ```python
+        Member.upsert({"user_id": 42, "name": "Alice"}, conflict=["user_id"])
+
+        # Increments the xp when the member already exists
+        Member.upsert(
+            {"user_id": 42, "xp": 5},
+            conflict=["user_id"],
+            update={"xp": Member.xp + 5},
+        )
+        ```
+        """
+        row = cls._row_values(values, defaults=False)
+        engine = cls._row_engine(row)
+        statement = cls._upsert_statement(engine, cls, row, conflict, update)
+
+        with _session(engine, expire_on_commit=False) as session:
+            instance = session.exec(statement.returning(cls)).scalars().one()
+            _commit(session)
+
+        cls._invalidate(instance._primary_key_identity("upsert"))
+        return instance
+
+    @classmethod
+    def upsert_all(
+        cls: Type[T],
+        rows: Iterable[Union[Dict[str, Any], T]],
+        conflict: Optional[List[str]] = None,
+        update: Optional[Union[List[str], Dict[str, Any]]] = None,
+        batch_size: int = 1000,
+    ) -> int:
+        """
+        Upserts many records using batched `INSERT ... ON CONFLICT` statements.
+
+        Accepts the same `conflict` and `update` arguments as `upsert` and
+        returns the number of processed rows. Rows of a sharded model are
+        upserted in one transaction per shard.
+
+        ## Examples
+        ```python
+        Member.upsert_all(
+            [{"user_id": 1, "name": "Alice"}, {"user_id": 2, "name": "Bob"}],
+            conflict=["user_id"],
+        )
+        ```
+        """
+        count = 0
+
+        for engine, values in cls._shard_rows(rows, defaults=False).items():
+            with _session(engine) as session:
+                for params in cls._row_batches(values, batch_size):
+                    statement = cls._upsert_statement(
+                        engine, cls.__table__, params[0], conflict, update
+                    )
+                    session.exec(statement, params=params)
+                    count += len(params)
+                _commit(session)
+
+        cls._invalidate()
+        return count
+
+    @classmethod
+    def _upsert_statement(
+        cls,
+        engine: Engine,
+        target: Any,
+        row: Dict[str, Any],
+        conflict: Optional[List[str]],
+        update: Optional[Union[List[str], Dict[str, Any]]],
+    ):
+        """
+        Builds the dialect specific `INSERT ... ON CONFLICT DO UPDATE` statement.
+
+        When `row` is used as the statement values, the returned statement is
+        executed as is. Otherwise, it's expected to be executed with the rows
+        as parameters (executemany).
+        """
+        dialect = engine.dialect.name
+        if dialect not in UPSERT_DIALECTS:
+            raise RuntimeError(f"Upsert is not supported on {dialect}")
+
+        statement = UPSERT_DIALECTS[dialect](target)
+        if target is cls:
+            statement = statement.values(**row)
+
+        if conflict is None:
+            conflict = [column.key for column in inspect(cls).primary_key]
+
+        if update is None:
+            update = [key for key in row if key not in conflict]
+
+        if isinstance(update, dict):
+            set_ = dict(update)
+        else:
+            set_ = {key: statement.excluded[key] for key in update}
+
+        # Updating a conflict column to its own value keeps the statement an
+        # upsert (and the record returned) when there's nothing else to update.
+        if not set_:
+            set_ = {conflict[0]: statement.excluded[conflict[0]]}
+
+        return statement.on_conflict_do_update(index_elements=conflict, set_=set_)
+
+    @classmethod
+    def _shard_rows(
+        cls,
+        rows: Iterable[Union[Dict[str, Any], "Model"]],
+        defaults: bool = True,
+    ) -> Dict[Engine, Iterable[Dict[str, Any]]]:
+        """
+        Converts the rows to column values, grouped by the engine they are
+        written to: the shard of their shard key for sharded models.
+        """
+        values = (cls._row_values(row, defaults) for row in rows)
+
+        if cls._shard_router() is None:
+            return {cls.get_engine(): values}
+
+        shards: Dict[Engine, List[Dict[str, Any]]] = {}
+        for row in values:
+            shards.setdefault(cls._row_engine(row), []).append(row)
+        return dict(shards)
+
+    @classmethod
+    def _row_engine(cls, values: Dict[str, Any]) -> Engine:
+        """Returns the engine a row given as column values is written to."""
+        router = cls._shard_router()
+        if router is None:
+            return cls.get_engine()
+        return router.route(values.get(router.column))
+
+    @classmethod
+    def _row_batches(
+        cls, values: Iterable[Dict[str, Any]], batch_size: int
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Splits the column values of the rows in batches.
+
+        `executemany` requires every row of a statement to have the same keys,
+        so each batch is further split when the keys of the rows differ.
+        """
+        for batch in _batched(values, batch_size):
+            for _, group in groupby(batch, key=frozenset):
+                yield list(group)
+
+    @classmethod
+    def _row_values(
+        cls, row: Union[Dict[str, Any], "Model"], defaults: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Returns the column values of a row given as a dictionary or an instance.
+
+        Primary keys left to `None` are omitted so the database can generate
+        them. Without `defaults`, only the values explicitly given in a
+        dictionary are returned and the column defaults are left to the insert
+        statement. Every column value of an instance is returned.
+        """
+        instance = cls(**row) if isinstance(row, dict) else row
+        columns = inspect(cls).columns
+        values = instance.model_dump(
+            include={column.key for column in columns},
+            exclude_unset=isinstance(row, dict) and not defaults,
+        )
+
+        for column in columns:
+            if column.primary_key and values.get(column.key) is None:
+                values.pop(column.key, None)
+        return values
+
+    def save(self: T, refresh: bool = False) -> T:
         """
         Saves the current model instance to the database.
 
-        Commits changes immediately and refreshes the instance.
+        New records are inserted, and existing ones are updated with only
+        the columns that changed since they were loaded or last saved. Saving
+        an unchanged record does nothing. Changes are committed immediately,
+        unless the instance is saved in a `transaction`.
+
+        The instance is reloaded afterwards only if `refresh` is set, which
+        costs a `SELECT` but picks up the values computed by the database
+        (ex. server defaults or triggers). Primary keys generated on insert
+        are always set.
 
         ## Examples
         ```python
         user = User(name="Alice")
         user.save()
+
+        user.name = "Alice Smith"
+        user.save()  # UPDATE user SET name=? WHERE user.id = ?
+        user.save()  # No-op
         ```
         """
-        with Session(self.get_engine(), expire_on_commit=False) as session:
-            session.add(self)
-            session.commit()
-            session.refresh(self)
+        if not self._needs_save():
             return self
 
+        with _session(self._instance_engine(), expire_on_commit=False) as session:
+            # Merged into the copy of the record a transaction already loaded
+            instance = self
+            if self._loaded_copy(session) is None:
+                session.add(self)
+            else:
+                instance = session.merge(self)
+            _commit(session)
+            if refresh:
+                session.refresh(instance)
+
+        if instance is not self:
+            self._copy_from(instance)
+        self._invalidate(self._primary_key_identity("save"))
+        return self
+
+    @property
+    def changes(self) -> Dict[str, Tuple[Any, Any]]:
+        """
+        The columns changed since the record was loaded or last saved, mapped
+        to their `(old, new)` values.
+
+        ## Examples
+        ```python
+        user.name = "Bob"
+        user.changes  # {"name": ("Alice", "Bob")}
+        ```
+        """
+        changes: Dict[str, Tuple[Any, Any]] = {}
+        state = inspect(self)
+        if state is None:
+            return changes
+
+        for column in inspect(self.__class__).column_attrs:
+            history = state.attrs[column.key].history
+            if history.has_changes():
+                old = history.deleted[0] if history.deleted else None
+                changes[column.key] = (old, history.added[0] if history.added else None)
+        return changes
+
+    @property
+    def has_changes(self) -> bool:
+        """Whether the record has unsaved changes (or was never saved)."""
+        return self._needs_save()
+
+    def _needs_save(self) -> bool:
+        """Returns whether the instance is new or has changed attributes."""
+        state = inspect(self)
+        if state is None or state.key is None:
+            return True
+        return any(attribute.history.has_changes() for attribute in state.attrs)
+
     def delete(self) -> None:
         """
         Deletes the current record from the database.
@@ -465,11 +3263,11 @@ class Model(SQLModel, metaclass=_ModelMeta):
         user.delete()
         ```
         """
-        with Session(self.get_engine()) as session:
-            # Merge the instance into the session if it's detached
-            instance = session.merge(self)
-            session.delete(instance)
-            session.commit()
+        with _session(self._instance_engine()) as session:
+            session.delete(self._attach(session))
+            _commit(session)
+
+        self._invalidate(self._primary_key_identity("delete"))
 
     def update(self, **kwargs) -> Self:
         """
@@ -487,6 +3285,51 @@ class Model(SQLModel, metaclass=_ModelMeta):
                 setattr(self, key, value)
         return self.save()
 
+    def increment(self, column: str, by: Any = 1, returning: bool = False) -> Self:
+        """
+        Atomically increments a column of the record in a single statement.
+
+        Unlike `update(count=user.count + 1)`, the increment is done by the
+        database, so concurrent increments are never lost. The instance is
+        incremented locally, or set to the value stored in the database when
+        `returning=True` (requires a dialect supporting `RETURNING`).
+
+        ## Examples
+        ```python
+        user.increment("xp", by=5)
+        user.increment("messages", returning=True)
+        ```
+        """
+        query = self._instance_query().where(self._primary_key_condition("update"))
+        identities = (self._primary_key_identity("update"),)
+
+        if returning:
+            values = query._increment(column, by, True, identities)
+            if not values:
+                raise ValueError(f"Record no longer exists in database")
+            value = values[0]
+        else:
+            query._increment(column, by, False, identities)
+            value = getattr(self, column) + by
+
+        # The new value is the committed state of the record, setting it as
+        # such prevents a later `save` from sending it back to the database.
+        set_committed_value(self, column, value)
+        return self
+
+    def decrement(self, column: str, by: Any = 1, returning: bool = False) -> Self:
+        """
+        Atomically decrements a column of the record in a single statement.
+
+        Equivalent to `increment` with a negated `by`.
+
+        ## Examples
+        ```python
+        item.decrement("stock")
+        ```
+        """
+        return self.increment(column, -by, returning)
+
     def reload(self: T) -> T:
         """
         Reloads the instance from the database, discarding any unsaved changes.
@@ -500,12 +3343,130 @@ class Model(SQLModel, metaclass=_ModelMeta):
         user.reload()  # Discards the change
         ```
         """
-        mapper = inspect(self.__class__)
-        pk_columns = mapper.primary_key
+        pk_identity = self._primary_key_identity("reload")
+
+        with _session(self._instance_engine(), expire_on_commit=False) as session:
+            return self._copy_from(
+                session.get(self.__class__, pk_identity, populate_existing=True)
+            )
+
+    async def save_async(self: T, refresh: bool = False) -> T:
+        """
+        Asynchronous version of `save`.
+
+        ## Examples
+        ```python
+        user = User(name="Alice")
+        await user.save_async()
+        ```
+        """
+        if not self._needs_save():
+            return self
+
+        async with _async_session(
+            self._instance_async_engine(), write=True, expire_on_commit=False
+        ) as session:
+            instance = self
+            if self._loaded_copy(session.sync_session) is None:
+                session.add(self)
+            else:
+                instance = await session.merge(self)
+            await _commit_async(session)
+            if refresh:
+                await session.refresh(instance)
+
+        if instance is not self:
+            self._copy_from(instance)
+        self._invalidate(self._primary_key_identity("save"))
+        return self
+
+    async def delete_async(self) -> None:
+        """
+        Asynchronous version of `delete`.
+
+        ## Examples
+        ```python
+        user = await User.find_async(1)
+        await user.delete_async()
+        ```
+        """
+        async with _async_session(self._instance_async_engine(), write=True) as session:
+            await session.delete(self._attach(session.sync_session))
+            await _commit_async(session)
+
+        self._invalidate(self._primary_key_identity("delete"))
+
+    async def reload_async(self: T) -> T:
+        """
+        Asynchronous version of `reload`.
+
+        ## Examples
+        ```python
+        await user.reload_async()
+        ```
+        """
+        pk_identity = self._primary_key_identity("reload")
+
+        async with _async_session(
+            self._instance_async_engine(), expire_on_commit=False
+        ) as session:
+            return self._copy_from(
+                await session.get(self.__class__, pk_identity, populate_existing=True)
+            )
+
+    def _instance_engine(self) -> Engine:
+        """Returns the engine of the record, which depends on its shard key."""
+        router = self._shard_router()
+        if router is None:
+            return self.get_engine()
+        return router.route(getattr(self, router.column))
+
+    def _instance_async_engine(self) -> AsyncEngine:
+        """Asyncio version of `_instance_engine`."""
+        router = self._async_shard_router()
+        if router is None:
+            return self.get_async_engine()
+        return router.route(getattr(self, router.column))
+
+    def _instance_query(self) -> Query[Self]:
+        """Returns a query on the engine of the record."""
+        query = self.__class__.query()
+        router = self._shard_router()
+        if router is not None:
+            query.on_shard(getattr(self, router.column))
+        return query
+
+    def _attach(self, session: Session) -> Self:
+        """
+        Attaches the instance to the session.
+
+        Detached instances are added back directly, which avoids the `SELECT`
+        done by `merge`. Others (ex. transient instances with a primary key)
+        and the records the session already loaded a copy of (ex. in a
+        `transaction`) are merged into the session.
+        """
+        state = inspect(self)
+        if state is not None and state.detached and self._loaded_copy(session) is None:
+            session.add(self)
+            return self
+        return session.merge(self)
+
+    def _loaded_copy(self, session: Session) -> Optional[Self]:
+        """Returns another copy of the record loaded in the session, if any."""
+        state = inspect(self)
+        if state is None or state.key is None:
+            return None
+
+        loaded = session.identity_map.get(state.key)
+        return None if loaded is self else loaded
+
+    def _primary_key_identity(self, action: str) -> Any:
+        """Returns the primary key identity of the instance."""
+        pk_columns = inspect(self.__class__).primary_key
 
         if not pk_columns:
             raise ValueError(
-                f"Cannot reload: {self.__class__.__name__} has no primary key"
+                f"Cannot {action}: {self.__class__.__name__} has no primary key"
             )
 
         # Get the primary key value(s)
@@ -514,20 +3475,29 @@ class Model(SQLModel, metaclass=_ModelMeta):
             pk_value = getattr(self, pk_column.key, None)
             if pk_value is None:
                 raise ValueError(
-                    "Cannot reload an unsaved record (primary key is None)"
+                    f"Cannot {action} an unsaved record (primary key is None)"
                 )
             pk_values.append(pk_value)
 
         # For composite keys, use tuple; for single key, use scalar
-        pk_identity = tuple(pk_values) if len(pk_values) > 1 else pk_values[0]
+        return tuple(pk_values) if len(pk_values) > 1 else pk_values[0]
 
-        with Session(self.get_engine(), expire_on_commit=False) as session:
-            fresh = session.get(self.__class__, pk_identity)
-            if not fresh:
-                raise ValueError(f"Record no longer exists in database")
+    def _primary_key_condition(self, action: str):
+        """Returns the condition matching the primary key of the instance."""
+        identity = self._primary_key_identity(action)
+        pk_columns = inspect(self.__class__).primary_key
 
-            # Copy all attributes from fresh instance
-            for column in mapper.columns:
-                setattr(self, column.key, getattr(fresh, column.key))
+        if len(pk_columns) == 1:
+            return pk_columns[0] == identity
+        return and_(*(column == value for column, value in zip(pk_columns, identity)))
 
-            return self
+    def _copy_from(self: T, fresh: Optional[T]) -> T:
+        """Copies all the column values of a freshly loaded instance."""
+        if not fresh:
+            raise ValueError(f"Record no longer exists in database")
+
+        # Committed values, so the reloaded instance has no pending changes
+        for column in inspect(self.__class__).column_attrs:
+            set_committed_value(self, column.key, getattr(fresh, column.key))
+
+        return self
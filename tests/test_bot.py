@@ -0,0 +1,107 @@
+from inspect import iscoroutinefunction, signature
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from discord import Intents, InteractionType
+from discord.app_commands import CommandTree as DiscordCommandTree
+from discord.ext.commands import Bot as DiscordBot
+from sqlalchemy import create_engine, text
+
+from grace.bot import Bot, CommandTree
+from grace.exceptions import QueryBudgetError
+from grace.instrumentation import QueryInstrumentation, query_budget
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def bot(engine):
+    instrumentation = QueryInstrumentation(slow_query_threshold=None)
+    instrumentation.instrument(engine)
+
+    app = SimpleNamespace(client={}, instrumentation=instrumentation)
+    return Bot(app, intents=Intents.none())  # type: ignore[arg-type]
+
+
+def run_query(engine):
+    async def query(*args, **kwargs) -> None:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    return query
+
+
+@query_budget(0)
+async def ping() -> None: ...
+
+
+def command(name: str) -> MagicMock:
+    command = MagicMock(qualified_name=name, callback=ping)
+    command.name = name
+    return command
+
+
+def test_bot_uses_command_tree(bot):
+    assert isinstance(bot.tree, CommandTree)
+
+
+@pytest.mark.asyncio
+async def test_bot_invoke_tracks_command(bot, engine, monkeypatch):
+    monkeypatch.setattr(DiscordBot, "invoke", run_query(engine))
+    ctx = MagicMock(command=command("ping"))
+
+    await bot.invoke(ctx)
+
+    stats = bot.app.instrumentation.commands["ping"]
+    assert (stats.invocations, stats.queries) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_bot_invoke_checks_command_budget(bot, engine, monkeypatch):
+    monkeypatch.setattr(DiscordBot, "invoke", run_query(engine))
+    bot.app.instrumentation.n_plus_one = "raise"
+
+    with pytest.raises(
+        QueryBudgetError, match="'ping' executed 1 queries for a budget of 0"
+    ):
+        await bot.invoke(MagicMock(command=command("ping")))
+
+
+def test_command_tree_overrides_discord_call():
+    # CommandTree relies on this private method of discord.py to track commands
+    call = getattr(DiscordCommandTree, "_call", None)
+
+    assert iscoroutinefunction(call)
+    assert list(signature(call).parameters) == ["self", "interaction"]
+    assert "_call" in vars(CommandTree)
+
+
+@pytest.mark.asyncio
+async def test_command_tree_tracks_application_commands(bot, engine, monkeypatch):
+    monkeypatch.setattr(DiscordCommandTree, "_call", run_query(engine))
+    interaction = MagicMock(
+        command=command("ping"), type=InteractionType.application_command
+    )
+
+    await bot.tree._call(interaction)
+
+    stats = bot.app.instrumentation.commands["ping"]
+    assert (stats.invocations, stats.queries) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_command_tree_ignores_autocomplete(bot, engine, monkeypatch):
+    call = AsyncMock()
+    monkeypatch.setattr(DiscordCommandTree, "_call", call)
+    interaction = MagicMock(command=command("ping"), type=InteractionType.autocomplete)
+
+    await bot.tree._call(interaction)
+
+    call.assert_awaited_once_with(interaction)
+    assert "ping" not in bot.app.instrumentation.commands
@@ -0,0 +1,136 @@
+from typing import Optional
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Field, SQLModel
+
+from grace.buffer import WriteBuffer
+from grace.exceptions import BufferFlushError
+from grace.model import Model
+
+
+class Counter(Model, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = ""
+    messages: int = 0
+    reactions: int = 0
+
+
+class Gauge(Model, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    value: int = 0
+
+
+@pytest.fixture
+def buffer():
+    # The asynchronous flush runs in a thread, which must share the database
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    Counter.set_engine(engine)
+    Gauge.set_engine(engine)
+    Counter.insert_all([{"name": "first"}, {"name": "second"}])
+
+    buffer = Counter.buffered()
+    yield buffer
+
+    WriteBuffer._buffers.clear()
+    engine.dispose()
+
+
+def test_buffered_returns_same_buffer(buffer):
+    assert Counter.buffered() is buffer
+    assert buffer.model_class is Counter
+
+
+def test_increments_are_coalesced(buffer):
+    for _ in range(10):
+        buffer.increment(1, "messages")
+    buffer.increment(2, "reactions", by=3)
+    buffer.decrement(2, "reactions")
+
+    assert buffer.depth == 2
+    assert Counter.find(1).messages == 0
+
+    assert buffer.flush() == 2
+    assert buffer.depth == 0
+    assert Counter.find(1).messages == 10
+    assert Counter.find(2).reactions == 2
+
+
+def test_update_and_increment(buffer):
+    buffer.increment(1, "messages", by=2)
+    buffer.update(1, messages=5, name="updated")
+    buffer.increment(1, "messages")
+
+    buffer.flush()
+    counter = Counter.find(1)
+
+    assert counter.messages == 6
+    assert counter.name == "updated"
+
+
+def test_stats(buffer):
+    buffer.increment(1, "messages")
+
+    assert buffer.stats["depth"] == 1
+    assert buffer.stats["flushes"] == 0
+
+    buffer.flush()
+
+    assert buffer.stats["depth"] == 0
+    assert buffer.stats["flushes"] == 1
+    assert buffer.stats["flushed"] == 1
+    assert buffer.stats["last_flush_latency"] > 0
+
+
+def test_flush_empty_buffer(buffer):
+    assert buffer.flush() == 0
+    assert buffer.stats["flushes"] == 0
+
+
+def test_invalid_column_raises_error(buffer):
+    with pytest.raises(AttributeError, match="has no column 'invalid'"):
+        buffer.increment(1, "invalid")
+
+
+def test_failed_flush_restores_changes(buffer, mocker):
+    buffer.increment(1, "messages", by=2)
+    mocker.patch("grace.buffer.Session.exec", side_effect=RuntimeError("failure"))
+
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+
+    mocker.stopall()
+    buffer.increment(1, "messages")
+
+    assert buffer.depth == 1
+    buffer.flush()
+    assert Counter.find(1).messages == 3
+
+
+@pytest.mark.asyncio
+async def test_flush_all_async(buffer):
+    buffer.increment(1, "messages")
+
+    assert await WriteBuffer.flush_all_async() == 1
+    assert Counter.find(1).messages == 1
+
+
+def test_flush_all_flushes_every_buffer_despite_failures(buffer, mocker):
+    Gauge.create()
+    buffer.increment(1, "messages")
+    Gauge.buffered().increment(1, "value", by=4)
+    mocker.patch.object(buffer, "flush", side_effect=RuntimeError("failure"))
+
+    with pytest.raises(BufferFlushError, match=r"Counter \(failure\)") as info:
+        WriteBuffer.flush_all()
+
+    assert info.value.flushed == 1
+    assert list(info.value.errors) == ["Counter"]
+    assert Gauge.buffered().depth == 0
+    assert Gauge.find(1).value == 4
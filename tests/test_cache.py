@@ -0,0 +1,101 @@
+import pytest
+
+from grace.cache import FileCache, MemoryCache
+
+
+@pytest.fixture
+def cache():
+    return MemoryCache(max_size=3)
+
+
+def test_get_and_set(cache):
+    cache.set("key", "value")
+
+    assert cache.get("key") == "value"
+    assert cache.get("missing") is None
+    assert cache.get("missing", "default") == "default"
+
+
+def test_stats(cache):
+    cache.set("key", "value")
+    cache.get("key")
+    cache.get("missing")
+
+    assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0, "size": 1}
+
+
+def test_least_recently_used_is_evicted(cache):
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    cache.get("a")
+    cache.set("d", 4)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert len(cache) == 3
+    assert cache.evictions == 1
+
+
+def test_ttl_expiration(cache, mocker):
+    monotonic = mocker.patch("grace.cache.monotonic", return_value=100)
+    cache.set("short", 1, ttl=10)
+    cache.set("forever", 2)
+
+    monotonic.return_value = 111
+
+    assert cache.get("short") is None
+    assert cache.get("forever") == 2
+
+
+def test_invalidate_tag(cache):
+    cache.set("a", 1, tags=["users"])
+    cache.set("b", 2, tags=["users", "guilds"])
+    cache.set("c", 3, tags=["guilds"])
+
+    cache.invalidate("users")
+
+    assert "a" not in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_delete_and_clear(cache):
+    cache.set("a", 1, tags=["tag"])
+    cache.set("b", 2)
+
+    cache.delete("a")
+    assert "a" not in cache
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError, match="at least 1"):
+        MemoryCache(max_size=0)
+
+
+def test_file_cache(tmp_path):
+    cache = FileCache(tmp_path / "cache", max_size=2)
+    cache.set("a", {"value": 1}, tags=["tag"])
+    cache.set("b", [1, 2, 3])
+
+    assert cache.get("a") == {"value": 1}
+    assert cache.get("b") == [1, 2, 3]
+    assert len(list((tmp_path / "cache").glob("*.cache"))) == 2
+
+
+def test_file_cache_removes_files(tmp_path):
+    cache = FileCache(tmp_path, max_size=2)
+    cache.set("a", 1, tags=["tag"])
+    cache.set("b", 2)
+    cache.set("c", 3)
+
+    assert cache.get("a") is None
+    assert len(list(tmp_path.glob("*.cache"))) == 2
+
+    cache.invalidate("tag")
+    cache.clear()
+
+    assert list(tmp_path.glob("*.cache")) == []
@@ -0,0 +1,192 @@
+from asyncio import gather, sleep
+from configparser import ConfigParser
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from grace.engine import (
+    PoolMonitor,
+    ShardRouter,
+    apply_sqlite_pragmas,
+    enable_single_writer,
+    engine_options,
+    make_async_url,
+    sqlite_pragmas,
+    writer_lock,
+)
+from grace.exceptions import ConfigError
+
+
+def section(**values):
+    parser = ConfigParser()
+    parser["database.test"] = values
+    return parser["database.test"]
+
+
+def test_make_async_url():
+    assert str(make_async_url("sqlite:///grace.db")) == "sqlite+aiosqlite:///grace.db"
+    assert (
+        make_async_url("postgresql+asyncpg://localhost/grace").drivername
+        == "postgresql+asyncpg"
+    )
+
+
+def test_engine_options():
+    options = engine_options(
+        section(
+            adapter="sqlite",
+            pool_size="10",
+            max_overflow="0",
+            pool_timeout="2.5",
+            pool_pre_ping="yes",
+            connect_args='{"timeout": 30}',
+        )
+    )
+
+    assert options == {
+        "pool_size": 10,
+        "max_overflow": 0,
+        "pool_timeout": 2.5,
+        "pool_pre_ping": True,
+        "connect_args": {"timeout": 30},
+    }
+
+
+def test_engine_options_defaults():
+    assert engine_options(section(adapter="sqlite", database="grace.db")) == {}
+
+
+@pytest.mark.parametrize(
+    "values",
+    [{"pool_size": "many"}, {"pool_pre_ping": "maybe"}, {"connect_args": "[1, 2]"}],
+)
+def test_invalid_engine_options_raise_error(values):
+    with pytest.raises(ConfigError):
+        engine_options(section(**values))
+
+
+def test_pool_monitor(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", pool_size=2)
+    monitor = PoolMonitor(engine)
+
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text("SELECT 1"))
+        second.execute(text("SELECT 1"))
+        assert monitor.stats["checked_out"] == 2
+
+    stats = monitor.stats
+    assert stats["size"] == 2
+    assert stats["checked_out"] == 0
+    assert stats["checked_in"] == 2
+    assert stats["connections"] == 2
+    assert stats["checkouts"] == 2
+    assert stats["peak_checked_out"] == 2
+    assert stats["wait_time"] > 0
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_monitor_async_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    monitor = PoolMonitor(engine)
+
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+    assert monitor.stats["checkouts"] == 1
+    await engine.dispose()
+
+
+def test_sqlite_pragmas():
+    assert sqlite_pragmas(section(journal_mode="wal", busy_timeout="1000")) == {
+        "journal_mode": "WAL",
+        "busy_timeout": 1000,
+    }
+
+
+def test_sqlite_profile():
+    pragmas = sqlite_pragmas(section(sqlite_profile="performance", synchronous="full"))
+
+    assert pragmas["journal_mode"] == "WAL"
+    assert pragmas["synchronous"] == "FULL"
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        {"sqlite_profile": "fastest"},
+        {"journal_mode": "wal; DROP TABLE user"},
+        {"cache_size": "big"},
+    ],
+)
+def test_invalid_sqlite_pragmas_raise_error(values):
+    with pytest.raises(ConfigError):
+        sqlite_pragmas(section(**values))
+
+
+def test_apply_sqlite_pragmas(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    apply_sqlite_pragmas(engine, {"journal_mode": "WAL", "synchronous": "NORMAL"})
+
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_apply_sqlite_pragmas_async_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    apply_sqlite_pragmas(engine, {"busy_timeout": 1234})
+
+    async with engine.connect() as connection:
+        result = await connection.execute(text("PRAGMA busy_timeout"))
+        assert result.scalar() == 1234
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_single_writer(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    enable_single_writer(engine)
+    running = 0
+    peak = 0
+
+    async def tracked_write():
+        nonlocal running, peak
+        async with writer_lock(engine):
+            running += 1
+            peak = max(peak, running)
+            await sleep(0.01)
+            running -= 1
+
+    await gather(*(tracked_write() for _ in range(5)))
+
+    assert peak == 1
+    await engine.dispose()
+
+
+def test_shard_router():
+    engines = [create_engine("sqlite://") for _ in range(3)]
+    router = ShardRouter("guild_id", engines)
+
+    assert router.route(4) is engines[1]
+    assert router.route("guild") is router.route("guild")
+    assert router.shard("guild") in range(3)
+
+
+def test_shard_router_custom_key():
+    eu, us = create_engine("sqlite://"), create_engine("sqlite://")
+    router = ShardRouter("region", [eu, us], key=lambda value: value == "us")
+
+    assert router.route("us") is us
+    assert router.route("eu") is eu
+
+
+def test_shard_router_invalid_values():
+    with pytest.raises(ValueError):
+        ShardRouter("guild_id", [])
+
+    with pytest.raises(ValueError, match="can't be None"):
+        ShardRouter("guild_id", [create_engine("sqlite://")]).route(None)
@@ -0,0 +1,272 @@
+from typing import List, Optional
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Field, Relationship, SQLModel
+
+from grace.exceptions import QueryBudgetError
+from grace.instrumentation import (
+    LatencyHistogram,
+    QueryInstrumentation,
+    normalize_sql,
+    query_budget,
+)
+from grace.model import Model
+
+
+class Note(Model, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    content: str = ""
+    notebook_id: Optional[int] = Field(default=None, foreign_key="notebook.id")
+    notebook: Optional["Notebook"] = Relationship(back_populates="notes")
+
+
+class Notebook(Model, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    notes: List[Note] = Relationship(back_populates="notebook")
+
+
+@pytest.fixture
+def instrumentation():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    Note.set_engine(engine)
+    Notebook.set_engine(engine)
+
+    instrumentation = QueryInstrumentation(slow_query_threshold=None)
+    instrumentation.instrument(engine)
+    yield instrumentation
+    engine.dispose()
+
+
+@pytest.mark.parametrize(
+    "statement, normalized",
+    [
+        (
+            "SELECT *\n  FROM user WHERE id IN (?, ?, ?) AND age > 18",
+            "SELECT * FROM user WHERE id IN (...) AND age > ?",
+        ),
+        (
+            "SELECT * FROM user WHERE name = 'O''Brien'",
+            "SELECT * FROM user WHERE name = ?",
+        ),
+        ("SELECT * FROM user WHERE id = %(id_1)s", "SELECT * FROM user WHERE id = ?"),
+        ("SELECT $1::text, count_1 FROM anon_1", "SELECT ?::text, count_1 FROM anon_1"),
+        (
+            "INSERT INTO user (a, b) VALUES (?, ?), (?, ?)",
+            "INSERT INTO user (a, b) VALUES (...)",
+        ),
+    ],
+)
+def test_normalize_sql(statement, normalized):
+    assert normalize_sql(statement) == normalized
+
+
+def test_normalize_sql_is_memoized(instrumentation):
+    normalize_sql.cache_clear()
+
+    for _ in range(3):
+        Note.count()
+
+    assert normalize_sql.cache_info().misses == 1
+    assert normalize_sql.cache_info().hits == 2
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    for latency in [0.002] * 90 + [0.2] * 9 + [3.0]:
+        histogram.record(latency)
+
+    assert histogram.count == 100
+    assert histogram.percentile(50) == 0.005
+    assert histogram.percentile(95) == 0.25
+    assert histogram.percentile(100) == 3.0
+    assert histogram.stats["max"] == 3.0
+
+
+def test_statements_are_recorded(instrumentation):
+    Note.create(content="first")
+    Note.create(content="second")
+    Note.find(1)
+
+    counts = {sql: h.count for sql, h in instrumentation.statements.items()}
+
+    assert counts["INSERT INTO note (content, notebook_id) VALUES (?, ?)"] == 2
+    assert any(sql.startswith("SELECT note.id") for sql in counts)
+
+
+def test_track_command(instrumentation):
+    with instrumentation.track("notes"):
+        Note.create(content="first")
+        Note.count()
+
+    with instrumentation.track("notes"):
+        Note.count()
+
+    Note.count()
+    stats = instrumentation.commands["notes"].stats
+
+    assert stats["invocations"] == 2
+    assert stats["queries"] == 3
+    assert stats["max_queries"] == 2
+    assert stats["db_time"] > 0
+
+
+def test_slow_query_log(instrumentation, caplog):
+    instrumentation.slow_query_threshold = 0
+
+    with instrumentation.track("notes"):
+        Note.count()
+
+    [slow_query] = instrumentation.slow_queries
+    assert slow_query.command == "notes"
+    assert slow_query.statement.startswith("SELECT count(*)")
+    assert "Slow query" in caplog.text and "in 'notes'" in caplog.text
+
+
+def test_failed_statement(instrumentation):
+    engine = Note.get_engine()
+
+    with pytest.raises(Exception):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT * FROM missing"))
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert instrumentation.statements["SELECT ?"].count == 1
+
+
+@pytest.mark.asyncio
+async def test_track_async_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    instrumentation = QueryInstrumentation()
+    instrumentation.instrument(engine)
+
+    with instrumentation.track("async"):
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    assert instrumentation.commands["async"].queries == 1
+    await engine.dispose()
+
+
+@pytest.fixture
+def notebooks(instrumentation):
+    for _ in range(3):
+        notebook = Notebook.create()
+        Note.create(content="note", notebook_id=notebook.id)
+    return instrumentation
+
+
+def test_n_plus_one_off_by_default(notebooks, caplog):
+    with notebooks.track("notes") as invocation:
+        for id in range(1, 4):
+            Note.find(id)
+
+    assert invocation.origins is None
+    assert "N+1 detection" not in caplog.text
+
+
+def test_n_plus_one_warns_repeated_statements(notebooks, caplog):
+    notebooks.n_plus_one = "warn"
+
+    with notebooks.track("notes") as invocation:
+        for id in range(1, 4):
+            Note.where(id=id).first()
+
+    [repeated] = notebooks.check(invocation).repeated
+    assert repeated.executions == 3
+    assert repeated.statement.startswith("SELECT note.id")
+    assert repeated.origin.model == "Note"
+    assert repeated.origin.relationship is None
+    assert repeated.origin.call_site.startswith(__file__)
+    assert "N+1 detection: 'notes' executed 3 queries" in caplog.text
+
+
+def test_n_plus_one_names_lazy_loaded_relationship(notebooks):
+    notebooks.n_plus_one = "raise"
+
+    with pytest.raises(QueryBudgetError) as error:
+        with notebooks.track("notebooks"):
+            with Notebook.transaction():
+                for notebook in Notebook.all():
+                    assert len(notebook.notes) == 1
+
+    [(_, executions, origin)] = error.value.report.repeated
+    assert executions == 3
+    assert origin is not None
+    assert (origin.model, origin.relationship) == ("Notebook", "notes")
+    assert "in test_n_plus_one_names_lazy_loaded_relationship" in str(error.value)
+
+
+def test_n_plus_one_ignores_eager_loads(notebooks):
+    notebooks.n_plus_one = "raise"
+
+    with notebooks.track("notebooks") as invocation:
+        for notebook in Notebook.with_("notes").all():
+            assert len(notebook.notes) == 1
+
+    assert invocation.queries == 2
+
+
+def test_query_budget(notebooks):
+    notebooks.n_plus_one = "raise"
+    notebooks.query_budget = 1
+
+    with notebooks.track("notes", budget=2):
+        Note.count()
+        Notebook.count()
+
+    with pytest.raises(QueryBudgetError, match="3 queries for a budget of 2"):
+        with notebooks.track("notes", budget=2):
+            Note.count()
+            Notebook.count()
+            Note.first()
+
+
+def test_failed_command_is_not_checked(notebooks):
+    notebooks.n_plus_one = "raise"
+    notebooks.query_budget = 0
+
+    with pytest.raises(RuntimeError):
+        with notebooks.track("notes"):
+            Note.count()
+            raise RuntimeError("failure")
+
+
+def test_invalid_n_plus_one_mode(instrumentation):
+    with pytest.raises(ValueError, match="Invalid N\\+1 detection mode"):
+        instrumentation.n_plus_one = "always"
+
+
+def test_query_budget_decorator():
+    @query_budget(3)
+    async def command():
+        pass
+
+    assert getattr(command, "__query_budget__") == 3
+
+
+@pytest.mark.asyncio
+async def test_n_plus_one_call_site_of_async_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    Note.set_async_engine(engine)
+
+    instrumentation = QueryInstrumentation(n_plus_one="warn")
+    instrumentation.instrument(engine)
+
+    with instrumentation.track("async") as invocation:
+        for id in range(3):
+            await Note.where(id=id).first_async()
+
+    report = instrumentation.check(invocation)
+    assert report is not None
+
+    [(_, _, origin)] = report.repeated
+    assert origin is not None
+    assert origin.model == "Note"
+    assert str(origin.call_site).startswith(__file__)
+    await engine.dispose()
@@ -1,10 +1,18 @@
+import asyncio
+from base64 import urlsafe_b64encode
+from json import dumps
 from typing import List, Optional
 
 import pytest
-from sqlalchemy import create_engine
-from sqlmodel import Field, Session, SQLModel
+from sqlalchemy import bindparam, create_engine, desc, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import Field, Relationship, Session, SQLModel, select
 
-from grace.model import Model, Query
+from grace.cache import FileCache, MemoryCache
+from grace.engine import ShardRouter, enable_single_writer
+from grace.exceptions import RecordNotFoundError
+from grace.model import UPSERT_DIALECTS, Model, PreparedQuery, Query, scope
 
 
 class User(Model, table=True):
@@ -21,6 +29,94 @@ class Product(Model, table=True):
     price: float
     stock: int
 
+    @scope
+    def in_stock(query: Query["Product"]) -> Query["Product"]:
+        return query.where(Product.stock > 0)
+
+    @scope
+    def cheaper_than(query: Query["Product"], price: float) -> Query["Product"]:
+        return query.where(Product.price < price).order_by("price")
+
+
+class Member(Model, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(unique=True)
+    name: str = ""
+    xp: int = 0
+
+
+class Guild(Model, table=True):
+    __cache__ = {"ttl": 60, "max_size": 100}
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(unique=True)
+    prefix: str = "!"
+    members: int = 0
+
+
+class Membership(Model, table=True):
+    guild_id: int = Field(primary_key=True)
+    user_id: int = Field(primary_key=True)
+    role: str = "member"
+
+
+class Event(Model, table=True):
+    __bind__ = "analytics"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str
+
+
+class Message(Model, table=True):
+    __bind__ = "messages"
+
+    id: int = Field(primary_key=True)
+    guild_id: int
+    content: str = ""
+
+
+class TopicTag(Model, table=True):
+    topic_id: int = Field(foreign_key="topic.id", primary_key=True)
+    tag_id: int = Field(foreign_key="tag.id", primary_key=True)
+
+
+class Board(Model, table=True):
+    __cache__ = {"ttl": 60}
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str
+    topics: List["Topic"] = Relationship(back_populates="board")
+
+
+class Topic(Model, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    title: str
+    board_id: Optional[int] = Field(default=None, foreign_key="board.id")
+    board: Optional[Board] = Relationship(back_populates="topics")
+    replies: List["Reply"] = Relationship(back_populates="topic")
+    tags: List["Tag"] = Relationship(link_model=TopicTag)
+
+
+class Reply(Model, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    content: str = ""
+    topic_id: Optional[int] = Field(default=None, foreign_key="topic.id")
+    topic: Optional[Topic] = Relationship(back_populates="replies")
+
+
+class Tag(Model, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str
+
+
+class Article(Model, table=True):
+    __deferred__ = ("body",)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    title: str
+    summary: str = ""
+    body: str = ""
+
 
 @pytest.fixture(scope="function")
 def engine():
@@ -29,10 +125,33 @@ def engine():
     SQLModel.metadata.create_all(engine)
     User.set_engine(engine)
     Product.set_engine(engine)
+    Member.set_engine(engine)
+    Guild.set_engine(engine)
+    Membership.set_engine(engine)
+    for model in (Board, Topic, Reply, Tag, TopicTag, Article):
+        model.set_engine(engine)
+    Model._identity_caches.clear()
+    Model.set_query_cache(MemoryCache())
     yield engine
     engine.dispose()
 
 
+@pytest.fixture(scope="function")
+def async_engine(tmp_path):
+    """Create a file based SQLite database shared by a sync and an async engine."""
+    database = tmp_path / "test.db"
+    engine = create_engine(f"sqlite:///{database}")
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{database}", poolclass=NullPool
+    )
+
+    SQLModel.metadata.create_all(engine)
+    User.set_engine(engine)
+    User.set_async_engine(async_engine)
+    yield async_engine
+    engine.dispose()
+
+
 @pytest.fixture
 def sample_users(engine):
     users_data = [
@@ -389,3 +508,1422 @@ def test_distinct(engine):
 
     assert unique_names == ["Alice", "Bob"]
     assert len(unique_names) == 2
+
+
+# Async tests
+
+
+@pytest.mark.asyncio
+async def test_async_create_and_find(async_engine):
+    user = await User.create_async(name="Test", email="test@example.com", age=20)
+    found = await User.find_async(user.id)
+
+    assert found is not None
+    assert found.name == "Test"
+
+
+@pytest.mark.asyncio
+async def test_async_query_chain(async_engine):
+    for i in range(5):
+        await User.create_async(
+            name=f"User {i}", email=f"{i}@example.com", age=20 + i, active=i % 2 == 0
+        )
+
+    users = await User.where(active=True).order_by(age="desc").all_async()
+    first = await User.not_(active=True).order_by(User.age).first_async()
+
+    assert [u.age for u in users] == [24, 22, 20]
+    assert first.age == 21
+    assert await User.where(User.age > 21).count_async() == 3
+    assert (await User.find_by_async(name="User 3")).age == 23
+
+
+@pytest.mark.asyncio
+async def test_async_stream(async_engine):
+    for i in range(10):
+        await User.create_async(name=f"User {i}", email=f"{i}@example.com", age=i)
+
+    ages = [user.age async for user in User.order_by(User.age).stream(batch_size=3)]
+
+    assert ages == list(range(10))
+
+
+@pytest.mark.asyncio
+async def test_async_update_reload_and_delete(async_engine):
+    user = await User.create_async(name="Test", email="test@example.com", age=20)
+
+    user.age = 21
+    await user.save_async()
+    user.age = 99
+    await user.reload_async()
+    assert user.age == 21
+
+    await user.delete_async()
+    assert await User.find_async(user.id) is None
+
+
+# Bulk operations tests
+
+
+def test_insert_all_with_dicts_and_instances(engine):
+    count = User.insert_all(
+        [
+            {"name": "Alice", "email": "alice@example.com", "age": 25},
+            User(name="Bob", email="bob@example.com", age=30, active=False),
+            {"name": "Charlie", "email": "charlie@example.com", "age": 35},
+        ],
+        batch_size=2,
+    )
+
+    assert count == 3
+    assert User.count() == 3
+    assert User.find_by(name="Alice").active is True
+    assert User.find_by(name="Bob").active is False
+
+
+def test_insert_all_returning(engine):
+    ids = User.insert_all(
+        (
+            {"name": f"User {i}", "email": f"{i}@example.com", "age": i}
+            for i in range(5)
+        ),
+        returning=True,
+    )
+
+    assert len(ids) == 5
+    assert [User.find(id_).age for id_ in ids] == list(range(5))
+
+
+def test_insert_all_empty(engine):
+    assert User.insert_all([]) == 0
+    assert User.insert_all([], returning=True) == []
+
+
+def test_insert_all_invalid_batch_size(engine):
+    with pytest.raises(ValueError, match="Batch size"):
+        User.insert_all([{"name": "A", "email": "a@example.com", "age": 1}], 0)
+
+
+def test_upsert_inserts_then_updates(engine):
+    inserted = Member.upsert({"user_id": 1, "name": "Alice"}, conflict=["user_id"])
+    updated = Member.upsert({"user_id": 1, "name": "Alicia"}, conflict=["user_id"])
+
+    assert inserted.id == updated.id
+    assert updated.name == "Alicia"
+    assert Member.count() == 1
+
+
+def test_upsert_with_update_columns(engine):
+    Member.create(user_id=1, name="Alice", xp=10)
+
+    member = Member.upsert(
+        {"user_id": 1, "name": "Ignored", "xp": 5},
+        conflict=["user_id"],
+        update={"xp": Member.xp + 5},
+    )
+
+    assert member.name == "Alice"
+    assert member.xp == 15
+
+
+def test_upsert_without_columns_to_update(engine):
+    Member.create(user_id=1, name="Alice")
+
+    member = Member.upsert({"user_id": 1}, conflict=["user_id"])
+
+    assert member.name == "Alice"
+
+
+def test_upsert_all(engine):
+    Member.create(user_id=1, name="Alice")
+
+    count = Member.upsert_all(
+        [{"user_id": 1, "name": "Alicia"}, {"user_id": 2, "name": "Bob"}],
+        conflict=["user_id"],
+        update=["name"],
+    )
+
+    assert count == 2
+    assert Member.find_by(user_id=1).name == "Alicia"
+    assert Member.find_by(user_id=2).name == "Bob"
+
+
+def test_upsert_loaded_instances(engine):
+    alice = Member.create(user_id=1, name="Alice", xp=10)
+    Member.create(user_id=2, name="Bob")
+
+    member = Member.find(alice.id)
+    assert member is not None
+    member.xp = 20
+    assert Member.upsert(member).xp == 20
+
+    members = Member.order_by("id").all()
+    for member in members:
+        member.name = member.name.upper()
+    assert Member.upsert_all(members) == 2
+
+    assert Member.order_by("id").values("name", "xp") == [("ALICE", 20), ("BOB", 0)]
+
+
+def test_upsert_unsupported_dialect_raises_error(engine, monkeypatch):
+    monkeypatch.delitem(UPSERT_DIALECTS, "sqlite")
+
+    with pytest.raises(RuntimeError, match="Upsert is not supported on sqlite"):
+        Member.upsert({"user_id": 1, "name": "Alice"}, conflict=["user_id"])
+
+    with pytest.raises(RuntimeError, match="Upsert is not supported on sqlite"):
+        Member.upsert_all([{"user_id": 1, "name": "Alice"}], conflict=["user_id"])
+
+
+def test_update_all(engine, sample_users):
+    count = User.where(User.active == False).update_all(age=50)
+
+    assert count == 2
+    assert [u.age for u in User.where(active=False).all()] == [50, 50]
+    assert User.where(User.age == 50).count() == 2
+
+
+def test_update_all_with_expression(engine, sample_users):
+    User.update_all(age=User.age + 1)
+
+    assert sorted(u.age for u in User.all()) == [23, 26, 29, 31, 36]
+
+
+def test_update_all_invalid_column_raises_error(engine):
+    with pytest.raises(AttributeError, match="has no column 'invalid_column'"):
+        User.update_all(invalid_column="value")
+
+
+def test_delete_all(engine, sample_users):
+    count = User.where(User.age > 28).delete_all()
+
+    assert count == 2
+    assert User.count() == 3
+
+
+def test_delete_all_respects_limit(engine, sample_users):
+    count = User.order_by(User.age).limit(2).delete_all()
+
+    assert count == 2
+    assert sorted(u.name for u in User.all()) == ["Bob", "Charlie", "Diana"]
+
+
+def test_increment(engine, sample_users):
+    user = sample_users[0]
+    stale = User.find(user.id)
+
+    user.increment("age", by=5)
+    stale.increment("age", returning=True)
+
+    assert user.age == 30
+    assert stale.age == 31
+    assert User.find(user.id).age == 31
+
+
+def test_increment_is_not_saved_again(engine, sample_users):
+    user = sample_users[0]
+    stale = User.find(user.id)
+
+    stale.increment("age")
+    user.increment("age")
+    user.update(name="Alice Updated")
+
+    assert User.find(user.id).age == 27
+
+
+def test_decrement(engine, sample_users):
+    user = sample_users[0].decrement("age", by=5)
+
+    assert user.age == 20
+    assert User.find(user.id).age == 20
+
+
+def test_increment_all(engine, sample_users):
+    count = User.where(active=True).increment_all("age")
+    values = User.where(active=False).decrement_all("age", by=2, returning=True)
+
+    assert count == 3
+    assert sorted(values) == [20, 33]
+    assert sorted(u.age for u in User.all()) == [20, 26, 29, 31, 33]
+
+
+# Identity cache tests
+
+
+def test_identity_cache_is_opt_in(engine):
+    assert User.identity_cache() is None
+    assert Guild.identity_cache() is Guild.identity_cache()
+
+
+def test_find_uses_identity_cache(engine):
+    guild = Guild.create(name="Code Society")
+
+    cache = Guild.identity_cache()
+    assert cache is not None
+
+    assert Guild.find(guild.id) is Guild.find(guild.id)
+    assert Guild.find_by(id=guild.id) is Guild.find(guild.id)
+    assert cache.hits == 3
+    assert cache.misses == 1
+
+
+def test_find_by_unique_column_uses_identity_cache(engine):
+    Guild.create(name="Code Society")
+
+    assert Guild.find_by(name="Code Society") is Guild.find_by(name="Code Society")
+    assert Guild.find_by(prefix="!") is not Guild.find_by(prefix="!")
+    assert Guild.where(id=1).find(1) is not Guild.find(1)
+
+
+def test_identity_cache_invalidated_by_writes(engine):
+    guild = Guild.create(name="Code Society")
+    Guild.find_by(name="Code Society")
+
+    Guild.find(guild.id).update(prefix="?")
+    assert Guild.find_by(name="Code Society").prefix == "?"
+
+    Guild.update_all(prefix="$")
+    assert Guild.find(guild.id).prefix == "$"
+
+    Guild.find(guild.id).delete()
+    assert Guild.find(guild.id) is None
+
+
+def test_increment_only_invalidates_its_record(engine):
+    first, second = Guild.create(name="first"), Guild.create(name="second")
+    cached = Guild.find(second.id)
+
+    Guild.find(first.id).increment("members", by=2)
+    first.increment("members", returning=True)
+
+    assert Guild.find(second.id) is cached
+    assert Guild.find(first.id).members == 3
+
+
+@pytest.mark.asyncio
+async def test_identity_cache_async(engine, async_engine):
+    Guild.set_async_engine(async_engine)
+    guild = await Guild.create_async(name="Code Society")
+
+    assert await Guild.find_async(guild.id) is await Guild.find_async(guild.id)
+    assert await Guild.find_by_async(name="Code Society") is await Guild.find_by_async(
+        name="Code Society"
+    )
+
+
+# Query cache tests
+
+
+def test_cached_query(engine, sample_users):
+    query = User.where(User.age > 25).order_by(User.age).cached()
+
+    assert [u.name for u in query.all()] == ["Diana", "Bob", "Charlie"]
+    assert User.where(User.age > 25).order_by(User.age).cached().first() is not None
+    assert User.get_query_cache().misses == 2
+
+    with Session(engine) as session:
+        session.add(User(name="Frank", email="frank@example.com", age=40))
+        session.commit()
+
+    # Writes made outside of the models are not detected
+    assert len(User.where(User.age > 25).order_by(User.age).cached().all()) == 3
+    assert User.where(User.age > 25).cached().count() == 4
+    assert User.get_query_cache().hits == 1
+
+
+def test_cached_query_keyed_on_parameters(engine, sample_users):
+    assert User.where(User.age > 25).cached().count() == 3
+    assert User.where(User.age > 30).cached().count() == 1
+    assert User.where(User.age > 25).cached().count() == 3
+
+
+def test_cached_query_invalidated_by_writes(engine, sample_users):
+    assert User.cached().count() == 5
+
+    User.create(name="Frank", email="frank@example.com", age=40)
+    assert User.cached().count() == 6
+
+    User.where(User.age > 35).delete_all()
+    assert User.cached().count() == 5
+
+    Product.create(name="Widget", price=9.99, stock=100)
+    assert User.cached().count() == 5
+    assert User.get_query_cache().hits == 1
+
+
+def test_cached_query_ttl(engine, sample_users, mocker):
+    monotonic = mocker.patch("grace.cache.monotonic", return_value=100)
+    assert User.cached(ttl=10).count() == 5
+
+    with Session(engine) as session:
+        session.add(User(name="Frank", email="frank@example.com", age=40))
+        session.commit()
+
+    assert User.cached(ttl=10).count() == 5
+    monotonic.return_value = 111
+    assert User.cached(ttl=10).count() == 6
+
+
+def test_cached_query_with_file_cache(engine, sample_users, tmp_path):
+    Model.set_query_cache(FileCache(tmp_path))
+
+    users = User.order_by(User.name).cached().all()
+    cached_users = User.order_by(User.name).cached().all()
+
+    assert [u.name for u in cached_users] == [u.name for u in users]
+    assert cached_users[0] is not users[0]
+
+
+# Batch iteration tests
+
+
+def test_in_batches(engine, sample_users):
+    batches = list(User.in_batches(batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [u.id for batch in batches for u in batch] == sorted(
+        u.id for u in sample_users
+    )
+
+
+def test_in_batches_with_conditions(engine, sample_users):
+    batches = list(User.where(active=True).in_batches(batch_size=3))
+
+    assert [len(batch) for batch in batches] == [3]
+    assert all(u.active for u in batches[0])
+
+
+def test_in_batches_ordered(engine, sample_users):
+    batches = list(User.order_by(age="desc").in_batches(batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [u.age for batch in batches for u in batch] == [35, 30, 28, 25, 22]
+
+
+def test_find_each(engine, sample_users):
+    names = [u.name for u in User.where(User.age > 24).find_each(batch_size=2)]
+
+    assert names == ["Alice", "Bob", "Charlie", "Diana"]
+
+
+def test_find_each_empty(engine):
+    assert list(User.find_each()) == []
+
+
+def test_in_batches_invalid_batch_size(engine):
+    with pytest.raises(ValueError, match="Batch size"):
+        list(User.in_batches(batch_size=0))
+
+
+# Pagination tests
+
+
+def test_paginate(engine, sample_users):
+    page = User.order_by(User.age).paginate(limit=2)
+
+    assert [u.name for u in page.items] == ["Eve", "Alice"]
+    assert page.prev_cursor is None
+    assert page.total is None
+
+    page = User.order_by(User.age).paginate(limit=2, after=page.next_cursor)
+    assert [u.name for u in page.items] == ["Diana", "Bob"]
+
+    page = User.order_by(User.age).paginate(limit=2, after=page.next_cursor)
+    assert [u.name for u in page.items] == ["Charlie"]
+    assert page.next_cursor is None
+
+
+def test_paginate_backward(engine, sample_users):
+    first = User.order_by(age="desc").paginate(limit=2)
+    second = User.order_by(age="desc").paginate(limit=2, after=first.next_cursor)
+
+    page = User.order_by(age="desc").paginate(limit=2, before=second.prev_cursor)
+
+    assert [u.name for u in page.items] == ["Charlie", "Bob"]
+    assert page.prev_cursor is None
+    assert page.next_cursor == first.next_cursor
+
+
+def test_paginate_ties_on_primary_key(engine):
+    User.insert_all(
+        [
+            {"name": f"User {i}", "email": f"{i}@example.com", "age": 20}
+            for i in range(5)
+        ]
+    )
+    names = []
+    cursor = None
+
+    while True:
+        page = User.order_by(User.age).paginate(limit=2, after=cursor)
+        names += [u.name for u in page.items]
+        if (cursor := page.next_cursor) is None:
+            break
+
+    assert names == [f"User {i}" for i in range(5)]
+
+
+def test_paginate_with_conditions_and_count(engine, sample_users):
+    page = User.where(active=True).paginate(limit=2, with_count=True)
+
+    assert [u.name for u in page.items] == ["Alice", "Bob"]
+    assert page.total == 3
+
+
+def test_paginate_invalid_arguments(engine, sample_users):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        User.paginate(after="invalid")
+
+    with pytest.raises(ValueError, match="both after and before"):
+        User.paginate(after="a", before="b")
+
+    with pytest.raises(ValueError, match="limit or offset"):
+        User.limit(2).paginate()
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [{"$decimal": "abc"}],
+        [{"$datetime": "yesterday"}],
+        [{"$date": 5}],
+        [{"$uuid": []}],
+        ["zz"],
+        [True],
+        [2.5],
+        [{"$decimal": "2"}],
+    ],
+)
+def test_paginate_tampered_cursor(engine, sample_users, values):
+    cursor = urlsafe_b64encode(dumps(values).encode()).decode()
+
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        User.paginate(after=cursor)
+
+
+def test_paginate_cursor_value_types(engine, sample_users):
+    def cursor(*values):
+        return urlsafe_b64encode(dumps(values).encode()).decode()
+
+    by_name = User.order_by(User.name).paginate(after=cursor("Bob", 2))
+    assert [user.name for user in by_name.items] == ["Charlie", "Diana", "Eve"]
+
+    assert Product.order_by(Product.price).paginate(after=cursor(3, 1)).items == []
+
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        User.order_by(User.name).paginate(after=cursor(5, 2))
+
+
+# Projection tests
+
+
+def test_pluck(engine, sample_users):
+    assert User.where(active=True).order_by(User.name).pluck("name") == [
+        "Alice",
+        "Bob",
+        "Diana",
+    ]
+    assert User.order_by(age="desc").limit(2).pluck(User.age) == [35, 30]
+
+
+def test_pluck_invalid_column_raises_error(engine):
+    with pytest.raises(AttributeError, match="has no column 'invalid_column'"):
+        User.pluck("invalid_column")
+
+
+def test_values(engine, sample_users):
+    rows = User.where(User.age < 26).order_by(User.age).values("name", User.age)
+
+    assert [tuple(row) for row in rows] == [("Eve", 22), ("Alice", 25)]
+    assert rows[0].name == "Eve"
+
+
+def test_values_without_columns_raises_error(engine):
+    with pytest.raises(ValueError, match="At least one column"):
+        User.values()
+
+
+def test_ids(engine, sample_users):
+    assert User.where(active=False).ids() == [sample_users[2].id, sample_users[4].id]
+
+
+def test_cached_pluck(engine, sample_users):
+    assert User.order_by(User.name).cached().pluck("name")[0] == "Alice"
+    assert User.order_by(User.name).cached().pluck("email")[0] == "alice@example.com"
+    assert User.order_by(User.name).cached().pluck("name")[0] == "Alice"
+    assert User.get_query_cache().hits == 1
+
+
+# Aggregate tests
+
+
+def test_count_selects_from_table(engine, sample_users):
+    statement = str(User.where(active=True).count_statement)
+
+    assert 'FROM "user"' in statement
+    assert "anon" not in statement
+    assert User.where(active=True).count() == 3
+
+
+def test_count_with_limit(engine, sample_users):
+    assert User.order_by(age="desc").limit(2).count() == 2
+    assert User.offset(4).count() == 1
+
+
+def test_aggregates(engine, sample_users):
+    assert User.sum("age") == 140
+    assert User.where(active=True).avg(User.age) == pytest.approx(83 / 3)
+    assert User.min("age") == 22
+    assert User.max("age") == 35
+
+
+def test_aggregates_with_limit(engine, sample_users):
+    assert User.order_by(age="desc").limit(2).sum("age") == 65
+    assert User.order_by(age="desc").limit(2).sum(User.age * 2) == 130
+    assert User.order_by("age").limit(3).group_by(User.age > 24).count() == {
+        False: 1,
+        True: 2,
+    }
+
+
+def test_aggregates_without_records(engine):
+    assert User.sum("age") is None
+    assert User.count() == 0
+
+
+def test_aggregate_invalid_column_raises_error(engine):
+    with pytest.raises(AttributeError, match="has no column 'invalid'"):
+        User.sum("invalid")
+
+
+def test_exists(engine, sample_users):
+    assert User.where(name="Alice").exists() is True
+    assert User.where(name="Nobody").exists() is False
+
+
+def test_group_by(engine, sample_users):
+    assert User.group_by("active").count() == {True: 3, False: 2}
+    assert User.group_by(User.active).sum("age") == {True: 83, False: 57}
+    assert User.where(User.age > 24).group_by("active").max("age") == {
+        True: 30,
+        False: 35,
+    }
+
+
+def test_group_by_several_columns(engine, sample_users):
+    counts = User.group_by("active", "age").count()
+
+    assert len(counts) == 5
+    assert counts[(True, 25)] == 1
+
+
+def test_group_by_without_columns_raises_error(engine):
+    with pytest.raises(ValueError):
+        User.group_by()
+
+
+def test_cached_aggregates(engine, sample_users):
+    assert User.cached().sum("age") == 140
+    assert User.cached().max("age") == 35
+    assert User.cached().group_by("active").count() == {True: 3, False: 2}
+
+    User.create(name="Frank", email="frank@example.com", age=40)
+
+    assert User.cached().sum("age") == 180
+    assert User.cached().group_by("active").count() == {True: 4, False: 2}
+
+
+# Eager loading tests
+
+
+@pytest.fixture
+def boards(engine):
+    """Two boards of 2 topics, each topic having 2 replies and the first one a tag."""
+    tag = Tag.create(name="help")
+
+    for name in ("general", "support"):
+        board = Board.create(name=name)
+        for index in range(2):
+            topic = Topic.create(title=f"{name} {index}", board_id=board.id)
+            Reply.insert_all([{"topic_id": topic.id}, {"topic_id": topic.id}])
+            if index == 0:
+                TopicTag.create(topic_id=topic.id, tag_id=tag.id)
+
+
+@pytest.mark.parametrize("strategy", ["selectin", "joined", "subquery"])
+def test_with_nested_relationships(engine, boards, statements, strategy):
+    boards = Board.with_("topics.replies", strategy=strategy).order_by("id").all()
+    executed = len(statements)
+
+    assert [len(board.topics) for board in boards] == [2, 2]
+    assert all(len(topic.replies) == 2 for b in boards for topic in b.topics)
+    assert len(statements) == executed
+    assert executed == {"selectin": 3, "joined": 1, "subquery": 3}[strategy]
+
+
+def test_with_joined_many_to_one(engine, boards, statements):
+    topics = Topic.with_("board", strategy="joined").order_by("id").all()
+
+    assert len(statements) == 1
+    assert [topic.board.name for topic in topics] == ["general"] * 2 + ["support"] * 2
+
+
+@pytest.mark.parametrize("strategy", ["selectin", "joined", "subquery"])
+def test_in_batches_ordered_with_relationships(engine, boards, strategy):
+    query = Board.with_("topics", strategy=strategy).order_by(desc(Board.name))
+
+    batches = list(query.in_batches(batch_size=1))
+    assert [[board.name for board in batch] for batch in batches] == [
+        ["support"],
+        ["general"],
+    ]
+    assert [len(board.topics) for board in query.find_each()] == [2, 2]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("strategy", ["selectin", "joined", "subquery"])
+async def test_async_stream_with_relationships(async_engine, strategy):
+    for model in (Board, Topic):
+        model.set_async_engine(async_engine)
+    for name in ("general", "support"):
+        board = await Board.create_async(name=name)
+        await Topic.create_async(title=name, board_id=board.id)
+
+    query = Board.with_("topics", strategy=strategy).order_by(Board.name)
+    boards = [board async for board in query.with_count("topics").stream(1)]
+
+    assert [[t.title for t in board.topics] for board in boards] == [
+        ["general"],
+        ["support"],
+    ]
+    assert [board.topics_count for board in boards] == [1, 1]
+
+
+def test_with_invalid_relationship(engine):
+    with pytest.raises(AttributeError, match="Topic has no relationship 'title'"):
+        Board.with_("topics.title")
+
+    with pytest.raises(ValueError, match="Invalid loading strategy 'lazy'"):
+        Board.with_("topics", strategy="lazy")
+
+
+def test_with_count(engine, boards, statements):
+    topics = Topic.with_count("replies", "tags").order_by("id").all()
+
+    assert len(statements) == 3
+    assert [topic.replies_count for topic in topics] == [2, 2, 2, 2]
+    assert [topic.tags_count for topic in topics] == [1, 0, 1, 0]
+    assert "replies_count" not in topics[0].model_dump()
+
+
+def test_with_count_first_and_batches(engine, boards):
+    Reply.where(topic_id=1).delete_all()
+
+    assert Topic.with_count("replies").find(1).replies_count == 0
+    batches = list(Board.with_count("topics").in_batches(batch_size=1))
+    assert [board.topics_count for [board] in batches] == [2, 2]
+
+
+def test_with_count_bypasses_identity_cache(engine, boards, statements):
+    assert Board.find(1) is Board.find(1)
+    executed = len(statements)
+
+    assert Board.with_count("topics").find(1).topics_count == 2
+    assert Board.with_count("topics").find_many([1, 2])[1].topics_count == 2
+    assert len(statements) == executed + 4
+
+
+def test_with_count_invalid_relationship(engine):
+    with pytest.raises(ValueError, match="'board', it is not a collection"):
+        Topic.with_count("board")
+
+
+@pytest.mark.asyncio
+async def test_with_count_async(async_engine):
+    Board.set_engine(User.get_engine())
+    Topic.set_engine(User.get_engine())
+    Board.set_async_engine(async_engine)
+    Topic.set_async_engine(async_engine)
+
+    board = Board.create(name="general")
+    Topic.insert_all([{"title": "first", "board_id": board.id}] * 3)
+
+    [loaded] = await Board.with_("topics").with_count("topics").all_async()
+    assert loaded.topics_count == len(loaded.topics) == 3
+
+
+def test_preload(engine, boards, statements):
+    topics = [Topic.find(1), *Topic.where(board_id=2).order_by("id").all()]
+    executed = len(statements)
+
+    assert Model.preload(topics, "board", "replies", "tags") == topics
+    assert len(statements) == executed + 3
+
+    assert [topic.board.name for topic in topics] == ["general", "support", "support"]
+    assert [len(topic.replies) for topic in topics] == [2, 2, 2]
+    assert [[tag.name for tag in topic.tags] for topic in topics] == [
+        ["help"],
+        ["help"],
+        [],
+    ]
+    assert not topics[0].has_changes
+
+
+def test_preload_nested_relationships(engine, boards, statements):
+    boards = Board.with_("topics").all()
+    executed = len(statements)
+
+    Board.preload(boards, "topics.replies", batch_size=3)
+
+    # The loaded topics are kept, their replies are loaded in 2 batches
+    assert len(statements) == executed + 2
+    assert all(len(topic.replies) == 2 for b in boards for topic in b.topics)
+
+
+def test_preload_without_related_records(engine):
+    board = Board.create(name="empty")
+    topic = Topic.create(title="orphan")
+
+    Model.preload([board], "topics")
+    Model.preload([topic], "board")
+
+    assert board.topics == []
+    assert topic.board is None
+    assert Model.preload([], "topics") == []
+
+
+@pytest.mark.asyncio
+async def test_preload_async(async_engine):
+    for model in (Board, Topic):
+        model.set_engine(User.get_engine())
+        model.set_async_engine(async_engine)
+
+    board = Board.create(name="general")
+    Topic.insert_all([{"title": "first", "board_id": board.id}] * 2)
+
+    [loaded] = await Board.preload_async([Board.find(board.id)], "topics")
+    assert len(loaded.topics) == 2
+
+
+# Deferred column tests
+
+
+@pytest.fixture
+def articles(engine):
+    Article.insert_all(
+        [
+            {"title": "First", "summary": "short", "body": "long " * 100},
+            {"title": "Second", "summary": "short", "body": "longer " * 100},
+        ]
+    )
+
+
+def test_only(engine, articles, statements):
+    [article, _] = Article.only("title").order_by("id").all()
+
+    assert "article.summary" not in statements[-1]
+    assert (article.id, article.title) == (1, "First")
+
+    # Deferred columns are loaded one by one, on first access only
+    assert article.summary == "short"
+    assert article.summary == "short"
+    assert len(statements) == 2
+    assert statements[-1].startswith("SELECT article.summary")
+
+
+def test_defer(engine, articles, statements):
+    article = Article.defer("summary").find(1)
+
+    assert "article.summary" not in statements[-1]
+    assert "article.body" not in statements[-1]
+    assert article.summary == "short"
+    assert article.body.startswith("long")
+    assert not article.has_changes
+
+
+def test_model_deferred_columns(engine, articles, statements):
+    article = Article.undefer("body").find(2)
+    assert "article.body" in statements[-1]
+
+    articles = Article.all()
+    assert "article.body" not in statements[-1]
+    assert "article.summary" in statements[-1]
+    assert articles[1].body == article.body
+
+
+def test_save_record_with_deferred_columns(engine, articles, statements):
+    article = Article.only("title").find(1)
+    article.title = "Updated"
+    article.save()
+
+    assert statements[-1].startswith("UPDATE article SET title=?")
+    assert Article.find(1).body.startswith("long")
+
+
+def test_deferred_columns_are_part_of_cache_key(engine, articles):
+    Article.cached().only("title").all()
+    [article, _] = Article.cached().undefer("body").all()
+
+    assert "body" in article.__dict__
+
+
+def test_partial_records_bypass_identity_cache(engine):
+    Guild.create(name="general", prefix="?")
+
+    partial = Guild.only("name").find(1)
+    assert partial is not None and "prefix" not in partial.__dict__
+
+    guild = Guild.find(1)
+    assert guild is not partial and guild.__dict__["prefix"] == "?"
+    assert Guild.only("name").find(1) is not guild
+    assert Guild.defer("prefix").find_by(name="general") is not Guild.find(1)
+
+
+def test_defer_invalid_column(engine):
+    with pytest.raises(AttributeError, match="Article has no column 'content'"):
+        Article.defer("content")
+
+
+@pytest.mark.asyncio
+async def test_deferred_columns_async(async_engine):
+    Article.set_engine(User.get_engine())
+    Article.set_async_engine(async_engine)
+    Article.create(title="First", body="long")
+
+    [article] = await Article.only("title").all_async()
+    assert "body" not in article.__dict__
+    assert article.body == "long"
+
+
+# Scope and prepared query tests
+
+
+@pytest.fixture
+def products(engine):
+    Product.insert_all(
+        [
+            {"name": "Widget", "price": 9.99, "stock": 100},
+            {"name": "Gadget", "price": 4.99, "stock": 0},
+            {"name": "Gizmo", "price": 2.99, "stock": 5},
+        ]
+    )
+
+
+def test_scopes(engine, products):
+    assert Product.in_stock().count() == 2
+    assert [p.name for p in Product.cheaper_than(5).all()] == ["Gizmo", "Gadget"]
+    assert [p.name for p in Product.in_stock().cheaper_than(price=5).all()] == ["Gizmo"]
+    assert Product.where(name="Widget").in_stock().exists()
+
+
+def test_unknown_scope(engine):
+    with pytest.raises(AttributeError, match="has no attribute 'on_sale'"):
+        Product.in_stock().on_sale()
+
+
+def test_prepared_query(engine, products, statements):
+    prepared = Product.prepare(
+        Product.where(Product.price < bindparam("price")).order_by("price")
+    )
+
+    assert isinstance(prepared, PreparedQuery)
+    assert [p.name for p in prepared.all(price=5)] == ["Gizmo", "Gadget"]
+    assert [p.name for p in prepared.all(price=3)] == ["Gizmo"]
+    assert prepared.first(price=1) is None
+    assert prepared.count(price=10) == 3
+    assert statements[0] == statements[1]
+
+
+def test_prepared_query_one_with_deferred_columns(engine, products):
+    prepared = Product.prepare(Product.only("name").where(name=bindparam("name")))
+    product = prepared.one(name="Gizmo")
+
+    assert "price" not in product.__dict__
+    assert product.price == 2.99
+
+
+def test_prepare_cached_query_raises_error(engine):
+    with pytest.raises(ValueError, match="Cannot prepare a cached query"):
+        Product.prepare(Product.cached().where(name=bindparam("name")))
+
+
+@pytest.mark.asyncio
+async def test_prepared_query_async(async_engine):
+    User.create(name="Alice", email="alice@example.com", age=25)
+    prepared = User.prepare(User.where(age=bindparam("age")))
+
+    [user] = await prepared.all_async(age=25)
+    assert user.name == "Alice"
+    assert await prepared.first_async(age=30) is None
+    assert (await prepared.one_async(age=25)).id == user.id
+    assert await prepared.count_async(age=25) == 1
+
+
+# Multi-id lookup tests
+
+
+def test_find_many_preserves_order(engine, sample_users):
+    ids = [sample_users[2].id, sample_users[0].id, sample_users[4].id]
+
+    assert [user.name for user in User.find_many(ids)] == ["Charlie", "Alice", "Eve"]
+
+
+def test_find_many_in_batches(engine, sample_users, mocker):
+    exec_ = mocker.spy(Session, "exec")
+    ids = [user.id for user in reversed(sample_users)]
+
+    users = User.find_many(ids, batch_size=2)
+
+    assert [user.id for user in users] == ids
+    assert exec_.call_count == 3
+
+
+def test_find_many_missing_ids(engine, sample_users):
+    users = User.find_many([sample_users[0].id, 404, sample_users[0].id])
+
+    assert users[0].name == "Alice"
+    assert users[1] is None
+    assert users[2].name == "Alice"
+
+
+def test_find_many_strict_reports_missing_ids(engine, sample_users):
+    with pytest.raises(RecordNotFoundError, match=r"User records not found") as e:
+        User.find_many([sample_users[0].id, 404, 405], strict=True)
+
+    assert e.value.missing == [404, 405]
+
+
+def test_find_many_with_conditions(engine, sample_users):
+    users = User.where(active=True).find_many([user.id for user in sample_users])
+
+    assert [user is not None for user in users] == [True, True, False, True, False]
+
+
+def test_find_many_uses_identity_cache(engine, mocker):
+    first = Guild.create(name="first")
+    second = Guild.create(name="second")
+    Guild.find(first.id)
+
+    exec_ = mocker.spy(Session, "exec")
+    guilds = Guild.find_many([first.id, second.id])
+
+    assert [guild.name for guild in guilds] == ["first", "second"]
+    assert exec_.call_count == 1
+    assert Guild.find(second.id) is guilds[1]
+
+
+def test_find_composite_primary_key(engine):
+    Membership.insert_all(
+        [
+            {"guild_id": 1, "user_id": 1, "role": "admin"},
+            {"guild_id": 1, "user_id": 2},
+            {"guild_id": 2, "user_id": 1},
+        ]
+    )
+
+    assert Membership.find((1, 1)).role == "admin"
+    assert Membership.find((3, 1)) is None
+
+    memberships = Membership.find_many([(2, 1), (1, 2), (9, 9)])
+    assert [(m.guild_id, m.user_id) for m in memberships[:2]] == [(2, 1), (1, 2)]
+    assert memberships[2] is None
+
+
+def test_find_composite_primary_key_invalid_value(engine):
+    with pytest.raises(ValueError, match="expected a tuple of 2 values"):
+        Membership.find(1)
+
+    with pytest.raises(ValueError, match="expected a tuple of 2 values"):
+        Membership.find_many([(1, 1), (1, 2, 3)])
+
+
+@pytest.mark.asyncio
+async def test_find_many_async(async_engine):
+    ids = User.insert_all(
+        [
+            {"name": "Alice", "email": "alice@example.com", "age": 25},
+            {"name": "Bob", "email": "bob@example.com", "age": 30},
+        ],
+        returning=True,
+    )
+
+    found = await User.find_many_async([ids[1], 404, ids[0]])
+
+    assert [user and user.name for user in found] == ["Bob", None, "Alice"]
+
+
+# Transaction tests
+
+
+def test_transaction_commits_once(engine, sample_users, mocker):
+    commit = mocker.spy(Session, "commit")
+
+    with User.transaction():
+        alice = User.find(sample_users[0].id)
+        alice.update(age=26)
+        User.create(name="Frank", email="frank@example.com", age=40)
+        sample_users[1].delete()
+
+        # Queries see the uncommitted writes of the transaction
+        assert User.count() == 5
+        assert User.find_by(name="Frank") is not None
+
+    assert commit.call_count == 1
+    assert User.find(sample_users[0].id).age == 26
+    assert User.find(sample_users[1].id) is None
+    assert alice.age == 26
+
+
+def test_transaction_saves_records_loaded_outside(engine, sample_users):
+    alice, bob = User.find(sample_users[0].id), User.find(sample_users[1].id)
+
+    with User.transaction():
+        loaded = User.find(alice.id)
+        User.find(bob.id)
+
+        alice.name = "Alicia"
+        alice.save()
+        bob.delete()
+
+        assert loaded.name == "Alicia"
+        assert not alice.has_changes
+
+    assert User.find(alice.id).name == "Alicia"
+    assert User.find(bob.id) is None
+
+
+def test_transaction_rolls_back_on_error(engine, sample_users):
+    with pytest.raises(RuntimeError):
+        with User.transaction():
+            User.create(name="Frank", email="frank@example.com", age=40)
+            User.where(active=False).update_all(age=0)
+            raise RuntimeError("failure")
+
+    assert User.count() == 5
+    assert User.find_by(name="Frank") is None
+    assert User.sum("age") == 140
+
+
+def test_nested_transaction_uses_savepoint(engine, sample_users):
+    with User.transaction():
+        User.create(name="Frank", email="frank@example.com", age=40)
+
+        with pytest.raises(RuntimeError):
+            with User.transaction():
+                User.create(name="Grace", email="grace@example.com", age=45)
+                raise RuntimeError("failure")
+
+        User.create(name="Heidi", email="heidi@example.com", age=50)
+
+    assert User.where(User.age >= 40).order_by("age").pluck("name") == [
+        "Frank",
+        "Heidi",
+    ]
+
+
+def test_transaction_rollback_invalidates_caches(engine):
+    guild = Guild.create(name="guild")
+
+    with pytest.raises(RuntimeError):
+        with Guild.transaction():
+            Guild.find(guild.id).update(prefix="?")
+            assert Guild.find(guild.id).prefix == "?"
+            raise RuntimeError("failure")
+
+    assert Guild.find(guild.id).prefix == "!"
+
+
+def test_transaction_rollback_invalidates_cached_queries(engine, sample_users):
+    with pytest.raises(RuntimeError):
+        with User.transaction():
+            User.insert_all(
+                [
+                    {"name": "Frank", "email": "frank@example.com", "age": 40},
+                    {"name": "Grace", "email": "grace@example.com", "age": 45},
+                ]
+            )
+            assert User.cached().count() == 7
+            raise RuntimeError("failure")
+
+    assert User.cached().count() == 5
+
+
+@pytest.mark.asyncio
+async def test_transaction_async(async_engine):
+    async with User.transaction_async():
+        await User.create_async(name="Alice", email="alice@example.com", age=25)
+        await User.create_async(name="Bob", email="bob@example.com", age=30)
+        assert await User.count_async() == 2
+
+    with pytest.raises(RuntimeError):
+        async with User.transaction_async():
+            await User.create_async(name="Eve", email="eve@example.com", age=22)
+            raise RuntimeError("failure")
+
+    assert await User.order_by("name").all_async() == User.order_by("name").all()
+    assert User.pluck("name") == ["Alice", "Bob"]
+
+
+# Change tracking tests
+
+
+@pytest.fixture
+def statements(engine):
+    """Records the SQL statements executed on the engine."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_changes(engine, sample_users):
+    user = User.find(sample_users[0].id)
+    assert user.changes == {}
+    assert not user.has_changes
+
+    user.name = "Alicia"
+    user.age = 25
+
+    assert user.changes == {"name": ("Alice", "Alicia")}
+    assert user.has_changes
+    assert User(name="New", email="new@example.com", age=1).has_changes
+
+
+def test_save_unchanged_record_is_noop(engine, sample_users, statements):
+    user = User.find(sample_users[0].id)
+    statements.clear()
+
+    user.save()
+    user.update(name="Alice")
+
+    assert statements == []
+
+
+def test_save_updates_changed_columns_only(engine, sample_users, statements):
+    user = User.find(sample_users[0].id)
+    statements.clear()
+
+    user.update(age=26)
+
+    assert len(statements) == 1
+    assert statements[0].startswith("UPDATE user SET age=?")
+    assert not user.has_changes
+    assert User.find(user.id).age == 26
+
+
+def test_save_refresh_is_opt_in(engine, statements):
+    user = User(name="Alice", email="alice@example.com", age=25).save()
+
+    assert user.id is not None
+    assert not any(s.startswith("SELECT") for s in statements)
+
+    user.age = 26
+    user.save(refresh=True)
+    assert statements[-1].startswith("SELECT")
+
+
+def test_reload_discards_changes(engine, sample_users):
+    user = User.find(sample_users[0].id)
+    user.name = "Changed"
+
+    user.reload()
+
+    assert user.name == "Alice"
+    assert not user.has_changes
+
+
+@pytest.mark.asyncio
+async def test_single_writer_saves(async_engine):
+    enable_single_writer(async_engine)
+
+    await asyncio.gather(
+        *(
+            User.create_async(name=f"User {i}", email=f"{i}@example.com", age=i)
+            for i in range(10)
+        )
+    )
+
+    async with User.transaction_async():
+        await User.create_async(name="Alice", email="alice@example.com", age=25)
+
+    assert await User.count_async() == 11
+
+
+# Read replica tests
+
+
+@pytest.fixture
+def replica(engine):
+    """Create a replica database, which is not replicated to by the tests."""
+    replica = create_engine("sqlite:///:memory:")
+    SQLModel.metadata.create_all(replica)
+    User.set_read_engines(replica)
+    yield replica
+    User.set_read_engines()
+    replica.dispose()
+
+
+def test_reads_use_replica(engine, replica, sample_users):
+    assert User.count() == 0
+    assert User.all() == []
+    assert User.find(sample_users[0].id) is None
+
+
+def test_writes_use_primary(engine, replica, sample_users):
+    User.create(name="Frank", email="frank@example.com", age=40)
+    User.where(name="Alice").update_all(age=26)
+
+    assert User.on_primary().count() == 6
+    assert User.on_primary().find_by(name="Alice").age == 26
+
+
+def test_on_primary(engine, replica, sample_users):
+    assert User.on_primary().find(sample_users[0].id).name == "Alice"
+    assert User.where(active=True).on_primary().pluck("name") == [
+        "Alice",
+        "Bob",
+        "Diana",
+    ]
+
+
+def test_transaction_reads_use_primary(engine, replica, sample_users):
+    with User.transaction():
+        assert User.count() == 5
+
+
+def test_read_engines_are_used_in_turn(engine):
+    first, second = create_engine("sqlite://"), create_engine("sqlite://")
+    User.set_read_engines(first, second)
+
+    engines = {User.get_read_engine() for _ in range(4)}
+
+    User.set_read_engines()
+    assert engines == {first, second}
+    assert User.get_read_engine() is engine
+
+
+# Named database and sharding tests
+
+
+@pytest.fixture
+def binds(engine):
+    """Bind Event to an analytics database, and shard Message over two databases."""
+    analytics, *shards = (create_engine("sqlite://") for _ in range(3))
+    for bind in (analytics, *shards):
+        SQLModel.metadata.create_all(bind)
+
+    Model.set_bind("analytics", analytics)
+    Model.set_bind("messages", ShardRouter("guild_id", shards))
+    yield analytics, shards
+    Model._binds.clear()
+
+
+def test_bound_model_uses_its_database(binds):
+    analytics, _ = binds
+    Event.create(name="joined")
+
+    assert Event.get_engine() is analytics
+    assert Event.pluck("name") == ["joined"]
+    with Session(analytics) as session:
+        assert session.exec(select(Event)).one().name == "joined"
+
+
+def test_bound_model_without_database_raises_error(engine):
+    with pytest.raises(RuntimeError, match="No database 'analytics'"):
+        Event.count()
+
+
+def test_bound_model_ignores_replicas(binds, replica):
+    Event.create(name="joined")
+
+    assert Event.count() == 1
+
+
+def test_sharded_model(binds):
+    _, (first, second) = binds
+    Message.create(id=1, guild_id=2, content="hello")
+    Message.create(id=2, guild_id=3, content="world")
+
+    assert Message.where(guild_id=2).pluck("content") == ["hello"]
+    assert Message.where(Message.guild_id == 3, Message.id == 2).count() == 1
+    assert Message.on_shard(3).find(2).content == "world"
+    assert Message.on_shard(3).find(1) is None
+
+    with Session(first) as session:
+        assert [m.id for m in session.exec(select(Message))] == [1]
+    with Session(second) as session:
+        assert [m.id for m in session.exec(select(Message))] == [2]
+
+
+def test_sharded_model_instance_writes(binds):
+    message = Message.create(id=1, guild_id=3, content="hello")
+
+    message.update(content="updated")
+    assert Message.where(guild_id=3).first().content == "updated"
+
+    message.delete()
+    assert Message.where(guild_id=3).count() == 0
+
+
+def test_sharded_model_bulk_writes(binds):
+    _, (first, second) = binds
+
+    assert (
+        Message.insert_all(
+            [
+                {"id": 1, "guild_id": 2},
+                {"id": 2, "guild_id": 3},
+                {"id": 3, "guild_id": 4},
+            ]
+        )
+        == 3
+    )
+    assert Message.upsert({"id": 2, "guild_id": 3, "content": "hello"}).content == (
+        "hello"
+    )
+    assert Message.upsert_all([{"id": 3, "guild_id": 4, "content": "world"}]) == 1
+
+    with Session(first) as session:
+        assert session.exec(select(Message.id, Message.content)).all() == [
+            (1, ""),
+            (3, "world"),
+        ]
+    with Session(second) as session:
+        assert session.exec(select(Message.id, Message.content)).all() == [(2, "hello")]
+
+    with pytest.raises(ValueError, match="shard key 'guild_id' can't be None"):
+        Message.upsert({"id": 4})
+
+
+def test_sharded_model_prepared_query(binds):
+    Message.insert_all([{"id": 1, "guild_id": 2}, {"id": 2, "guild_id": 3}])
+    prepared = Message.prepare(Message.where(Message.guild_id == bindparam("guild")))
+
+    assert [message.id for message in prepared.all(guild=3)] == [2]
+    assert prepared.one(guild=2).id == 1
+    assert prepared.count(guild=4) == 0
+    assert Message.prepare(Message.where(guild_id=3)).one().id == 2
+    assert Message.prepare(Message.on_shard(2)).count() == 1
+
+    with pytest.raises(RuntimeError, match="sharded by 'guild_id'"):
+        Message.prepare(Message.where(id=bindparam("id"))).first(id=1)
+
+
+def test_sharded_model_cannot_be_buffered(binds):
+    with pytest.raises(RuntimeError, match="Message, it's sharded by 'guild_id'"):
+        Message.buffered()
+
+
+def test_sharded_query_without_shard_key_raises_error(binds):
+    with pytest.raises(RuntimeError, match="sharded by 'guild_id'"):
+        Message.all()
+
+    with pytest.raises(RuntimeError, match="sharded by 'guild_id'"):
+        Message.where((Message.guild_id == 1) | (Message.id == 1)).all()
+
+    with pytest.raises(RuntimeError, match="sharded by 'guild_id'"):
+        Message.get_engine()